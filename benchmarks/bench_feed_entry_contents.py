@@ -0,0 +1,134 @@
+# Storage size and timeline latency with and without entry bodies.
+# Run against a throwaway migrated database, e.g. in the test container:
+#   uv run python -m feedreader3.migrate
+#   uv run python -m benchmarks.bench_feed_entry_contents --entries 100000
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+from sqlmodel import Session, select, func, text, delete
+from feedreader3.settings import initialize_settings, get_settings
+from feedreader3.database import initialize_engine, finalize_engine, get_engine
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_entry_content import FeedEntryContent, compress_text
+
+WORDS = (
+    "feed entry python release security update database performance network "
+    "kernel compiler library framework server client protocol cache index query"
+).split()
+
+
+def make_body(rng: random.Random, paragraphs: int) -> str:
+    return "".join(
+        "<p>" + " ".join(rng.choices(WORDS, k=rng.randint(40, 80))) + "</p>"
+        for _ in range(paragraphs)
+    )
+
+
+def measure_timeline(session: Session, repeat: int) -> float:
+    ts = func.coalesce(FeedEntry.entry_updated_at, FeedEntry.first_seen_at)
+    query = select(FeedEntry).order_by(ts.desc(), FeedEntry.id.desc()).limit(100)  # type: ignore[union-attr]
+    timings = []
+    for _ in range(repeat):
+        session.expunge_all()
+        start = time.perf_counter()
+        session.exec(query).all()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def relation_size(session: Session, table_name: str) -> int:
+    return int(
+        session.execute(
+            text("SELECT pg_total_relation_size(:name)"), {"name": table_name}
+        ).scalar_one()
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    initialize_settings()
+    if not get_settings().postgres_db.startswith(("test_", "bench_")):
+        raise SystemExit("Benchmarks require postgres_db=test_* or bench_*")
+    initialize_engine()
+    rng = random.Random(0)
+    base = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    try:
+        with Session(get_engine()) as session:
+            feed_source = FeedSource(
+                name="bench_feed_entry_contents", feed_url="http://bench.invalid/"
+            )
+            session.add(feed_source)
+            session.commit()
+            feed_source_id = feed_source.id
+
+            feed_entries = [
+                FeedEntry(
+                    first_seen_at=base + timedelta(seconds=i),
+                    feed_source_id=feed_source_id,
+                    entry_id=f"entry{i}",
+                    entry_title=" ".join(rng.choices(WORDS, k=8)),
+                    entry_link=f"http://bench.invalid/entry{i}",
+                    entry_updated_at=base + timedelta(seconds=i),
+                )
+                for i in range(args.entries)
+            ]
+            session.add_all(feed_entries)
+            session.commit()
+            session.execute(text("ANALYZE feedentry"))
+
+            print(f"entries: {args.entries}")
+            print(
+                f"feedentry size without bodies: {relation_size(session, 'feedentry')}"
+            )
+            print(
+                f"timeline p50 without bodies: {measure_timeline(session, args.repeat):.2f} ms"
+            )
+
+            feed_entry_ids = session.exec(
+                select(FeedEntry.id).where(FeedEntry.feed_source_id == feed_source_id)
+            ).all()
+            raw_bytes = 0
+            compressed_bytes = 0
+            for feed_entry_id in feed_entry_ids:
+                summary = make_body(rng, 1)
+                content = make_body(rng, rng.randint(3, 10))
+                feed_entry_content = FeedEntryContent(
+                    feed_entry_id=feed_entry_id,
+                    summary=compress_text(summary),
+                    content=compress_text(content),
+                )
+                raw_bytes += len(summary.encode()) + len(content.encode())
+                compressed_bytes += len(feed_entry_content.summary or b"") + len(
+                    feed_entry_content.content or b""
+                )
+                session.add(feed_entry_content)
+            session.commit()
+            session.execute(text("ANALYZE feedentrycontent"))
+
+            print(f"body bytes raw: {raw_bytes}, zstd: {compressed_bytes}")
+            print(f"feedentry size with bodies: {relation_size(session, 'feedentry')}")
+            print(
+                f"feedentrycontent size: {relation_size(session, 'feedentrycontent')}"
+            )
+            print(
+                f"timeline p50 with bodies: {measure_timeline(session, args.repeat):.2f} ms"
+            )
+
+            # Rely on ON DELETE CASCADE instead of loading every entry
+            session.execute(delete(FeedSource).where(FeedSource.id == feed_source_id))  # type: ignore[arg-type]
+            session.commit()
+    finally:
+        finalize_engine()
+
+
+if __name__ == "__main__":
+    main()
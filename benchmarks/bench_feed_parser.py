@@ -0,0 +1,111 @@
+# Parse throughput of the entry parser backends on synthetic feeds.
+# No database or network is needed:
+#   uv run python -m benchmarks.bench_feed_parser --entries 1000
+
+import argparse
+import random
+import time
+from typing import Callable
+from xml.sax.saxutils import escape
+import feedparser
+from feedreader3.feed_parser import create_entry_parser, iter_feed_entries
+
+WORDS = (
+    "feed entry python release security update database performance network "
+    "kernel compiler library framework server client protocol cache index query"
+).split()
+
+
+def make_text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choices(WORDS, k=words))
+
+
+def make_body(rng: random.Random) -> str:
+    return "".join(
+        f'<p>{make_text(rng, 60)} <a href="/posts/{rng.randint(1, 1000)}">more</a></p>'
+        for _ in range(3)
+    )
+
+
+def make_rss(rng: random.Random, entries: int) -> bytes:
+    items = "".join(
+        "<item>"
+        f"<title>{escape(make_text(rng, 8))}</title>"
+        f"<link>https://example.com/posts/{i}</link>"
+        f"<guid>https://example.com/posts/{i}</guid>"
+        "<pubDate>Wed, 09 Nov 2005 11:56:34 GMT</pubDate>"
+        f"<description>{escape(make_text(rng, 40))}</description>"
+        f"<content:encoded>{escape(make_body(rng))}</content:encoded>"
+        "<dc:creator>author</dc:creator>"
+        "</item>"
+        for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"'
+        ' xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        f"<channel><title>Benchmark</title><link>https://example.com/</link>{items}"
+        "</channel></rss>"
+    ).encode()
+
+
+def make_atom(rng: random.Random, entries: int) -> bytes:
+    items = "".join(
+        "<entry>"
+        f"<title>{escape(make_text(rng, 8))}</title>"
+        f'<link rel="alternate" href="/posts/{i}"/>'
+        f"<id>tag:example.com,2005:{i}</id>"
+        "<updated>2005-11-09T11:56:34Z</updated>"
+        f"<summary>{escape(make_text(rng, 40))}</summary>"
+        f'<content type="html">{escape(make_body(rng))}</content>'
+        "<author><name>author</name></author>"
+        "</entry>"
+        for i in range(entries)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xml:base="https://example.com/">'
+        f"<title>Benchmark</title><id>tag:example.com,2005:feed</id>{items}</feed>"
+    ).encode()
+
+
+def measure(parse: Callable[[], int], repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = parse()
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    for name, data in (
+        ("rss", make_rss(rng, args.entries)),
+        ("atom", make_atom(rng, args.entries)),
+    ):
+        print(f"{name}: {args.entries} entries, {len(data) / 1024 / 1024:.1f} MiB")
+        runs: dict[str, Callable[[], int]] = {
+            "feedparser document": lambda: len(feedparser.parse(data).entries),
+        }
+        for backend in ("feedparser", "fast"):
+            entry_parser = create_entry_parser(backend)
+            runs[f"{backend} backend"] = lambda entry_parser=entry_parser: sum(
+                1 for _ in iter_feed_entries([data], entry_parser=entry_parser)
+            )
+        for label, parse in runs.items():
+            elapsed, count = measure(parse, args.repeat)
+            print(
+                f"  {label:<20} {elapsed * 1000:8.1f}ms "
+                f"{count / elapsed:8.0f} entries/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
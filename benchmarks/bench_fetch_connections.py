@@ -0,0 +1,116 @@
+# Connection setup overhead of fetching feeds, with a new client per feed as
+# before and with the shared pooled client. Serves a small feed over TLS from
+# a local stub server with a throwaway self-signed certificate (needs the
+# openssl command):
+#   uv run python -m benchmarks.bench_fetch_connections --feeds 200
+
+import argparse
+import ssl
+import statistics
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Thread
+import httpx
+from feedreader3.feed_fetcher import USER_AGENT, create_http_client
+
+FEED = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<feed xmlns="http://www.w3.org/2005/Atom"><title>Bench</title>'
+    + b"".join(
+        b"<entry><id>urn:entry:%d</id><title>Entry %d</title>"
+        b'<link href="https://localhost/%d"/></entry>' % (i, i, i)
+        for i in range(20)
+    )
+    + b"</feed>"
+)
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are separate writes, which Nagle's algorithm would
+    # hold back for the client's delayed ACK on a kept-alive connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(FEED)))
+        self.end_headers()
+        self.wfile.write(FEED)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+def create_certificate(directory: Path) -> tuple[Path, Path]:
+    cert, key = directory / "cert.pem", directory / "key.pem"
+    subprocess.run(
+        [
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key), "-out", str(cert), "-days", "1",
+            "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+        ],
+        check=True,
+        capture_output=True,
+    )  # fmt: skip
+    return cert, key
+
+
+def measure(fetch: Callable[[], None], feeds: int) -> tuple[float, float]:
+    timings = []
+    for _ in range(feeds):
+        start = time.perf_counter()
+        fetch()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, sum(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--feeds", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = create_certificate(Path(directory))
+        server_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        server_context.load_cert_chain(cert, key)
+        client_context = ssl.create_default_context(cafile=cert)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+        server.socket = server_context.wrap_socket(server.socket, server_side=True)
+        thread = Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"https://localhost:{server.server_address[1]}/feed.xml"
+
+        def fetch_with_new_client() -> None:
+            with httpx.Client(
+                verify=client_context, headers={"User-Agent": USER_AGENT}
+            ) as client:
+                client.get(url).raise_for_status()
+
+        shared_client = create_http_client(False, 300, verify=client_context)
+
+        def fetch_with_shared_client() -> None:
+            shared_client.get(url).raise_for_status()
+
+        try:
+            print(f"{args.feeds} sequential fetches of a {len(FEED)} byte feed")
+            for name, fetch in [
+                ("new client per feed", fetch_with_new_client),
+                ("shared client", fetch_with_shared_client),
+            ]:
+                median_ms, total = measure(fetch, args.feeds)
+                print(f"  {name:<20} median {median_ms:6.2f}ms  total {total:6.2f}s")
+        finally:
+            shared_client.close()
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+
+if __name__ == "__main__":
+    main()
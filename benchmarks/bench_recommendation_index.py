@@ -0,0 +1,84 @@
+# Build time and query latency of the recommendation index.
+# Titles are synthetic, so no database is needed:
+#   uv run python -m benchmarks.bench_recommendation_index --entries 1000000
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from feedreader3.recommendation.features import vectorize
+from feedreader3.recommendation.index import RecommendationIndex
+
+WORDS = (
+    "feed entry python release security update database performance network "
+    "kernel compiler library framework server client protocol cache index query "
+    "football match result weather forecast election market stock earnings"
+).split()
+
+
+def make_titles(rng: random.Random, count: int) -> list[str]:
+    return [" ".join(rng.choices(WORDS, k=rng.randint(4, 12))) for _ in range(count)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        index = RecommendationIndex(Path(tmp_dir), args.dim, writable=True)
+
+        vectorize_time = 0.0
+        add_time = 0.0
+        for start in range(0, args.entries, args.batch_size):
+            count = min(args.batch_size, args.entries - start)
+            titles = make_titles(rng, count)
+            t0 = time.perf_counter()
+            vectors = vectorize(titles, args.dim)
+            t1 = time.perf_counter()
+            index.add(np.arange(start + 1, start + count + 1, dtype=np.int64), vectors)
+            t2 = time.perf_counter()
+            vectorize_time += t1 - t0
+            add_time += t2 - t1
+        t0 = time.perf_counter()
+        index.publish()
+        add_time += time.perf_counter() - t0
+
+        print(f"entries={index.size} dim={args.dim}")
+        print(f"build: vectorize={vectorize_time:.1f}s add={add_time:.1f}s")
+
+        reader = RecommendationIndex(Path(tmp_dir), args.dim, writable=False)
+        seed_ids = [rng.randint(1, args.entries) for _ in range(args.queries)]
+
+        # Warm the page cache so that the numbers reflect steady state
+        reader.search(reader.get_vectors(seed_ids[:1]), args.k)
+
+        timings = []
+        for seed_id in seed_ids:
+            start_time = time.perf_counter()
+            reader.search(reader.get_vectors([seed_id]), args.k, exclude_ids=[seed_id])
+            timings.append(time.perf_counter() - start_time)
+        print(
+            f"single query: median={statistics.median(timings) * 1000:.1f}ms "
+            f"max={max(timings) * 1000:.1f}ms"
+        )
+
+        start_time = time.perf_counter()
+        reader.search(reader.get_vectors(seed_ids), args.k)
+        batch_time = time.perf_counter() - start_time
+        print(
+            f"batched {len(seed_ids)} queries: {batch_time * 1000:.1f}ms "
+            f"({batch_time / len(seed_ids) * 1000:.2f}ms/query)"
+        )
+
+
+if __name__ == "__main__":
+    main()
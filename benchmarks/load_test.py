@@ -0,0 +1,124 @@
+# Throughput of the production server by number of web workers. Starts
+# `python -m feedreader3.serve` for each worker count and loads it from
+# several client processes. Needs the database settings in the environment:
+#   uv run python -m benchmarks.load_test --workers 1 2 4 --duration 10
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import httpx
+
+
+def wait_until_ready(base_url: str, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/health").is_success:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server did not start within {timeout}s")
+
+
+async def run_connections(
+    base_url: str, paths: list[str], connections: int, duration: float
+) -> tuple[list[float], int]:
+    latencies: list[float] = []
+    errors = 0
+    deadline = time.monotonic() + duration
+
+    async def run_connection(client: httpx.AsyncClient, offset: int) -> None:
+        nonlocal errors
+        i = offset
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                response = await client.get(paths[i % len(paths)])
+                if not response.is_success:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+            i += 1
+
+    limits = httpx.Limits(max_connections=connections)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        await asyncio.gather(*(run_connection(client, i) for i in range(connections)))
+    return latencies, errors
+
+
+def run_client(
+    base_url: str, paths: list[str], connections: int, duration: float
+) -> tuple[list[float], int]:
+    return asyncio.run(run_connections(base_url, paths, connections, duration))
+
+
+def measure(workers: int, args: argparse.Namespace) -> tuple[float, float, float, int]:
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "feedreader3.serve"],
+        env={
+            **os.environ,
+            "WEB_WORKERS": str(workers),
+            "WEB_HOST": "127.0.0.1",
+            "WEB_PORT": str(args.port),
+        },
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(base_url, 30)
+        # Every worker has warmed up by the time one answers, but give the
+        # others a moment to finish their startup too
+        time.sleep(1)
+        with ProcessPoolExecutor(args.clients) as executor:
+            results = list(
+                executor.map(
+                    run_client,
+                    [base_url] * args.clients,
+                    [args.path] * args.clients,
+                    [args.connections] * args.clients,
+                    [args.duration] * args.clients,
+                )
+            )
+    finally:
+        server.terminate()
+        server.wait()
+    latencies = sorted(latency for result in results for latency in result[0])
+    errors = sum(result[1] for result in results)
+    quantiles = statistics.quantiles(latencies, n=100)
+    return len(latencies) / args.duration, quantiles[49], quantiles[98], errors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--path", action="append", default=None, help="May be repeated")
+    args = parser.parse_args()
+    if args.path is None:
+        args.path = ["/feed-sources?limit=20", "/feed-entries?limit=20"]
+
+    print(
+        f"{args.clients} clients x {args.connections} connections, "
+        f"{args.duration:.0f}s per run, paths: {' '.join(args.path)}"
+    )
+    for workers in args.workers:
+        throughput, p50, p99, errors = measure(workers, args)
+        print(
+            f"  workers={workers:<3} {throughput:9.0f} req/s "
+            f"p50 {p50 * 1000:7.1f}ms p99 {p99 * 1000:7.1f}ms errors {errors}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,44 @@
-from sqlmodel import SQLModel, create_engine
+from sqlmodel import create_engine, text
 from sqlalchemy import Engine
+from contextlib import ExitStack
 from .settings import get_settings
+from .migration import check_schema_version
+from .query_stats import configure_query_stats
+from .tracing import is_tracing_enabled, instrument_engine, uninstrument_engine
 
 _engine: Engine | None = None
 
 
+def get_database_url() -> str:
+    settings = get_settings()
+    return f"postgresql+psycopg://{settings.postgres_user}:{settings.postgres_password}@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}"
+
+
 def initialize_engine() -> None:
-    # TODO: Run migration script
     global _engine
     if _engine is not None:
         raise RuntimeError("_engine is not None. _engine has already initialized")
 
     settings = get_settings()
-    url = f"postgresql+psycopg://{settings.postgres_user}:{settings.postgres_password}@{settings.postgres_host}:{settings.postgres_port}/{settings.postgres_db}"
-    _engine = create_engine(url)
+    _engine = create_engine(
+        get_database_url(),
+        pool_size=settings.database_pool_size,
+        max_overflow=settings.database_max_overflow,
+    )
+    configure_query_stats(
+        _engine,
+        settings.database_slow_query_ms,
+        settings.database_explain_sample_rate,
+        settings.debug_queries,
+    )
+    if is_tracing_enabled():
+        instrument_engine(_engine)
+    # Migrations are applied by `python -m feedreader3.migrate` before the web
+    # app and the worker start. Here we only make sure that happened.
     try:
-        SQLModel.metadata.create_all(_engine)
+        check_schema_version(_engine)
     except Exception:
+        _engine.dispose()
         _engine = None
         raise
 
@@ -26,6 +48,8 @@ def finalize_engine() -> None:
     if _engine is None:
         raise RuntimeError("_engine is None. _engine doesn't need to finalize")
 
+    if is_tracing_enabled():
+        uninstrument_engine()
     _engine.dispose()
     _engine = None
 
@@ -34,3 +58,13 @@ def get_engine() -> Engine:
     if _engine is None:
         raise RuntimeError("_engine is None. Call initialize_engine()")
     return _engine
+
+
+def warm_up_engine(connections: int) -> None:
+    # Connections are opened together so that the pool keeps all of them,
+    # and the first requests do not pay for connecting
+    engine = get_engine()
+    with ExitStack() as stack:
+        for _ in range(connections):
+            connection = stack.enter_context(engine.connect())
+            connection.execute(text("SELECT 1"))
@@ -0,0 +1,247 @@
+from lxml import etree
+from feedparser.datetimes import _parse_date
+from feedparser.html import _cp1252
+from feedparser.mixin import _FeedParserMixin
+from feedparser.sanitizer import _sanitize_html
+from feedparser.urls import _urljoin, make_safe_absolute_uri, resolve_relative_uris
+import feedparser
+import re
+
+ATOM_NS = "{http://www.w3.org/2005/Atom}"
+CONTENT_ENCODED = "{http://purl.org/rss/1.0/modules/content/}encoded"
+XML_BASE = "{http://www.w3.org/XML/1998/namespace}base"
+
+# Children whose values are read. Other elements of the entry are skipped,
+# except that anything feedparser might read into the same fields makes the
+# entry fall back to feedparser.
+ATOM_VALUE_TAGS = {
+    ATOM_NS + name
+    for name in ("id", "title", "updated", "published", "summary", "content")
+}
+ATOM_OTHER_TAGS = {
+    ATOM_NS + name for name in ("link", "author", "contributor", "category", "rights")
+}
+RSS_VALUE_TAGS = {"guid", "title", "link", "pubdate", "description", CONTENT_ENCODED}
+RSS_OTHER_TAGS = {"author", "category", "comments", "enclosure"}
+FIELD_NAMES = {
+    "abstract",
+    "body",
+    "content",
+    "created",
+    "date",
+    "description",
+    "encoded",
+    "entry",
+    "fullitem",
+    "guid",
+    "id",
+    "issued",
+    "item",
+    "lastbuilddate",
+    "link",
+    "modified",
+    "origlink",
+    "pubdate",
+    "published",
+    "source",
+    "summary",
+    "title",
+    "updated",
+}
+
+HTML_TYPES = _FeedParserMixin.html_types
+CAN_BE_RELATIVE_URI = _FeedParserMixin.can_be_relative_uri
+CAN_CONTAIN_RELATIVE_URIS = _FeedParserMixin.can_contain_relative_uris
+CAN_CONTAIN_DANGEROUS_MARKUP = _FeedParserMixin.can_contain_dangerous_markup
+LINK_ENTITY_PATTERN = re.compile("&([A-Za-z0-9_]+);")
+
+
+class UnsupportedEntry(Exception):
+    pass
+
+
+def get_local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1].lower()
+
+
+def get_attributes(element: etree._Element) -> dict[str, str]:
+    # Keys and the rel and type values are lowercased, as feedparser does.
+    # Other namespaced attributes are not read.
+    attributes: dict[str, str] = {}
+    for key, value in element.attrib.items():
+        if key == XML_BASE:
+            attributes["xml:base"] = value
+        elif not key.startswith("{"):
+            name = key.lower()
+            attributes[name] = value.lower() if name in ("rel", "type") else value
+    return attributes
+
+
+def push_base(base: str, attributes: dict[str, str]) -> str:
+    # feedparser's handling of xml:base at every start tag
+    value = attributes.get("xml:base", attributes.get("base")) or base
+    if base:
+        return str(make_safe_absolute_uri(base, value) or base)
+    return str(_urljoin(base, value))
+
+
+def get_text(element: etree._Element) -> str:
+    # Values with markup, comments or unresolved entities are left to feedparser
+    if len(element) > 0:
+        raise UnsupportedEntry(f"Markup in {element.tag!r}")
+    return element.text or ""
+
+
+def finish_value(
+    name: str,
+    value: str,
+    content_type: str | None,
+    base: str,
+    is_atom: bool,
+    is_permalink: bool = True,
+) -> str:
+    # The same steps feedparser applies to a value when its element ends
+    value = value.strip()
+    if name in CAN_BE_RELATIVE_URI and value and (name != "id" or is_permalink):
+        value = _urljoin(base, value)
+    if (
+        not is_atom
+        and content_type == "text/plain"
+        and _FeedParserMixin.looks_like_html(value)
+    ):
+        content_type = "text/html"
+    mapped_type = _FeedParserMixin.map_content_type(content_type or "text/html")
+    if mapped_type in HTML_TYPES:
+        # Text without tags or references comes out of both passes unchanged,
+        # and they are the slow part
+        has_markup = "<" in value or "&" in value
+        if name in CAN_CONTAIN_RELATIVE_URIS and has_markup:
+            value = resolve_relative_uris(value, base, "utf-8", mapped_type)
+        if name in CAN_CONTAIN_DANGEROUS_MARKUP:
+            if has_markup:
+                value = _sanitize_html(value, "utf-8", mapped_type)
+            else:
+                value = value.replace("\r\n", "\n")
+    try:
+        value = value.encode("iso-8859-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        pass
+    return value.translate(_cp1252)
+
+
+def get_content_type(attributes: dict[str, str], default: str) -> str:
+    if "mode" in attributes or "src" in attributes:
+        raise UnsupportedEntry("Content mode or src")
+    content_type = str(
+        _FeedParserMixin.map_content_type(attributes.get("type", default))
+    )
+    if content_type not in ("text/plain", "text/html"):
+        raise UnsupportedEntry(f"Content type {content_type}")
+    return content_type
+
+
+def check_other_child(child: etree._Element) -> None:
+    for element in child.iter():
+        if isinstance(element.tag, str) and get_local_name(element.tag) in FIELD_NAMES:
+            raise UnsupportedEntry(f"{element.tag!r} in {child.tag!r}")
+
+
+def parse_simple_entry(
+    ancestors: list[etree._Element], entry: etree._Element, base_url: str | None
+) -> feedparser.util.FeedParserDict:
+    # Builds the fields store_feed_entries reads for plain Atom 1.0 and RSS 2.0
+    # entries, value by value the way feedparser would. Raises UnsupportedEntry
+    # for anything else.
+    root = ancestors[0]
+    if entry.tag == ATOM_NS + "entry" and root.tag == ATOM_NS + "feed":
+        is_atom = True
+    elif entry.tag == "item" and [a.tag for a in ancestors] == ["rss", "channel"]:
+        is_atom = False
+    else:
+        raise UnsupportedEntry(f"{entry.tag!r} in {root.tag!r}")
+
+    entry_attributes = get_attributes(entry)
+    if "lastmod" in entry_attributes or "href" in entry_attributes:
+        raise UnsupportedEntry("CDF attributes")
+
+    entry_base = base_url or ""
+    for element in [*ancestors, entry]:
+        entry_base = push_base(entry_base, get_attributes(element))
+
+    parsed_entry = feedparser.util.FeedParserDict()
+    seen_tags: set[str] = set()
+    link: str | None = None
+    guid_link: str | None = None
+    content: str | None = None
+    content_type: str | None = None
+    for child in entry:
+        if not isinstance(child.tag, str):
+            continue
+        tag = child.tag if is_atom or "}" in child.tag else child.tag.lower()
+        attributes = get_attributes(child)
+        base = push_base(entry_base, attributes)
+
+        if is_atom and tag == ATOM_NS + "link":
+            if "href" not in attributes or "url" in attributes or "uri" in attributes:
+                raise UnsupportedEntry("Link without a plain href")
+            rel = attributes.get("rel", "alternate")
+            link_type = attributes.get("type", "text/html")
+            if rel == "alternate" and link_type in HTML_TYPES:
+                link = _urljoin(base, attributes["href"])
+            continue
+        if tag not in (ATOM_VALUE_TAGS if is_atom else RSS_VALUE_TAGS):
+            if tag not in (ATOM_OTHER_TAGS if is_atom else RSS_OTHER_TAGS):
+                if not is_atom and "}" not in tag:
+                    raise UnsupportedEntry(f"Unknown element {tag}")
+                if is_atom and tag.startswith(ATOM_NS):
+                    raise UnsupportedEntry(f"Unknown element {tag}")
+            check_other_child(child)
+            continue
+        if tag in seen_tags:
+            raise UnsupportedEntry(f"Repeated element {tag}")
+        seen_tags.add(tag)
+
+        name = get_local_name(tag)
+        text = get_text(child)
+        if name in ("id", "guid"):
+            is_permalink = attributes.get("ispermalink", "true") == "true"
+            value = finish_value("id", text, None, base, is_atom, is_permalink)
+            parsed_entry["id"] = value
+            if is_permalink:
+                guid_link = value
+        elif name == "link":
+            value = finish_value("link", text, None, base, is_atom)
+            link = LINK_ENTITY_PATTERN.sub(r"&\g<1>", value.replace("&amp;", "&"))
+        elif name == "title":
+            title_type = get_content_type(attributes, "text/plain")
+            parsed_entry["title"] = finish_value(
+                "title", text, title_type, base, is_atom
+            )
+        elif name in ("updated", "published", "pubdate"):
+            value = finish_value(name, text, None, base, is_atom)
+            key = "updated_parsed" if name == "updated" else "published_parsed"
+            parsed_entry[key] = _parse_date(value)
+        elif name in ("summary", "description"):
+            summary_type = get_content_type(
+                attributes, "text/plain" if is_atom else "text/html"
+            )
+            parsed_entry["summary"] = finish_value(
+                name, text, summary_type, base, is_atom
+            )
+        else:
+            content_type = get_content_type(
+                attributes, "text/plain" if is_atom else "text/html"
+            )
+            content = finish_value("content", text, content_type, base, is_atom)
+
+    if link is None:
+        link = guid_link
+    if link is not None:
+        parsed_entry["link"] = link
+    if content is not None:
+        parsed_entry["content"] = [
+            feedparser.util.FeedParserDict(type=content_type, value=content)
+        ]
+        # feedparser copies the content when there is no summary
+        parsed_entry.setdefault("summary", content)
+    return parsed_entry
@@ -0,0 +1,160 @@
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import IO, Iterator
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import zstandard
+
+# Feed documents compress well at zstd's default level, and the archive is
+# written on the fetch path
+ZSTD_LEVEL = 3
+CHUNK_SIZE = 64 * 1024
+INDEX_FILE_NAME = "index.jsonl"
+OBJECTS_DIR_NAME = "objects"
+
+_archive: "FeedArchive | None" = None
+
+
+@dataclass
+class ArchiveRecord:
+    fetched_at: str
+    feed_source_id: int
+    feed_url: str
+    sha256: str
+    size: int
+
+
+# Raw response bodies stored by their SHA-256, so that a feed that has not
+# changed since the last fetch costs one index line. The index lists every
+# fetch in order, one JSON object per line.
+#
+#   <root>/index.jsonl
+#   <root>/objects/ab/cdef....zst
+class FeedArchive:
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.lock = threading.Lock()
+        self.index_file: IO[str] | None = None
+
+    def get_object_path(self, sha256: str) -> Path:
+        return self.root / OBJECTS_DIR_NAME / sha256[:2] / f"{sha256[2:]}.zst"
+
+    def add(self, feed_source_id: int, feed_url: str, body: bytes) -> ArchiveRecord:
+        with self.open_writer() as writer:
+            writer.write(body)
+            return writer.commit(feed_source_id, feed_url)
+
+    @contextmanager
+    def open_writer(self) -> Iterator["ArchiveWriter"]:
+        # A writer that is not committed leaves nothing behind
+        objects_dir = self.root / OBJECTS_DIR_NAME
+        objects_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=objects_dir, delete=False) as f:
+            writer = ArchiveWriter(self, f)
+            try:
+                yield writer
+            finally:
+                if not writer.committed:
+                    f.close()
+                    Path(f.name).unlink(missing_ok=True)
+
+    def append_record(self, record: ArchiveRecord) -> None:
+        # Fetch shards add records from several threads
+        with self.lock:
+            if self.index_file is None:
+                self.index_file = open(
+                    self.root / INDEX_FILE_NAME, "a", encoding="utf-8"
+                )
+            self.index_file.write(json.dumps(asdict(record)) + "\n")
+            self.index_file.flush()
+
+    def read(self, sha256: str) -> bytes:
+        return b"".join(self.iter_chunks(sha256))
+
+    def iter_chunks(self, sha256: str) -> Iterator[bytes]:
+        # Objects written as a stream have no content size in their frame
+        # header, so they are always read as a stream too
+        with open(self.get_object_path(sha256), "rb") as f:
+            with zstandard.ZstdDecompressor().stream_reader(f) as reader:
+                while chunk := reader.read(CHUNK_SIZE):
+                    yield chunk
+
+    def iter_records(self) -> Iterator[ArchiveRecord]:
+        path = self.root / INDEX_FILE_NAME
+        if not path.exists():
+            return
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                yield ArchiveRecord(**json.loads(line))
+
+    def close(self) -> None:
+        with self.lock:
+            if self.index_file is not None:
+                self.index_file.close()
+                self.index_file = None
+
+
+# Compresses a body chunk by chunk as it is fetched, so that it is never held
+# whole in memory. Its hash is only known at the end, when the object is renamed
+# into place, or dropped if an identical body is stored already.
+class ArchiveWriter:
+    def __init__(self, archive: FeedArchive, file: IO[bytes]) -> None:
+        self.archive = archive
+        self.file = file
+        self.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(
+            file, closefd=False
+        )
+        self.hash = hashlib.sha256()
+        self.size = 0
+        self.committed = False
+
+    def write(self, chunk: bytes) -> None:
+        self.compressor.write(chunk)
+        self.hash.update(chunk)
+        self.size += len(chunk)
+
+    def commit(self, feed_source_id: int, feed_url: str) -> ArchiveRecord:
+        self.compressor.close()
+        self.file.close()
+        sha256 = self.hash.hexdigest()
+        path = self.archive.get_object_path(sha256)
+        if path.exists():
+            os.unlink(self.file.name)
+        else:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Renamed into place, so that a reader never sees half an object
+            os.replace(self.file.name, path)
+        self.committed = True
+        record = ArchiveRecord(
+            fetched_at=datetime.now(timezone.utc).isoformat(),
+            feed_source_id=feed_source_id,
+            feed_url=feed_url,
+            sha256=sha256,
+            size=self.size,
+        )
+        self.archive.append_record(record)
+        return record
+
+
+def initialize_feed_archive(path: str) -> None:
+    global _archive
+    if _archive is not None:
+        raise RuntimeError("_archive is not None. _archive has already initialized")
+    _archive = FeedArchive(Path(path))
+
+
+def finalize_feed_archive() -> None:
+    global _archive
+    if _archive is None:
+        raise RuntimeError("_archive is None. _archive doesn't need to finalize")
+    _archive.close()
+    _archive = None
+
+
+def get_feed_archive() -> FeedArchive | None:
+    return _archive
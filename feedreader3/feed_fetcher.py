@@ -0,0 +1,233 @@
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterable, Iterator
+from urllib.parse import urlsplit
+import logging
+import socket
+import ssl
+import threading
+import time
+import httpcore
+import httpx
+from .tracing import is_tracing_enabled, instrument_http_client
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "feedreader3 (+https://github.com/getanaka/feedreader3)"
+CHUNK_SIZE = 64 * 1024
+# Decoded by httpx, brotli through the brotli package
+ACCEPT_ENCODING = "br, gzip"
+# Feeds on the same host are usually fetched within seconds of each other
+KEEPALIVE_EXPIRY = 30
+
+_client: httpx.Client | None = None
+
+
+class FeedFetchError(Exception):
+    pass
+
+
+class FeedTooLargeError(FeedFetchError):
+    pass
+
+
+class FeedTimeoutError(FeedFetchError):
+    pass
+
+
+@dataclass
+class FetchLimits:
+    max_bytes: int
+    connect_timeout: float
+    # Longest wait for any single read
+    read_timeout: float
+    # Whole download, so that a server dripping a byte at a time is cut off
+    total_timeout: float
+
+
+class FeedStream:
+    def __init__(self, chunks: Iterator[bytes], limits: FetchLimits) -> None:
+        self.chunks = chunks
+        self.limits = limits
+        self.deadline = time.monotonic() + limits.total_timeout
+        self.fetched_bytes = 0
+        # None for local files
+        self.status_code: int | None = None
+        # rel -> URL from the Link header, e.g. a WebSub hub
+        self.links: dict[str, str] = {}
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self.chunks:
+            self.fetched_bytes += len(chunk)
+            # Counted after decompression, so gzip bombs are caught as well
+            if self.fetched_bytes > self.limits.max_bytes:
+                raise FeedTooLargeError(
+                    f"Feed is larger than {self.limits.max_bytes} bytes"
+                )
+            if time.monotonic() > self.deadline:
+                raise FeedTimeoutError(
+                    f"Feed took longer than {self.limits.total_timeout} seconds"
+                )
+            yield chunk
+
+
+class DnsCachingBackend(httpcore.NetworkBackend):
+    # Resolves each host at most once per TTL instead of on every new
+    # connection. TLS still verifies against the host name.
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._backend = httpcore.SyncBackend()
+        self._lock = threading.Lock()
+        self._addresses: dict[tuple[str, int], tuple[float, list[str]]] = {}
+
+    def resolve(self, host: str, port: int) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            cached = self._addresses.get((host, port))
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        try:
+            infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except OSError as exc:
+            raise httpcore.ConnectError(str(exc)) from exc
+        addresses = list(dict.fromkeys(str(info[4][0]) for info in infos))
+        with self._lock:
+            self._addresses[(host, port)] = (now + self.ttl, addresses)
+        return addresses
+
+    def connect_tcp(
+        self,
+        host: str,
+        port: int,
+        timeout: float | None = None,
+        local_address: str | None = None,
+        socket_options: Iterable[httpcore.SOCKET_OPTION] | None = None,
+    ) -> httpcore.NetworkStream:
+        addresses = self.resolve(host, port)
+        for i, address in enumerate(addresses):
+            try:
+                return self._backend.connect_tcp(
+                    address, port, timeout, local_address, socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout):
+                if i == len(addresses) - 1:
+                    # The host may have moved, so it is resolved again next time
+                    with self._lock:
+                        self._addresses.pop((host, port), None)
+                    raise
+        raise httpcore.ConnectError(f"No address for {host}")
+
+    def connect_unix_socket(
+        self,
+        path: str,
+        timeout: float | None = None,
+        socket_options: Iterable[httpcore.SOCKET_OPTION] | None = None,
+    ) -> httpcore.NetworkStream:
+        return self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    def sleep(self, seconds: float) -> None:
+        self._backend.sleep(seconds)
+
+
+def create_http_client(
+    http2: bool, dns_cache_ttl: float, verify: ssl.SSLContext | bool = True
+) -> httpx.Client:
+    transport = httpx.HTTPTransport(
+        verify=verify,
+        http2=http2,
+        limits=httpx.Limits(keepalive_expiry=KEEPALIVE_EXPIRY),
+    )
+    # httpx has no option for the network backend of its connection pool, so
+    # the private attribute of the pinned httpcore is replaced. A transport
+    # passed in also means httpx no longer reads HTTP(S)_PROXY.
+    pool = getattr(transport, "_pool", None)
+    if hasattr(pool, "_network_backend"):
+        setattr(pool, "_network_backend", DnsCachingBackend(dns_cache_ttl))
+    else:
+        logger.warning(
+            "Connection pool has no network backend to replace. Host addresses are not cached"
+        )
+    return httpx.Client(
+        transport=transport,
+        follow_redirects=True,
+        headers={"User-Agent": USER_AGENT, "Accept-Encoding": ACCEPT_ENCODING},
+    )
+
+
+def initialize_http_client(http2: bool, dns_cache_ttl: float) -> None:
+    global _client
+    if _client is not None:
+        logger.warning("_client has been already initialized. Reinitialize it")
+        finalize_http_client()
+    _client = create_http_client(http2, dns_cache_ttl)
+    if is_tracing_enabled():
+        instrument_http_client(_client)
+
+
+def set_dns_cache_ttl(ttl: float) -> None:
+    # Addresses already cached keep the expiry they were stored with
+    pool = getattr(get_http_client()._transport, "_pool", None)
+    backend = getattr(pool, "_network_backend", None)
+    if isinstance(backend, DnsCachingBackend):
+        backend.ttl = ttl
+
+
+def finalize_http_client() -> None:
+    global _client
+    if _client is None:
+        logger.warning("_client has been already finalized")
+        return
+    _client.close()
+    _client = None
+
+
+def get_http_client() -> httpx.Client:
+    if _client is None:
+        raise RuntimeError("_client is None. Call initialize_http_client()")
+    return _client
+
+
+def is_http_url(url: str) -> bool:
+    return urlsplit(url).scheme in ("http", "https")
+
+
+@contextmanager
+def open_feed(url: str, limits: FetchLimits) -> Iterator[FeedStream]:
+    # Local paths are read the same way. Tests and fixtures rely on them.
+    if not is_http_url(url):
+        with open(url, "rb") as f:
+            yield FeedStream(iter(lambda: f.read(CHUNK_SIZE), b""), limits)
+        return
+
+    timeout = httpx.Timeout(
+        limits.read_timeout, connect=limits.connect_timeout, pool=limits.connect_timeout
+    )
+    try:
+        # Connections are kept alive in the shared pool
+        with get_http_client().stream("GET", url, timeout=timeout) as response:
+            response.raise_for_status()
+            content_length = response.headers.get("Content-Length")
+            if (
+                content_length is not None
+                and content_length.isdigit()
+                and response.headers.get("Content-Encoding") is None
+                and int(content_length) > limits.max_bytes
+            ):
+                raise FeedTooLargeError(f"Feed is larger than {limits.max_bytes} bytes")
+            # Each read from the network is passed on as it arrives, so the
+            # deadline is checked however slowly the chunks fill up
+            stream = FeedStream(response.iter_bytes(), limits)
+            stream.status_code = response.status_code
+            stream.links = {
+                link["rel"]: link["url"]
+                for link in response.links.values()
+                if "rel" in link and "url" in link
+            }
+            # A response that is left before it is read to the end closes its
+            # connection instead of returning it to the pool, so a consumer
+            # that stops early does not download the rest
+            yield stream
+    except httpx.TimeoutException as exc:
+        raise FeedTimeoutError(f"Timed out fetching feed: {exc!r}") from exc
+    except httpx.HTTPError as exc:
+        raise FeedFetchError(f"Failed to fetch feed: {exc!r}") from exc
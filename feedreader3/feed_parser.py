@@ -0,0 +1,256 @@
+from typing import Any, Callable, Iterable, Iterator, Protocol
+from urllib.parse import urljoin
+from lxml import etree
+import feedparser
+import functools
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# The fast parser imports feedparser internals, which pyproject.toml pins
+# feedparser for. Should a release still move them, or change what they
+# return (see check_fast_entry_parser), feeds are parsed with feedparser alone.
+_fast_entry_parser_error: ImportError | None = None
+try:
+    from .fast_entry_parser import UnsupportedEntry, parse_simple_entry
+except ImportError as exc:
+    _fast_entry_parser_error = exc
+
+ENTRY_TAGS = {
+    "{http://www.w3.org/2005/Atom}entry",
+    "{http://purl.org/atom/ns#}entry",
+    "item",
+    "{http://purl.org/rss/1.0/}item",
+    "{http://my.netscape.com/rdf/simple/0.9/}item",
+}
+# Feed level links that are collected: the WebSub hub and the feed's own URL
+ATOM_LINK = "{http://www.w3.org/2005/Atom}link"
+FEED_LINK_RELS = {"hub", "self"}
+# Bytes of the document kept in memory for the feedparser fallback. The rest
+# goes to a temporary file.
+RAW_SPOOL_BYTES = 1024 * 1024
+# Entries the fast parser reads itself, with relative links, markup to
+# sanitize, entities and dates, to compare it with feedparser once per process
+SAMPLE_BASE_URL = "http://example.com/feed/"
+SAMPLE_FEEDS = [
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<feed xmlns="http://www.w3.org/2005/Atom" xml:base="http://example.org/">'
+    b"<title>Sample</title><entry><id>tag:example.org,2005:1</id>"
+    b'<title type="html">&lt;b&gt;Fish&lt;/b&gt; &amp;amp; chips</title>'
+    b'<link rel="alternate" type="text/html" href="entry/1"/>'
+    b"<updated>2005-11-09T11:56:34Z</updated>"
+    b"<published>2005-11-09T10:00:00+09:00</published>"
+    b'<summary type="html">&lt;p onclick="x()"&gt;Hi &lt;a href="/a"&gt;a'
+    b"&lt;/a&gt;&lt;script&gt;bad()&lt;/script&gt;&lt;/p&gt;</summary>"
+    b'<content type="text">caf\xc3\xa9 &lt;br&gt;</content></entry></feed>',
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">'
+    b"<channel><title>Sample</title><link>http://example.org/</link>"
+    b"<item><title>&#x80; \xc2\x93quoted\xc2\x94</title><guid>/guid-link</guid>"
+    b'<description><![CDATA[<p>Hi <a href="/x">x</a><script>bad()</script>'
+    b'<img src="i.png"></p>]]></description>'
+    b'<content:encoded><![CDATA[<div style="color:red">Body &amp; more</div>]]>'
+    b"</content:encoded></item>"
+    b'<item><title>Plain</title><link>/b?x=1&amp;y=2</link><guid isPermaLink="false">'
+    b"b-1</guid><description>a &lt; b &amp; c</description></item>"
+    b"</channel></rss>",
+]
+
+
+class EntryParser(Protocol):
+    def parse_entry(
+        self,
+        ancestors: list[etree._Element],
+        entry: etree._Element,
+        base_url: str | None,
+    ) -> feedparser.util.FeedParserDict | None: ...
+
+
+class FeedparserEntryParser:
+    def parse_entry(
+        self,
+        ancestors: list[etree._Element],
+        entry: etree._Element,
+        base_url: str | None,
+    ) -> feedparser.util.FeedParserDict | None:
+        # The entry is moved into copies of its ancestors (<feed>,
+        # <rss><channel>, ...) without their other children, and handed to
+        # feedparser. Field values, HTML sanitizing and relative links are
+        # exactly what feedparser produces for the whole document, but only one
+        # entry is in memory.
+        wrapper = leaf = etree.Element(
+            ancestors[0].tag, ancestors[0].attrib, nsmap=ancestors[0].nsmap
+        )
+        for ancestor in ancestors[1:]:
+            leaf = etree.SubElement(
+                leaf, ancestor.tag, ancestor.attrib, nsmap=ancestor.nsmap
+            )
+        leaf.append(entry)
+        parsed_feed = feedparser.parse(
+            etree.tostring(wrapper, encoding="unicode"),
+            response_headers={"content-location": base_url} if base_url else None,
+        )
+        return parsed_feed.entries[0] if parsed_feed.entries else None
+
+
+class FastEntryParser:
+    # Plain Atom 1.0 and RSS 2.0 entries are read directly, everything else
+    # goes through feedparser
+    def __init__(self) -> None:
+        self.fallback = FeedparserEntryParser()
+
+    def parse_entry(
+        self,
+        ancestors: list[etree._Element],
+        entry: etree._Element,
+        base_url: str | None,
+    ) -> feedparser.util.FeedParserDict | None:
+        try:
+            return parse_simple_entry(ancestors, entry, base_url)
+        except UnsupportedEntry as exc:
+            logger.debug(f"Parsing entry with feedparser: {exc}")
+            return self.fallback.parse_entry(ancestors, entry, base_url)
+
+
+ENTRY_PARSER_FACTORIES: dict[str, Callable[[], EntryParser]] = {
+    "feedparser": FeedparserEntryParser,
+    "fast": FastEntryParser,
+}
+
+
+def create_entry_parser(backend: str) -> EntryParser:
+    if backend == "fast":
+        error = (
+            str(_fast_entry_parser_error)
+            if _fast_entry_parser_error is not None
+            else check_fast_entry_parser()
+        )
+        if error is not None:
+            logger.warning(
+                "Parsing entries with feedparser, as the fast parser is not "
+                f"available: {error}"
+            )
+            backend = "feedparser"
+    factory = ENTRY_PARSER_FACTORIES.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown parser backend: {backend}")
+    return factory()
+
+
+@functools.cache
+def check_fast_entry_parser() -> str | None:
+    # The internals imported by the fast parser can also change what they
+    # return within the pinned range. Its entries are compared with feedparser's
+    # for the sample feeds, and the reason it cannot be used is returned.
+    try:
+        for sample in SAMPLE_FEEDS:
+            expected = feedparser.parse(
+                sample, response_headers={"content-location": SAMPLE_BASE_URL}
+            ).entries
+            entries = list(
+                iter_feed_entries([sample], SAMPLE_BASE_URL, FastEntryParser())
+            )
+            if [get_stored_fields(entry) for entry in entries] != [
+                get_stored_fields(entry) for entry in expected
+            ]:
+                return "Its entries differ from feedparser's"
+    except Exception as exc:
+        return f"Failed to parse sample feeds: {exc!r}"
+    return None
+
+
+def get_stored_fields(entry: feedparser.util.FeedParserDict) -> dict[str, Any]:
+    # What store_feed_entries reads of an entry
+    contents = entry.get("content")
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "feedburner_origlink": entry.get("feedburner_origlink"),
+        "updated_parsed": entry.get("updated_parsed"),
+        "published_parsed": entry.get("published_parsed"),
+        "summary": entry.get("summary"),
+        "content": contents[0].get("value") if contents else None,
+    }
+
+
+def collect_feed_link(
+    feed_links: dict[str, str], element: etree._Element, base_url: str | None
+) -> None:
+    rel = element.get("rel")
+    href = element.get("href")
+    if rel in FEED_LINK_RELS and href:
+        # Links already known, e.g. from the HTTP Link header, take precedence
+        feed_links.setdefault(rel, urljoin(base_url or "", href.strip()))
+
+
+def iter_feed_entries(
+    chunks: Iterable[bytes],
+    base_url: str | None = None,
+    entry_parser: EntryParser | None = None,
+    feed_links: dict[str, str] | None = None,
+) -> Iterator[feedparser.util.FeedParserDict]:
+    # Entries are yielded as soon as their closing tag has been read, so the
+    # consumer can stop (and the download with it) once it has seen enough.
+    # Feed level hub and self links are added to feed_links when given.
+    if entry_parser is None:
+        entry_parser = create_entry_parser("fast")
+    parser = etree.XMLPullParser(
+        events=("start", "end"), resolve_entities=False, no_network=True
+    )
+    stack: list[etree._Element] = []
+    # Kept in case the document is not well-formed XML
+    raw = tempfile.SpooledTemporaryFile(max_size=RAW_SPOOL_BYTES)
+    yielded_count = 0
+    chunk_iterator = iter(chunks)
+    try:
+        for chunk in chunk_iterator:
+            raw.write(chunk)
+            parser.feed(chunk)
+            for event, element in parser.read_events():
+                if event == "start":
+                    stack.append(element)
+                    continue
+
+                stack.pop()
+                if (
+                    feed_links is not None
+                    and element.tag == ATOM_LINK
+                    and [ancestor.tag for ancestor in stack]
+                    in (["{http://www.w3.org/2005/Atom}feed"], ["rss", "channel"])
+                ):
+                    collect_feed_link(feed_links, element, base_url)
+                    continue
+                # Entries nested in an entry (e.g. Atom <source>) are part of
+                # the outer one
+                if (
+                    element.tag in ENTRY_TAGS
+                    and stack
+                    and not any(ancestor.tag in ENTRY_TAGS for ancestor in stack)
+                ):
+                    # Processed entries are dropped from the tree
+                    stack[-1].remove(element)
+                    parsed_entry = entry_parser.parse_entry(stack, element, base_url)
+                    if parsed_entry is not None:
+                        yielded_count += 1
+                        yield parsed_entry
+        parser.close()
+    except etree.XMLSyntaxError as exc:
+        # feedparser's lenient parser copes with many broken feeds. It gets
+        # the whole document, and entries already yielded are skipped.
+        logger.info(f"Falling back to feedparser: {exc}")
+        for chunk in chunk_iterator:
+            raw.write(chunk)
+        raw.seek(0)
+        parsed_feed = feedparser.parse(
+            raw.read(),
+            response_headers={"content-location": base_url} if base_url else None,
+        )
+        if feed_links is not None:
+            for link in parsed_feed.feed.get("links", []):
+                if link.get("rel") in FEED_LINK_RELS and link.get("href"):
+                    feed_links.setdefault(link["rel"], link["href"])
+        yield from parsed_feed.entries[yielded_count:]
+    finally:
+        raw.close()
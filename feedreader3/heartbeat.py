@@ -0,0 +1,47 @@
+from sqlmodel import Session
+from sqlalchemy.dialects.postgresql import insert
+from collections import Counter
+from datetime import datetime, timezone
+from .models.worker_heartbeat import WorkerHeartbeat
+import os
+import socket
+
+# Runs that did not happen in this process, by job id. A run is skipped while
+# the previous one of the same job is still running, or missed when it could
+# not start within the misfire grace time. Counted by the scheduler and
+# written with the job's next heartbeat, which every scheduled job records at
+# the end of a run.
+_skipped_runs: Counter[str] = Counter()
+
+
+def count_skipped_run(job_id: str) -> int:
+    _skipped_runs[job_id] += 1
+    return _skipped_runs[job_id]
+
+
+def get_skipped_runs() -> dict[str, int]:
+    return dict(_skipped_runs)
+
+
+def record_worker_heartbeat(session: Session, job_id: str, duration_ms: int) -> None:
+    stmt = insert(WorkerHeartbeat).values(
+        job_id=job_id,
+        hostname=socket.gethostname(),
+        pid=os.getpid(),
+        beat_at=datetime.now(timezone.utc),
+        duration_ms=duration_ms,
+        skipped_runs=_skipped_runs[job_id],
+    )
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["job_id"],
+            set_={
+                "hostname": stmt.excluded.hostname,
+                "pid": stmt.excluded.pid,
+                "beat_at": stmt.excluded.beat_at,
+                "duration_ms": stmt.excluded.duration_ms,
+                "skipped_runs": stmt.excluded.skipped_runs,
+            },
+        )
+    )
+    session.commit()
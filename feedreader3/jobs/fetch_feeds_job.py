@@ -1,86 +1,751 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, func, Column
+from sqlalchemy import ColumnElement, update
+from sqlalchemy.dialects.postgresql import insert
+from typing import Any, Iterable, Iterator, Sequence, cast
+from itertools import batched
+from contextlib import ExitStack
+from dataclasses import dataclass, fields
 import feedparser
-from datetime import datetime, timezone
+from opentelemetry import trace
+from opentelemetry.trace import StatusCode
+from datetime import datetime, timezone, timedelta
 from ..database import get_engine
-from ..models.feed_source import FeedSource
+from ..feed_archive import ArchiveWriter, get_feed_archive
+from ..heartbeat import record_worker_heartbeat
+from ..feed_fetcher import FeedFetchError, FetchLimits, is_http_url, open_feed
+from ..feed_parser import EntryParser, create_entry_parser, iter_feed_entries
+from ..refresh_queue import complete_refresh_request, get_next_refresh_request
+from ..settings import get_settings
+from ..links import canonicalize_link, hash_link
+from .websub_job import (
+    is_pushed_recently,
+    renew_websub_subscriptions,
+    subscribe_feed_source,
+)
+from ..profiling import (
+    fetch_profiling,
+    get_rss_bytes,
+    get_rss_diff_bytes,
+    memory_profiling,
+)
+from ..models.feed_source import FeedSource, is_feed_source_deleted
 from ..models.feed_entry import FeedEntry, FeedEntryUpdate, FeedEntryCreate
+from ..models.feed_entry_content import FeedEntryContent, compress_text
+from ..models.feed_source_stats import FeedSourceStats
+from ..models.translation import hash_text
 import logging
+import random
+import time
 
 logger = logging.getLogger(__name__)
+tracer = trace.get_tracer(__name__)
 
+STORE_BATCH_SIZE = 20
 
-def fetch_feeds_job() -> None:
-    logger.info("start fetch_feed_job")
+# Advisory lock class of the per-source lock held while a source is fetched.
+# Shards, refresh_feeds_job and other workers never fetch the same source at
+# once, and purge_feed_sources_job does not remove a source while entries are
+# being stored for it.
+FEED_SOURCE_LOCK = 1
+
+
+@dataclass
+class FeedEntryCounts:
+    new: int = 0
+    updated: int = 0
+    # Entries that were in the feed again without any change
+    unchanged: int = 0
+    skipped_duplicates: int = 0
+    # Compressed size of the entry bodies written
+    stored_bytes: int = 0
+
+    def add(self, other: "FeedEntryCounts") -> None:
+        for field in fields(self):
+            setattr(
+                self, field.name, getattr(self, field.name) + getattr(other, field.name)
+            )
+
+
+def fetch_feeds_job(shard: int = 0, shard_count: int = 1) -> None:
+    start = time.perf_counter()
+    rss_before = get_rss_bytes()
+    with (
+        tracer.start_as_current_span(
+            "fetch_feeds_job",
+            attributes={
+                "feedreader3.shard": shard,
+                "feedreader3.shard_count": shard_count,
+            },
+        ) as span,
+        fetch_profiling(),
+        memory_profiling(f"fetch_feeds_job:{shard}"),
+        Session(get_engine()) as session,
+    ):
+        counts = fetch_feeds(session, shard, shard_count)
+        span.set_attributes(get_entry_count_attributes(counts))
+        duration_ms = round((time.perf_counter() - start) * 1000)
+        record_worker_heartbeat(session, f"fetch_feeds_job:{shard}", duration_ms)
+    # One record per cycle of each shard. The RSS is the process's, so the
+    # change includes shards and jobs that ran at the same time.
+    rss_after = get_rss_bytes()
+    logger.info(
+        "Fetch cycle finished",
+        extra={
+            **vars(counts),
+            "shard": shard,
+            "shard_count": shard_count,
+            "duration_ms": duration_ms,
+            "rss_bytes": rss_after,
+            "rss_diff_bytes": get_rss_diff_bytes(rss_before, rss_after),
+        },
+    )
+
+
+def refresh_feeds_job() -> None:
+    start = time.perf_counter()
+    settings = get_settings()
+    counts = FeedEntryCounts()
     with Session(get_engine()) as session:
-        fetch_feeds(session)
-    logger.info("end fetch_feed_job")
+        refreshed_ids = drain_refresh_queue(
+            session,
+            create_fetch_limits(),
+            create_entry_parser(settings.fetch_parser_backend),
+            counts,
+        )
+        duration_ms = round((time.perf_counter() - start) * 1000)
+        record_worker_heartbeat(session, "refresh_feeds_job", duration_ms)
+    if refreshed_ids:
+        logger.info(
+            "Refresh queue drained",
+            extra={
+                **vars(counts),
+                "refreshed": len(refreshed_ids),
+                "duration_ms": duration_ms,
+            },
+        )
 
 
-def fetch_feeds(session: Session) -> None:
-    feed_sources = session.exec(select(FeedSource)).all()
-    for feed_source in feed_sources:
-        parsed_feed = feedparser.parse(feed_source.feed_url)
-        if parsed_feed.entries is not None:
-            store_feed_entries(session, feed_source, parsed_feed.entries)
+def renew_websub_subscriptions_job() -> None:
+    start = time.perf_counter()
+    settings = get_settings()
+    with Session(get_engine()) as session:
+        if settings.websub_callback_url is not None:
+            renew_websub_subscriptions(
+                session,
+                settings.websub_callback_url,
+                settings.websub_lease_seconds,
+                settings.websub_renew_before_seconds,
+                create_fetch_limits(),
+            )
+        duration_ms = round((time.perf_counter() - start) * 1000)
+        record_worker_heartbeat(session, "renew_websub_subscriptions_job", duration_ms)
 
 
-def store_feed_entries(
-    session: Session,
-    feed_source: FeedSource,
-    parsed_entries: list[feedparser.util.FeedParserDict],
-) -> None:
-    for parsed_entry in parsed_entries:
-        if parsed_entry.get("link") is None:
+def create_fetch_limits() -> FetchLimits:
+    settings = get_settings()
+    return FetchLimits(
+        max_bytes=settings.fetch_max_bytes,
+        connect_timeout=settings.fetch_connect_timeout,
+        read_timeout=settings.fetch_read_timeout,
+        total_timeout=settings.fetch_total_timeout,
+    )
+
+
+def fetch_feeds(
+    session: Session, shard: int = 0, shard_count: int = 1
+) -> FeedEntryCounts:
+    settings = get_settings()
+    start = time.perf_counter()
+    with tracer.start_as_current_span("backfill_feed_source_stats"):
+        backfill_feed_source_stats(session)
+    limits = create_fetch_limits()
+    now = datetime.now(timezone.utc)
+    # Each shard fetches the sources whose id falls to it
+    statement = (
+        select(FeedSource.id)
+        .outerjoin(
+            FeedSourceStats,
+            cast(Column[int], FeedSourceStats.feed_source_id)
+            == cast(Column[int], FeedSource.id),
+        )
+        .where(
+            cast(Column[datetime | None], FeedSource.deleted_at).is_(None),
+            cast(Column[int], FeedSource.id) % shard_count == shard,
+        )
+        .order_by(
+            get_fetch_urgency(now).desc().nulls_first(),
+            cast(Column[int], FeedSource.id),
+        )
+    )
+    if settings.websub_callback_url is not None:
+        statement = statement.where(
+            ~is_pushed_recently(
+                now, timedelta(hours=settings.websub_poll_interval_hours)
+            )
+        )
+    # Only the ids are held for the whole cycle. Each source is loaded when its
+    # turn comes, and the identity map only holds objects weakly, so the source
+    # and its entries are freed once it has been fetched.
+    with tracer.start_as_current_span("select_feed_sources") as span:
+        feed_source_ids = session.exec(statement).all()
+        span.set_attribute("feedreader3.feed_sources", len(feed_source_ids))
+    entry_parser = create_entry_parser(settings.fetch_parser_backend)
+    total_counts = FeedEntryCounts()
+    # Requested refreshes go ahead of the scheduled sources, and the queue is
+    # checked again before each of them
+    refreshed_ids = drain_refresh_queue(session, limits, entry_parser, total_counts)
+    for i, feed_source_id in enumerate(feed_source_ids):
+        if is_fetch_budget_spent(start, settings.fetch_cycle_budget_seconds):
+            log_carried_over(feed_source_ids[i:], refreshed_ids, shard)
+            break
+        refreshed_ids |= drain_refresh_queue(
+            session, limits, entry_parser, total_counts
+        )
+        if feed_source_id in refreshed_ids:
+            continue
+        feed_source = session.get(FeedSource, feed_source_id)
+        if feed_source is None:
             continue
+        counts = fetch_feed_source(session, feed_source, limits, entry_parser)
+        if counts is not None:
+            total_counts.add(counts)
+    return total_counts
+
+
+def get_fetch_urgency(now: datetime) -> ColumnElement[Any]:
+    # Seconds since the source was last tried, weighted by its priority. NULL
+    # for a source that has never been tried. Failed fetches count as tries,
+    # so that a dead feed does not stay ahead of every other source.
+    last_attempted_at = func.coalesce(
+        FeedSourceStats.last_attempted_at, FeedSourceStats.last_fetched_at
+    )
+    return func.extract("epoch", now - last_attempted_at) * cast(
+        Column[float], FeedSource.fetch_priority
+    )
+
 
-        entry_id = parsed_entry.get("id") or parsed_entry.get("link")
-        if entry_id is None:
+def is_fetch_budget_spent(start: float, budget_seconds: float) -> bool:
+    return budget_seconds > 0 and time.perf_counter() - start >= budget_seconds
+
+
+def log_carried_over(
+    feed_source_ids: Sequence[int | None], refreshed_ids: set[int], shard: int
+) -> None:
+    # The sources left are the most urgent ones of the next cycle, as they
+    # keep their last_attempted_at and only grow staler
+    carried_over = sum(1 for id in feed_source_ids if id not in refreshed_ids)
+    trace.get_current_span().set_attribute("feedreader3.carried_over", carried_over)
+    logger.warning(
+        "Fetch cycle budget spent",
+        extra={"shard": shard, "carried_over": carried_over},
+    )
+
+
+def drain_refresh_queue(
+    session: Session,
+    limits: FetchLimits,
+    entry_parser: EntryParser,
+    total_counts: FeedEntryCounts,
+) -> set[int]:
+    refreshed_ids: set[int] = set()
+    # One request at a time, so that a higher priority request queued
+    # meanwhile is taken next. A request whose source is being fetched
+    # elsewhere stays queued for the next drain.
+    while (
+        feed_source_id := get_next_refresh_request(session, refreshed_ids)
+    ) is not None:
+        refreshed_ids.add(feed_source_id)
+        feed_source = session.get(FeedSource, feed_source_id)
+        if feed_source is None or feed_source.deleted_at is not None:
+            complete_refresh_request(session, feed_source_id)
+            session.commit()
             continue
+        counts = fetch_feed_source(session, feed_source, limits, entry_parser)
+        if counts is not None:
+            total_counts.add(counts)
+    return refreshed_ids
+
+
+def fetch_feed_source(
+    session: Session,
+    feed_source: FeedSource,
+    limits: FetchLimits,
+    entry_parser: EntryParser,
+) -> FeedEntryCounts | None:
+    feed_source_id = cast(int, feed_source.id)
+    record_fetch_attempt(session, feed_source_id)
+    if not lock_feed_source(session, feed_source_id):
+        return None
+    # A pending refresh is answered by this fetch, and deleted along with the
+    # entries it stores
+    complete_refresh_request(session, feed_source_id)
+    with tracer.start_as_current_span(
+        "fetch_feed_source",
+        attributes={
+            "feedreader3.feed_source.id": feed_source_id,
+            "url.full": feed_source.feed_url,
+        },
+    ):
+        counts = fetch_locked_feed_source(session, feed_source, limits, entry_parser)
+    if counts is None:
+        # A failed fetch answers it as well, or it would be retried by every
+        # drain
+        complete_refresh_request(session, feed_source_id)
+        session.commit()
+    return counts
 
-        if parsed_entry.get("updated_parsed") is not None:
-            # feedparser returns UTC datetime
-            entry_updated_at = datetime(
-                parsed_entry.updated_parsed[0],
-                parsed_entry.updated_parsed[1],
-                parsed_entry.updated_parsed[2],
-                parsed_entry.updated_parsed[3],
-                parsed_entry.updated_parsed[4],
-                parsed_entry.updated_parsed[5],
-                tzinfo=timezone.utc,
+
+def fetch_locked_feed_source(
+    session: Session,
+    feed_source: FeedSource,
+    limits: FetchLimits,
+    entry_parser: EntryParser,
+) -> FeedEntryCounts | None:
+    settings = get_settings()
+    span = trace.get_current_span()
+    start = time.perf_counter()
+    feed_url = feed_source.feed_url
+    archive = get_feed_archive()
+    try:
+        with ExitStack() as stack:
+            stream = stack.enter_context(open_feed(feed_url, limits))
+            writer = (
+                None if archive is None else stack.enter_context(archive.open_writer())
             )
-        else:
-            entry_updated_at = None
+            chunks = stream if writer is None else write_chunks(stream, writer)
+            # Entries are stored while the feed is still being read
+            counts = store_feed_entries(
+                session,
+                feed_source,
+                iter_feed_entries(
+                    chunks,
+                    feed_url if is_http_url(feed_url) else None,
+                    entry_parser,
+                    stream.links,
+                ),
+                skip_duplicate_entries=settings.fetch_skip_duplicate_entries,
+                entry_log_sample_rate=settings.log_entry_sample_rate,
+                stop_after_unchanged=settings.fetch_stop_after_unchanged,
+            )
+            if writer is not None:
+                # The archive keeps whole documents, so the part of the feed
+                # that was left unread is downloaded as well
+                for _ in chunks:
+                    pass
+                writer.commit(cast(int, feed_source.id), feed_url)
+    except (FeedFetchError, OSError) as exc:
+        session.rollback()
+        span.record_exception(exc)
+        span.set_status(StatusCode.ERROR, str(exc))
+        logger.warning(
+            "Failed to fetch feed",
+            extra={
+                "feed_source_id": feed_source.id,
+                "feed_source": feed_source.name,
+                "error": str(exc),
+            },
+        )
+        return None
+    end = time.perf_counter()
+    if stream.status_code is not None:
+        span.set_attribute("http.response.status_code", stream.status_code)
+    span.set_attributes(
+        {
+            "feedreader3.fetched_bytes": stream.fetched_bytes,
+            **get_entry_count_attributes(counts),
+        }
+    )
+    # One record per source instead of one per entry
+    logger.info(
+        "Fetched feed",
+        extra={
+            "feed_source_id": feed_source.id,
+            "feed_source": feed_source.name,
+            **vars(counts),
+            "fetched_bytes": stream.fetched_bytes,
+            "duration_ms": round((end - start) * 1000),
+        },
+    )
+    if settings.websub_callback_url is not None:
+        subscribe_feed_source(
+            session,
+            feed_source,
+            stream.links,
+            settings.websub_callback_url,
+            settings.websub_lease_seconds,
+            limits,
+        )
+    return counts
+
 
-        entry_title = parsed_entry.get("title", "")
+def get_entry_count_attributes(counts: FeedEntryCounts) -> dict[str, int]:
+    return {f"feedreader3.entries.{key}": value for key, value in vars(counts).items()}
 
-        db_feed_entry = session.exec(
-            select(FeedEntry).where(
-                FeedEntry.feed_source_id == feed_source.id,
-                FeedEntry.entry_id == entry_id,
+
+def write_chunks(chunks: Iterable[bytes], writer: ArchiveWriter) -> Iterator[bytes]:
+    for chunk in chunks:
+        writer.write(chunk)
+        yield chunk
+
+
+def lock_feed_source(
+    session: Session, feed_source_id: int, include_deleted: bool = False
+) -> bool:
+    # Held until the transaction ends, which for a fetch is when the entries
+    # are committed. A source that is being fetched elsewhere right now is
+    # skipped, and so is one deleted meanwhile.
+    locked = session.execute(
+        select(func.pg_try_advisory_xact_lock(FEED_SOURCE_LOCK, feed_source_id))
+    ).scalar_one()
+    if locked and (
+        include_deleted
+        or session.exec(
+            select(FeedSource.id).where(
+                FeedSource.id == feed_source_id,
+                cast(Column[datetime | None], FeedSource.deleted_at).is_(None),
             )
-        ).one_or_none()
-        # Insert new entry
-        if db_feed_entry is None:
-            feed_entry_create = FeedEntryCreate(
-                first_seen_at=datetime.now(timezone.utc),
-                feed_source_id=feed_source.id,
-                entry_id=entry_id,
-                entry_title=entry_title,
-                entry_link=parsed_entry.link,
-                entry_updated_at=entry_updated_at,
+        ).first()
+        is not None
+    ):
+        return True
+    session.rollback()
+    return False
+
+
+def backfill_feed_source_stats(session: Session) -> None:
+    # Sources created since the last run, or stored before the stats table
+    # existed, get their counters from a single aggregate. Sources that already
+    # have a stats row are never scanned again.
+    insert_missing_feed_source_stats(session)
+    session.commit()
+
+
+def insert_missing_feed_source_stats(
+    session: Session, feed_source_id: int | None = None
+) -> None:
+    # A stats row is only ever incremented after it exists, so it starts from
+    # the entries already stored, whichever path creates it first
+    feed_source_id_col = cast(Column[int], FeedSource.id)
+    ts = func.coalesce(FeedEntry.entry_updated_at, FeedEntry.first_seen_at)
+    query = (
+        select(
+            feed_source_id_col,
+            func.count(cast(Column[int], FeedEntry.id)),
+            func.max(ts),
+            func.max(FeedEntry.first_seen_at),
+        )
+        .outerjoin(
+            FeedEntry,
+            cast(Column[int], FeedEntry.feed_source_id) == feed_source_id_col,
+        )
+        .where(
+            ~select(FeedSourceStats.feed_source_id)
+            .where(FeedSourceStats.feed_source_id == feed_source_id_col)
+            .exists()
+        )
+        .group_by(feed_source_id_col)
+    )
+    if feed_source_id is not None:
+        query = query.where(feed_source_id_col == feed_source_id)
+    session.execute(
+        insert(FeedSourceStats)
+        .from_select(
+            ["feed_source_id", "entry_count", "last_entry_at", "last_new_entry_at"],
+            query,
+        )
+        .on_conflict_do_nothing()
+    )
+
+
+def update_feed_source_stats(
+    session: Session,
+    feed_source: FeedSource,
+    new_entry_count: int,
+    last_entry_at: datetime | None,
+    fetched_at: datetime,
+) -> None:
+    # Upsert so that concurrent workers add to the counters instead of
+    # overwriting each other
+    stmt = insert(FeedSourceStats).values(
+        feed_source_id=feed_source.id,
+        entry_count=new_entry_count,
+        last_entry_at=last_entry_at,
+        last_fetched_at=fetched_at,
+        last_new_entry_at=fetched_at if new_entry_count > 0 else None,
+    )
+    table = stmt.table.c
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["feed_source_id"],
+            set_={
+                "entry_count": table.entry_count + stmt.excluded.entry_count,
+                # GREATEST ignores NULLs
+                "last_entry_at": func.greatest(
+                    table.last_entry_at, stmt.excluded.last_entry_at
+                ),
+                "last_fetched_at": stmt.excluded.last_fetched_at,
+                "last_new_entry_at": func.greatest(
+                    table.last_new_entry_at, stmt.excluded.last_new_entry_at
+                ),
+            },
+        )
+    )
+
+
+def record_fetch_attempt(session: Session, feed_source_id: int) -> None:
+    # Committed on its own, as a failed fetch rolls its transaction back. A
+    # source purged meanwhile gets no stats row.
+    insert_missing_feed_source_stats(session, feed_source_id)
+    session.execute(
+        update(FeedSourceStats)
+        .where(cast(Column[int], FeedSourceStats.feed_source_id) == feed_source_id)
+        .values(last_attempted_at=datetime.now(timezone.utc))
+    )
+    session.commit()
+
+
+def get_canonical_link_hash(parsed_entry: feedparser.util.FeedParserDict) -> int:
+    # Proxies such as FeedBurner record the redirect target in the feed itself
+    link = parsed_entry.get("feedburner_origlink") or parsed_entry.link
+    return hash_link(canonicalize_link(link))
+
+
+def find_duplicate_link_hashes(
+    session: Session,
+    feed_source: FeedSource,
+    parsed_entries: Sequence[feedparser.util.FeedParserDict],
+) -> set[int]:
+    link_hashes = {
+        get_canonical_link_hash(parsed_entry)
+        for parsed_entry in parsed_entries
+        if parsed_entry.get("link") is not None
+    }
+    if not link_hashes:
+        return set()
+    canonical_link_hash = cast(Column[int], FeedEntry.canonical_link_hash)
+    return set(
+        session.exec(
+            select(canonical_link_hash)
+            .where(
+                canonical_link_hash.in_(link_hashes),
+                FeedEntry.feed_source_id != feed_source.id,
+                ~is_feed_source_deleted(FeedEntry.feed_source_id),
             )
-            db_feed_entry = FeedEntry.model_validate(feed_entry_create)
-            session.add(db_feed_entry)
-            logger.info(f"Source: {feed_source.name}, New entry: {entry_title}")
-        # Update the entry
-        else:
-            feed_entry_update = FeedEntryUpdate(
-                entry_title=entry_title,
-                entry_link=parsed_entry.link,
-                entry_updated_at=entry_updated_at,
+            .distinct()
+        ).all()
+    )
+
+
+def find_feed_entries(
+    session: Session, feed_source: FeedSource, entry_ids: set[str]
+) -> dict[str, FeedEntry]:
+    db_feed_entries = session.exec(
+        select(FeedEntry).where(
+            FeedEntry.feed_source_id == feed_source.id,
+            cast(Column[str], FeedEntry.entry_id).in_(entry_ids),
+        )
+    ).all()
+    return {db_feed_entry.entry_id: db_feed_entry for db_feed_entry in db_feed_entries}
+
+
+def get_entry_id(parsed_entry: feedparser.util.FeedParserDict) -> str | None:
+    if parsed_entry.get("link") is None:
+        return None
+    entry_id: str | None = parsed_entry.get("id") or parsed_entry.get("link")
+    return entry_id
+
+
+def store_feed_entries(
+    session: Session,
+    feed_source: FeedSource,
+    parsed_entries: Iterable[feedparser.util.FeedParserDict],
+    skip_duplicate_entries: bool = False,
+    entry_log_sample_rate: float = 0.0,
+    stop_after_unchanged: int = 0,
+) -> FeedEntryCounts:
+    fetched_at = datetime.now(timezone.utc)
+    counts = FeedEntryCounts()
+    last_entry_at: datetime | None = None
+    # Counted before any entry of this call is inserted, which the stats update
+    # at the end adds on top. WebSub deliveries do not record a fetch attempt.
+    insert_missing_feed_source_stats(session, feed_source.id)
+    # Entries stored by this call are remembered as well, so that an id
+    # repeated within the feed updates the entry instead of inserting it twice
+    db_feed_entries: dict[str, FeedEntry] = {}
+    consecutive_unchanged = 0
+    # Only feeds seen to list their entries newest first are cut short
+    newest_first = True
+    previous_updated_at: datetime | None = None
+    storable_entries = (
+        (entry_id, parsed_entry)
+        for parsed_entry in parsed_entries
+        if (entry_id := get_entry_id(parsed_entry)) is not None
+    )
+    # Two queries per batch instead of one per entry, while only a batch of
+    # parsed entries is held at a time
+    for batch in batched(storable_entries, STORE_BATCH_SIZE):
+        entry_ids = {entry_id for entry_id, _ in batch} - db_feed_entries.keys()
+        if entry_ids:
+            db_feed_entries.update(find_feed_entries(session, feed_source, entry_ids))
+        duplicate_link_hashes = (
+            find_duplicate_link_hashes(
+                session, feed_source, [parsed_entry for _, parsed_entry in batch]
             )
-            dump = feed_entry_update.model_dump(exclude_unset=True)
-            db_feed_entry.sqlmodel_update(dump)
-            logger.info(f"Source: {feed_source.name}, Updated entry: {entry_title}")
+            if skip_duplicate_entries
+            else set()
+        )
+
+        for entry_id, parsed_entry in batch:
+            if parsed_entry.get("updated_parsed") is not None:
+                # feedparser returns UTC datetime
+                entry_updated_at = datetime(
+                    parsed_entry.updated_parsed[0],
+                    parsed_entry.updated_parsed[1],
+                    parsed_entry.updated_parsed[2],
+                    parsed_entry.updated_parsed[3],
+                    parsed_entry.updated_parsed[4],
+                    parsed_entry.updated_parsed[5],
+                    tzinfo=timezone.utc,
+                )
+            else:
+                entry_updated_at = None
+            if entry_updated_at is None or (
+                previous_updated_at is not None
+                and entry_updated_at > previous_updated_at
+            ):
+                newest_first = False
+            previous_updated_at = entry_updated_at
+
+            entry_title = parsed_entry.get("title", "")
+            canonical_link_hash = get_canonical_link_hash(parsed_entry)
+            entry_title_hash = hash_text(entry_title)
+            entry_summary = parsed_entry.get("summary")
+            contents = parsed_entry.get("content")
+            entry_content = contents[0].get("value") if contents else None
+
+            db_feed_entry = db_feed_entries.get(entry_id)
+            # Insert new entry
+            if db_feed_entry is None:
+                consecutive_unchanged = 0
+                if canonical_link_hash in duplicate_link_hashes:
+                    counts.skipped_duplicates += 1
+                    log_entry(
+                        feed_source,
+                        "skipped_duplicate",
+                        entry_title,
+                        entry_log_sample_rate,
+                    )
+                    continue
+                feed_entry_create = FeedEntryCreate(
+                    first_seen_at=datetime.now(timezone.utc),
+                    feed_source_id=feed_source.id,
+                    entry_id=entry_id,
+                    entry_title=entry_title,
+                    entry_link=parsed_entry.link,
+                    entry_updated_at=entry_updated_at,
+                    canonical_link_hash=canonical_link_hash,
+                    entry_title_hash=entry_title_hash,
+                )
+                db_feed_entry = FeedEntry.model_validate(feed_entry_create)
+                if entry_summary is not None or entry_content is not None:
+                    db_feed_entry.entry_content = FeedEntryContent(
+                        summary=compress_text(entry_summary),
+                        content=compress_text(entry_content),
+                    )
+                    counts.stored_bytes += get_stored_bytes(db_feed_entry.entry_content)
+                session.add(db_feed_entry)
+                db_feed_entries[entry_id] = db_feed_entry
+                counts.new += 1
+                log_entry(feed_source, "new", entry_title, entry_log_sample_rate)
+            # Update the entry
+            else:
+                changed = (
+                    db_feed_entry.entry_title,
+                    db_feed_entry.entry_link,
+                    db_feed_entry.entry_updated_at,
+                ) != (entry_title, parsed_entry.link, entry_updated_at)
+                # Loading the stored body costs a query, so only rewrite it when
+                # the feed says the entry has changed.
+                if db_feed_entry.entry_updated_at != entry_updated_at:
+                    store_feed_entry_content(
+                        db_feed_entry, entry_summary, entry_content
+                    )
+                    if db_feed_entry.entry_content is not None:
+                        counts.stored_bytes += get_stored_bytes(
+                            db_feed_entry.entry_content
+                        )
+                feed_entry_update = FeedEntryUpdate(
+                    entry_title=entry_title,
+                    entry_link=parsed_entry.link,
+                    entry_updated_at=entry_updated_at,
+                    canonical_link_hash=canonical_link_hash,
+                    entry_title_hash=entry_title_hash,
+                )
+                dump = feed_entry_update.model_dump(exclude_unset=True)
+                db_feed_entry.sqlmodel_update(dump)
+                if changed:
+                    consecutive_unchanged = 0
+                    counts.updated += 1
+                    log_entry(
+                        feed_source, "updated", entry_title, entry_log_sample_rate
+                    )
+                else:
+                    consecutive_unchanged += 1
+                    counts.unchanged += 1
 
+            entry_at = db_feed_entry.entry_updated_at or db_feed_entry.first_seen_at
+            if last_entry_at is None or entry_at > last_entry_at:
+                last_entry_at = entry_at
+
+            # In a feed listing the newest entries first, a run of entries that
+            # are already stored as they are means the rest of the feed is old.
+            # Returning stops reading it. Entries without a date, or dated
+            # later than one before them, keep the feed read to the end.
+            if newest_first and 0 < stop_after_unchanged <= consecutive_unchanged:
+                break
+        if newest_first and 0 < stop_after_unchanged <= consecutive_unchanged:
+            break
+
+    update_feed_source_stats(
+        session, feed_source, counts.new, last_entry_at, fetched_at
+    )
     session.commit()
+    return counts
+
+
+def log_entry(
+    feed_source: FeedSource, action: str, entry_title: str, sample_rate: float
+) -> None:
+    # Per-entry records are sampled. With the default rate of 0 nothing is
+    # formatted or enqueued.
+    if sample_rate <= 0 or random.random() >= sample_rate:
+        return
+    logger.info(
+        "Stored entry",
+        extra={
+            "feed_source_id": feed_source.id,
+            "feed_source": feed_source.name,
+            "action": action,
+            "entry_title": entry_title,
+            "sample_rate": sample_rate,
+        },
+    )
+
+
+def get_stored_bytes(feed_entry_content: FeedEntryContent) -> int:
+    return len(feed_entry_content.summary or b"") + len(
+        feed_entry_content.content or b""
+    )
+
+
+def store_feed_entry_content(
+    db_feed_entry: FeedEntry, entry_summary: str | None, entry_content: str | None
+) -> None:
+    db_feed_entry_content = db_feed_entry.entry_content
+    if db_feed_entry_content is None:
+        if entry_summary is None and entry_content is None:
+            return
+        db_feed_entry_content = FeedEntryContent()
+        db_feed_entry.entry_content = db_feed_entry_content
+    db_feed_entry_content.summary = compress_text(entry_summary)
+    db_feed_entry_content.content = compress_text(entry_content)
@@ -0,0 +1,86 @@
+from sqlmodel import Session, select, Column
+from sqlalchemy import ColumnElement
+from datetime import datetime
+from typing import cast
+import numpy as np
+from ..models.feed_entry import FeedEntry
+from ..models.feed_entry_content import FeedEntryContent, decompress_text
+from ..recommendation.features import vectorize
+from ..recommendation.index import RecommendationIndex
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def index_feed_entries(
+    session: Session, index: RecommendationIndex, since: datetime, batch_size: int
+) -> int:
+    # Everything above the highest indexed id is new. A fetch only commits its
+    # entries at its end though, so ids taken by a slower fetch can become
+    # visible after higher ones were indexed. Recently updated entries are
+    # checked again for those, so since has to reach back further than a fetch
+    # transaction is open. Updated entries keep the vector of their first
+    # version.
+    id_col = cast(Column[int], FeedEntry.id)
+    rescanned_ids = np.array(
+        session.exec(
+            select(id_col).where(
+                cast(Column[datetime], FeedEntry.updated_at) >= since,
+                id_col <= index.max_entry_id,
+            )
+        ).all(),
+        dtype=np.int64,
+    )
+    missed_ids = rescanned_ids[~index.contains(rescanned_ids)].tolist()
+    indexed_count = 0
+    for start in range(0, len(missed_ids), batch_size):
+        indexed_count += add_feed_entries(
+            session,
+            index,
+            id_col.in_(missed_ids[start : start + batch_size]),
+            batch_size,
+        )
+
+    while True:
+        added_count = add_feed_entries(
+            session, index, id_col > index.max_entry_id, batch_size
+        )
+        if added_count == 0:
+            break
+        indexed_count += added_count
+
+    if indexed_count > 0:
+        index.publish()
+    logger.info(f"Indexed {indexed_count} entries for recommendation")
+    return indexed_count
+
+
+def add_feed_entries(
+    session: Session,
+    index: RecommendationIndex,
+    condition: ColumnElement[bool],
+    batch_size: int,
+) -> int:
+    id_col = cast(Column[int], FeedEntry.id)
+    rows = session.exec(
+        select(id_col, FeedEntry.entry_title, FeedEntryContent.summary)
+        .outerjoin(
+            FeedEntryContent,
+            cast(Column[int], FeedEntryContent.feed_entry_id) == id_col,
+        )
+        .where(condition)
+        .order_by(id_col)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0
+
+    texts = [
+        f"{entry_title} {decompress_text(summary) or ''}"
+        for _, entry_title, summary in rows
+    ]
+    index.add(
+        np.array([feed_entry_id for feed_entry_id, _, _ in rows], dtype=np.int64),
+        vectorize(texts, index.dim),
+    )
+    return len(rows)
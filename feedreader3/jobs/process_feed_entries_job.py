@@ -0,0 +1,64 @@
+from sqlmodel import Session
+from datetime import datetime, timezone, timedelta
+from ..database import get_engine
+from ..heartbeat import record_worker_heartbeat
+from ..settings import get_settings
+from ..translators import create_translator
+from ..recommendation.index import RecommendationIndex, get_recommendation_index
+from .translate_feed_entries_job import translate_feed_entries
+from .index_feed_entries_job import index_feed_entries
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def process_feed_entries_job() -> None:
+    # Runs apart from the fetch shards, so that the index has a single writer
+    start = time.perf_counter()
+    with Session(get_engine()) as session:
+        translated_count = translate_fetched_feed_entries(session)
+        translated = time.perf_counter()
+        indexed_count = 0
+        index = get_recommendation_index()
+        if index is not None:
+            indexed_count = index_recommended_feed_entries(session, index)
+        end = time.perf_counter()
+        record_worker_heartbeat(
+            session, "process_feed_entries_job", round((end - start) * 1000)
+        )
+    if translated_count or indexed_count:
+        logger.info(
+            "Processed feed entries",
+            extra={
+                "translated": translated_count,
+                "indexed": indexed_count,
+                "translate_ms": round((translated - start) * 1000),
+                "index_ms": round((end - translated) * 1000),
+                "duration_ms": round((end - start) * 1000),
+            },
+        )
+
+
+def index_recommended_feed_entries(session: Session, index: RecommendationIndex) -> int:
+    settings = get_settings()
+    since = datetime.now(timezone.utc) - timedelta(
+        hours=settings.recommendation_lookback_hours
+    )
+    return index_feed_entries(session, index, since, settings.recommendation_batch_size)
+
+
+def translate_fetched_feed_entries(session: Session) -> int:
+    settings = get_settings()
+    translator = create_translator(settings.translation_backend)
+    if translator is None:
+        return 0
+    since = datetime.now(timezone.utc) - timedelta(
+        hours=settings.translation_lookback_hours
+    )
+    return sum(
+        translate_feed_entries(
+            session, translator, target_lang, since, settings.translation_batch_size
+        )
+        for target_lang in settings.translation_target_langs
+    )
@@ -0,0 +1,108 @@
+from sqlmodel import Session, select, delete, update, Column
+from typing import cast
+from datetime import datetime
+from ..database import get_engine
+from ..heartbeat import record_worker_heartbeat
+from ..settings import get_settings
+from ..models.feed_source import FeedSource
+from ..models.feed_entry import FeedEntry
+from ..models.feed_source_stats import FeedSourceStats
+from .fetch_feeds_job import lock_feed_source
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_LOG_INTERVAL_SECONDS = 10
+
+
+def purge_feed_sources_job() -> None:
+    start = time.perf_counter()
+    with Session(get_engine()) as session:
+        purge_feed_sources(session, get_settings().purge_batch_size)
+        duration_ms = round((time.perf_counter() - start) * 1000)
+        record_worker_heartbeat(session, "purge_feed_sources_job", duration_ms)
+
+
+def purge_feed_sources(session: Session, batch_size: int) -> int:
+    deleted_at = cast(Column[datetime | None], FeedSource.deleted_at)
+    feed_sources = session.exec(
+        select(FeedSource).where(deleted_at.is_not(None)).order_by(deleted_at)
+    ).all()
+    purged_count = 0
+    for feed_source in feed_sources:
+        if purge_feed_source(session, feed_source, batch_size):
+            purged_count += 1
+    return purged_count
+
+
+def purge_feed_source(
+    session: Session, feed_source: FeedSource, batch_size: int
+) -> bool:
+    start = time.perf_counter()
+    feed_source_id = cast(int, feed_source.id)
+    name = feed_source.name
+    id_col = cast(Column[int], FeedEntry.id)
+    stats_feed_source_id = cast(Column[int], FeedSourceStats.feed_source_id)
+    entry_count = cast(Column[int], FeedSourceStats.entry_count)
+    deleted_count = 0
+    logged_at = start
+    # One small transaction per chunk, so that the rows and locks of a large
+    # source are never held at once and readers are not blocked. Contents go
+    # with their entries by ON DELETE CASCADE.
+    while True:
+        chunk = (
+            select(id_col)
+            .where(FeedEntry.feed_source_id == feed_source_id)
+            .limit(batch_size)
+            .scalar_subquery()
+        )
+        deleted_ids = session.execute(
+            delete(FeedEntry).where(id_col.in_(chunk)).returning(id_col)
+        ).all()
+        if not deleted_ids:
+            break
+        # The counter left in the stats row is the number still to delete
+        remaining = session.execute(
+            update(FeedSourceStats)
+            .where(stats_feed_source_id == feed_source_id)
+            .values(entry_count=entry_count - len(deleted_ids))
+            .returning(entry_count)
+        ).scalar_one_or_none()
+        session.commit()
+        deleted_count += len(deleted_ids)
+
+        now = time.perf_counter()
+        if now - logged_at >= PROGRESS_LOG_INTERVAL_SECONDS:
+            logged_at = now
+            logger.info(
+                "Purging feed source",
+                extra={
+                    "feed_source_id": feed_source_id,
+                    "feed_source": name,
+                    "deleted_entries": deleted_count,
+                    "remaining_entries": remaining,
+                    "duration_ms": round((now - start) * 1000),
+                },
+            )
+
+    # Entries may still be stored for the source by a fetch that started
+    # before it was deleted. The source row is removed when it is not being
+    # fetched, and the next run tries again otherwise.
+    if not lock_feed_source(session, feed_source_id, include_deleted=True):
+        return False
+    # The rest (stats, and entries stored meanwhile) goes by ON DELETE CASCADE
+    session.execute(
+        delete(FeedSource).where(cast(Column[int], FeedSource.id) == feed_source_id)
+    )
+    session.commit()
+    logger.info(
+        "Purged feed source",
+        extra={
+            "feed_source_id": feed_source_id,
+            "feed_source": name,
+            "deleted_entries": deleted_count,
+            "duration_ms": round((time.perf_counter() - start) * 1000),
+        },
+    )
+    return True
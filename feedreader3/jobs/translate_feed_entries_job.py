@@ -0,0 +1,72 @@
+from sqlmodel import Session, select, and_, Column
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone
+from typing import cast
+from ..models.feed_entry import FeedEntry
+from ..models.translation import Translation
+from ..translators import Translator
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def translate_feed_entries(
+    session: Session,
+    translator: Translator,
+    target_lang: str,
+    since: datetime,
+    batch_size: int,
+) -> int:
+    # Titles of entries stored or changed since `since` that have no cached
+    # translation yet. Identical titles share one hash and so one translation.
+    entry_title_hash = cast(Column[bytes], FeedEntry.entry_title_hash)
+    query = (
+        select(entry_title_hash, FeedEntry.entry_title)
+        .outerjoin(
+            Translation,
+            and_(
+                Translation.source_hash == entry_title_hash,
+                Translation.target_lang == target_lang,
+            ),
+        )
+        .where(
+            entry_title_hash.is_not(None),
+            cast(Column[datetime], FeedEntry.updated_at) >= since,
+            cast(Column[bytes], Translation.source_hash).is_(None),
+        )
+        .distinct(entry_title_hash)
+        .limit(batch_size)
+    )
+
+    translated_count = 0
+    while True:
+        rows = session.exec(query).all()
+        if not rows:
+            break
+
+        translated_texts = translator.translate(
+            [entry_title for _, entry_title in rows], target_lang
+        )
+        created_at = datetime.now(timezone.utc)
+        session.execute(
+            insert(Translation)
+            .values(
+                [
+                    {
+                        "source_hash": source_hash,
+                        "target_lang": target_lang,
+                        "translated_text": translated_text,
+                        "created_at": created_at,
+                    }
+                    for (source_hash, _), translated_text in zip(
+                        rows, translated_texts, strict=True
+                    )
+                ]
+            )
+            .on_conflict_do_nothing()
+        )
+        session.commit()
+        translated_count += len(rows)
+
+    logger.info(f"Translated {translated_count} titles into {target_lang}")
+    return translated_count
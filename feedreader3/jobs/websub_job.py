@@ -0,0 +1,140 @@
+from sqlmodel import Session, select, Column
+from sqlalchemy import ColumnElement, and_, or_
+from typing import cast
+from datetime import datetime, timezone, timedelta
+from ..feed_fetcher import FetchLimits
+from ..websub import WebSubError, get_callback_url, request_subscription
+from ..models.feed_source import FeedSource
+from ..models.feed_source_stats import FeedSourceStats
+from ..models.websub_subscription import WebSubSubscription
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+# A subscription the hub has not verified by then is requested again
+PENDING_RETRY_INTERVAL = timedelta(hours=1)
+
+
+def is_pushed_recently(now: datetime, poll_interval: timedelta) -> ColumnElement[bool]:
+    # Sources whose hub pushes updates only need a safety-net poll. Deliveries
+    # update last_fetched_at too.
+    feed_source_id = cast(Column[int], WebSubSubscription.feed_source_id)
+    return (
+        select(feed_source_id)
+        .join(FeedSourceStats, feed_source_id == FeedSourceStats.feed_source_id)
+        .where(
+            feed_source_id == FeedSource.id,
+            WebSubSubscription.state == "active",
+            cast(Column[datetime], WebSubSubscription.lease_expires_at) > now,
+            cast(Column[datetime], FeedSourceStats.last_fetched_at)
+            > now - poll_interval,
+        )
+        .exists()
+    )
+
+
+def subscribe_feed_source(
+    session: Session,
+    feed_source: FeedSource,
+    feed_links: dict[str, str],
+    callback_url: str,
+    lease_seconds: int,
+    limits: FetchLimits,
+) -> None:
+    hub_url = feed_links.get("hub")
+    if hub_url is None or feed_source.id is None:
+        return
+    topic_url = feed_links.get("self", feed_source.feed_url)
+    subscription = session.get(WebSubSubscription, feed_source.id)
+    # Known subscriptions are kept alive by renew_websub_subscriptions
+    if subscription is not None and (subscription.hub_url, subscription.topic_url) == (
+        hub_url,
+        topic_url,
+    ):
+        return
+    if subscription is None:
+        subscription = WebSubSubscription(
+            feed_source_id=feed_source.id,
+            hub_url=hub_url,
+            topic_url=topic_url,
+            secret=secrets.token_hex(32),
+            state="pending",
+            requested_at=datetime.now(timezone.utc),
+        )
+    else:
+        # The feed moved to another hub or topic
+        subscription.hub_url = hub_url
+        subscription.topic_url = topic_url
+        subscription.secret = secrets.token_hex(32)
+        subscription.state = "pending"
+        subscription.lease_expires_at = None
+    request_websub_subscription(
+        session, subscription, callback_url, lease_seconds, limits
+    )
+
+
+def renew_websub_subscriptions(
+    session: Session,
+    callback_url: str,
+    lease_seconds: int,
+    renew_before_seconds: int,
+    limits: FetchLimits,
+) -> int:
+    now = datetime.now(timezone.utc)
+    lease_expires_at = cast(Column[datetime], WebSubSubscription.lease_expires_at)
+    requested_at = cast(Column[datetime], WebSubSubscription.requested_at)
+    state = cast(Column[str], WebSubSubscription.state)
+    subscriptions = session.exec(
+        select(WebSubSubscription).where(
+            or_(
+                and_(
+                    state == "active",
+                    lease_expires_at < now + timedelta(seconds=renew_before_seconds),
+                ),
+                and_(
+                    state == "pending",
+                    requested_at < now - PENDING_RETRY_INTERVAL,
+                ),
+            )
+        )
+    ).all()
+    for subscription in subscriptions:
+        request_websub_subscription(
+            session, subscription, callback_url, lease_seconds, limits
+        )
+    return len(subscriptions)
+
+
+def request_websub_subscription(
+    session: Session,
+    subscription: WebSubSubscription,
+    callback_url: str,
+    lease_seconds: int,
+    limits: FetchLimits,
+) -> None:
+    # Committed before asking, because the hub may verify the callback before
+    # it answers
+    subscription.requested_at = datetime.now(timezone.utc)
+    session.add(subscription)
+    session.commit()
+    log_extra = {
+        "feed_source_id": subscription.feed_source_id,
+        "hub_url": subscription.hub_url,
+        "topic_url": subscription.topic_url,
+    }
+    try:
+        request_subscription(
+            subscription.hub_url,
+            subscription.topic_url,
+            get_callback_url(callback_url, subscription.feed_source_id),
+            subscription.secret,
+            lease_seconds,
+            limits,
+        )
+    except WebSubError as exc:
+        logger.warning(
+            "Failed to subscribe to WebSub hub", extra={**log_extra, "error": str(exc)}
+        )
+        return
+    logger.info("Requested WebSub subscription", extra=log_extra)
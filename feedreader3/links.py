@@ -0,0 +1,59 @@
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import hashlib
+
+TRACKING_QUERY_PARAMS = frozenset(
+    {
+        "fbclid",
+        "gclid",
+        "dclid",
+        "msclkid",
+        "yclid",
+        "igshid",
+        "mc_cid",
+        "mc_eid",
+        "_hsenc",
+        "_hsmi",
+        "ref_src",
+    }
+)
+TRACKING_QUERY_PARAM_PREFIXES = ("utm_", "ga_", "pk_")
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking_query_param(name: str) -> bool:
+    name = name.lower()
+    return name in TRACKING_QUERY_PARAMS or name.startswith(
+        TRACKING_QUERY_PARAM_PREFIXES
+    )
+
+
+def canonicalize_link(link: str) -> str:
+    parts = urlsplit(link.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        # Relative or non-web links cannot be compared across sources
+        return link.strip()
+
+    host = (parts.hostname or "").removeprefix("www.")
+    try:
+        port = parts.port
+    except ValueError:
+        return link.strip()
+    netloc = host if port is None or port == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+
+    query = urlencode(
+        sorted(
+            (name, value)
+            for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not is_tracking_query_param(name)
+        )
+    )
+    # The same article is often served over both http and https
+    return urlunsplit(("https", netloc, parts.path or "/", query, ""))
+
+
+def hash_link(canonical_link: str) -> int:
+    # 64-bit hash which fits in a PostgreSQL BIGINT
+    digest = hashlib.blake2b(canonical_link.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
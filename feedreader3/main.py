@@ -1,23 +1,75 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
 from typing import AsyncGenerator
-from .database import initialize_engine, finalize_engine
-from .routers import health, feed_sources, feed_entries
-from .settings import initialize_settings
+from .database import initialize_engine, finalize_engine, warm_up_engine
+from .routers import health, feed_sources, feed_entries, websub, debug
+from .settings import (
+    initialize_settings,
+    get_settings,
+    get_bool_environment_variable,
+    get_log_format,
+)
+from .structured_logging import initialize_logging, finalize_logging
+from .profiling import RequestProfilingMiddleware
+from .tracing import (
+    create_span_exporter,
+    get_tracing_exporter,
+    initialize_tracing,
+    finalize_tracing,
+    instrument_app,
+)
+from .recommendation.index import (
+    initialize_recommendation_index,
+    finalize_recommendation_index,
+    get_recommendation_index,
+)
 from .exception_handlers import global_exception_handler
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    # logging
+    # Our loggers are named "uvicorn.*", so they go through the same queue as
+    # the server and access logs
+    initialize_logging(["uvicorn", "uvicorn.access"], get_log_format())
+
     # settings
     initialize_settings()
 
+    settings = get_settings()
+
+    # tracing
+    # Set up before the engine, so that it is instrumented
+    span_exporter = create_span_exporter(
+        settings.tracing_exporter, settings.tracing_file
+    )
+    if span_exporter is not None:
+        initialize_tracing("feedreader3-web", span_exporter)
+
     # DB
     initialize_engine()
+    warm_up_engine(settings.database_pool_size)
+
+    # recommendation
+    # The worker writes the index. The web app only maps it read-only.
+    if settings.recommendation_index_dir is not None:
+        initialize_recommendation_index(
+            settings.recommendation_index_dir,
+            settings.recommendation_dim,
+            writable=False,
+        )
+        index = get_recommendation_index()
+        if index is not None:
+            index.warm_up()
 
     yield
 
+    if settings.recommendation_index_dir is not None:
+        finalize_recommendation_index()
     finalize_engine()
+    if span_exporter is not None:
+        finalize_tracing()
+    finalize_logging()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -25,5 +77,18 @@ app = FastAPI(lifespan=lifespan)
 app.include_router(health.router)
 app.include_router(feed_sources.router)
 app.include_router(feed_entries.router)
+app.include_router(websub.router)
+app.include_router(debug.router)
 
 app.add_exception_handler(Exception, global_exception_handler)
+
+# Middleware has to be added before the app starts, so the flag is read here
+# rather than from the settings initialized in lifespan. Not installing it at
+# all keeps normal requests free of any profiling cost.
+if get_bool_environment_variable("PROFILE_REQUESTS", False):
+    app.add_middleware(RequestProfilingMiddleware)
+
+# Requests are traced when an exporter is configured. Like the profiling
+# middleware, this is decided when the app is created.
+if get_tracing_exporter() != "none":
+    instrument_app(app)
@@ -0,0 +1,22 @@
+from .settings import initialize_settings
+from .database import get_database_url
+from .migration import upgrade_schema
+from sqlmodel import create_engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def main() -> None:
+    initialize_settings()
+    engine = create_engine(get_database_url())
+    try:
+        upgrade_schema(engine)
+    finally:
+        engine.dispose()
+    logger.info("migration finished")
+
+
+if __name__ == "__main__":
+    main()
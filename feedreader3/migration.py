@@ -0,0 +1,90 @@
+from sqlalchemy import Engine, text, inspect
+from alembic import command, op
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from pathlib import Path
+import logging
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+# Schema created by SQLModel.metadata.create_all before migrations existed
+BASELINE_REVISION = "0001"
+# Arbitrary key for pg_advisory_lock, shared by every process that migrates
+MIGRATION_LOCK_ID = 0x66656564
+
+
+def create_index_concurrently(
+    index_name: str, table_name: str, columns: list[str], unique: bool = False
+) -> None:
+    # For large tables such as feedentry: writes are not blocked while the
+    # index is built. CONCURRENTLY cannot run inside a transaction, and a failed
+    # build leaves an invalid index behind, which is dropped before retrying.
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, if_exists=True, postgresql_concurrently=True)
+        op.create_index(
+            index_name,
+            table_name,
+            columns,
+            unique=unique,
+            postgresql_concurrently=True,
+        )
+
+
+def drop_index_concurrently(index_name: str) -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(index_name, if_exists=True, postgresql_concurrently=True)
+
+
+def get_alembic_config() -> Config:
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_DIR))
+    return config
+
+
+def get_head_revision() -> str | None:
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+
+def check_schema_version(engine: Engine) -> None:
+    # A single read of alembic_version instead of reflecting every table
+    with engine.connect() as conn:
+        current_revision = MigrationContext.configure(conn).get_current_revision()
+    head_revision = get_head_revision()
+    if current_revision != head_revision:
+        raise RuntimeError(
+            f"Database schema is at revision {current_revision}, expected "
+            f"{head_revision}. Run `python -m feedreader3.migrate`"
+        )
+
+
+def upgrade_schema(engine: Engine) -> None:
+    config = get_alembic_config()
+    with engine.connect() as lock_conn:
+        # Replicas that start together wait here and then find nothing to do
+        lock_conn.execute(
+            text("SELECT pg_advisory_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID}
+        )
+        lock_conn.commit()
+        try:
+            with engine.connect() as conn:
+                context = MigrationContext.configure(conn)
+                current_revision = context.get_current_revision()
+                needs_stamp = current_revision is None and inspect(conn).has_table(
+                    "feedsource"
+                )
+                # Alembic manages its own transactions from here on
+                conn.commit()
+
+                config.attributes["connection"] = conn
+                if needs_stamp:
+                    logger.info(f"Stamping existing schema as {BASELINE_REVISION}")
+                    command.stamp(config, BASELINE_REVISION)
+                command.upgrade(config, "head")
+        finally:
+            lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:lock_id)"),
+                {"lock_id": MIGRATION_LOCK_ID},
+            )
+            lock_conn.commit()
@@ -0,0 +1,47 @@
+from alembic import context
+from sqlalchemy import Connection
+from sqlmodel import SQLModel, create_engine
+from feedreader3.settings import initialize_settings
+from feedreader3.database import get_database_url
+
+# Register every table on SQLModel.metadata for autogenerate
+import feedreader3.models.feed_entry  # noqa: F401
+import feedreader3.models.feed_source_stats  # noqa: F401
+import feedreader3.models.translation  # noqa: F401
+import feedreader3.models.refresh_request  # noqa: F401
+import feedreader3.models.websub_subscription  # noqa: F401
+import feedreader3.models.worker_heartbeat  # noqa: F401
+
+target_metadata = SQLModel.metadata
+
+
+def run_migrations(connection: Connection) -> None:
+    # One transaction per revision, because CREATE INDEX CONCURRENTLY has to
+    # run in an autocommit block between them
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        transaction_per_migration=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # upgrade_schema() passes its own connection. The alembic CLI (used to
+    # write new revisions) connects with the usual environment variables.
+    connection = context.config.attributes.get("connection")
+    if connection is not None:
+        run_migrations(connection)
+        return
+
+    initialize_settings()
+    engine = create_engine(get_database_url())
+    try:
+        with engine.connect() as connection:
+            run_migrations(connection)
+    finally:
+        engine.dispose()
+
+
+run_migrations_online()
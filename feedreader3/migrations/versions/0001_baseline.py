@@ -0,0 +1,57 @@
+"""baseline
+
+Schema created by SQLModel.metadata.create_all before migrations were added.
+Existing databases are stamped with this revision instead of running it.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision: str = "0001"
+down_revision: str | None = None
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "feedsource",
+        sa.Column("name", sqlmodel.AutoString(), nullable=False),
+        sa.Column("feed_url", sqlmodel.AutoString(), nullable=False),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_feedsource_feed_url"), "feedsource", ["feed_url"], unique=True
+    )
+    op.create_index(op.f("ix_feedsource_name"), "feedsource", ["name"], unique=True)
+    op.create_table(
+        "feedentry",
+        sa.Column("feed_source_id", sa.Integer(), nullable=False),
+        sa.Column("entry_id", sqlmodel.AutoString(), nullable=False),
+        sa.Column("entry_title", sqlmodel.AutoString(), nullable=False),
+        sa.Column("entry_link", sqlmodel.AutoString(), nullable=False),
+        sa.Column("entry_updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("first_seen_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["feed_source_id"], ["feedsource.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("feed_source_id", "entry_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("feedentry")
+    op.drop_index(op.f("ix_feedsource_name"), table_name="feedsource")
+    op.drop_index(op.f("ix_feedsource_feed_url"), table_name="feedsource")
+    op.drop_table("feedsource")
@@ -0,0 +1,68 @@
+"""entry contents, translations and source stats
+
+Indexes on feedentry are built in 0003 so that this revision stays a single
+transaction.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision: str = "0002"
+down_revision: str | None = "0001"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "translation",
+        sa.Column("source_hash", sa.LargeBinary(), nullable=False),
+        sa.Column("target_lang", sqlmodel.AutoString(), nullable=False),
+        sa.Column("translated_text", sqlmodel.AutoString(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("source_hash", "target_lang"),
+    )
+    op.create_table(
+        "feedsourcestats",
+        sa.Column("entry_count", sa.BigInteger(), nullable=False),
+        sa.Column("last_entry_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_fetched_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_new_entry_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("feed_source_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["feed_source_id"], ["feedsource.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("feed_source_id"),
+    )
+    op.create_table(
+        "feedentrycontent",
+        sa.Column("feed_entry_id", sa.Integer(), nullable=False),
+        sa.Column("summary", sa.LargeBinary(), nullable=True),
+        sa.Column("content", sa.LargeBinary(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["feed_entry_id"], ["feedentry.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("feed_entry_id"),
+    )
+    # Nullable columns without defaults do not rewrite feedentry
+    op.add_column(
+        "feedentry", sa.Column("canonical_link_hash", sa.BigInteger(), nullable=True)
+    )
+    op.add_column(
+        "feedentry", sa.Column("entry_title_hash", sa.LargeBinary(), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("feedentry", "entry_title_hash")
+    op.drop_column("feedentry", "canonical_link_hash")
+    op.drop_table("feedentrycontent")
+    op.drop_table("feedsourcestats")
+    op.drop_table("translation")
@@ -0,0 +1,27 @@
+"""feedentry indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from feedreader3.migration import create_index_concurrently, drop_index_concurrently
+
+revision: str = "0003"
+down_revision: str | None = "0002"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    create_index_concurrently(
+        "ix_feedentry_canonical_link_hash", "feedentry", ["canonical_link_hash", "id"]
+    )
+    create_index_concurrently("ix_feedentry_updated_at", "feedentry", ["updated_at"])
+
+
+def downgrade() -> None:
+    drop_index_concurrently("ix_feedentry_updated_at")
+    drop_index_concurrently("ix_feedentry_canonical_link_hash")
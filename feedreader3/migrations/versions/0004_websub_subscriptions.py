@@ -0,0 +1,39 @@
+"""websub subscriptions
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from alembic import op
+import sqlalchemy as sa
+import sqlmodel
+
+revision: str = "0004"
+down_revision: str | None = "0003"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "websubsubscription",
+        sa.Column("feed_source_id", sa.Integer(), nullable=False),
+        sa.Column("hub_url", sqlmodel.AutoString(), nullable=False),
+        sa.Column("topic_url", sqlmodel.AutoString(), nullable=False),
+        sa.Column("secret", sqlmodel.AutoString(), nullable=False),
+        sa.Column("state", sqlmodel.AutoString(), nullable=False),
+        sa.Column("requested_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("lease_expires_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_delivery_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(
+            ["feed_source_id"], ["feedsource.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("feed_source_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("websubsubscription")
@@ -0,0 +1,33 @@
+"""refresh requests
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0005"
+down_revision: str | None = "0004"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "refreshrequest",
+        sa.Column("priority", sa.Integer(), nullable=False),
+        sa.Column("requested_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("feed_source_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["feed_source_id"], ["feedsource.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("feed_source_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("refreshrequest")
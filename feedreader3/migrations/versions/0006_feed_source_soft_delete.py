@@ -0,0 +1,47 @@
+"""feed source soft delete
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = "0006"
+down_revision: str | None = "0005"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "feedsource", sa.Column("deleted_at", sa.DateTime(timezone=True), nullable=True)
+    )
+    op.drop_index("ix_feedsource_name", table_name="feedsource")
+    op.drop_index("ix_feedsource_feed_url", table_name="feedsource")
+    op.create_index(
+        "ix_feedsource_name",
+        "feedsource",
+        ["name"],
+        unique=True,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+    op.create_index(
+        "ix_feedsource_feed_url",
+        "feedsource",
+        ["feed_url"],
+        unique=True,
+        postgresql_where=sa.text("deleted_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_feedsource_feed_url", table_name="feedsource")
+    op.drop_index("ix_feedsource_name", table_name="feedsource")
+    op.execute("DELETE FROM feedsource WHERE deleted_at IS NOT NULL")
+    op.create_index("ix_feedsource_feed_url", "feedsource", ["feed_url"], unique=True)
+    op.create_index("ix_feedsource_name", "feedsource", ["name"], unique=True)
+    op.drop_column("feedsource", "deleted_at")
@@ -0,0 +1,33 @@
+"""fetch priority and attempts
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19 00:00:00.000000
+
+"""
+
+from typing import Sequence
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0008"
+down_revision: str | None = "0007"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "feedsource",
+        sa.Column("fetch_priority", sa.Float(), server_default="1", nullable=False),
+    )
+    op.add_column(
+        "feedsourcestats",
+        sa.Column("last_attempted_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("feedsourcestats", "last_attempted_at")
+    op.drop_column("feedsource", "fetch_priority")
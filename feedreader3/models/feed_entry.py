@@ -3,11 +3,15 @@ from sqlmodel import (
     SQLModel,
     Relationship,
     UniqueConstraint,
+    Index,
     DateTime,
+    BigInteger,
+    LargeBinary,
     Column,
 )
 from datetime import datetime, timezone
 from .feed_source import FeedSource
+from .feed_entry_content import FeedEntryContent
 
 
 class FeedEntryBase(SQLModel):
@@ -21,7 +25,13 @@ class FeedEntryBase(SQLModel):
 
 
 class FeedEntry(FeedEntryBase, table=True):
-    __table_args__ = ((UniqueConstraint("feed_source_id", "entry_id")),)
+    __table_args__ = (
+        (UniqueConstraint("feed_source_id", "entry_id")),
+        # (hash, id) lets dedupe find the first stored copy from the index alone
+        Index("ix_feedentry_canonical_link_hash", "canonical_link_hash", "id"),
+        # Lets the translation stage look only at recently stored entries
+        Index("ix_feedentry_updated_at", "updated_at"),
+    )
 
     id: int | None = Field(default=None, primary_key=True)
     updated_at: datetime = Field(
@@ -33,15 +43,48 @@ class FeedEntry(FeedEntryBase, table=True):
         ),
     )
     first_seen_at: datetime = Field(sa_column=Column(DateTime(timezone=True)))
+    # hash_link() of the canonicalized entry link, shared by copies of the same
+    # article across feed sources
+    canonical_link_hash: int | None = Field(default=None, sa_column=Column(BigInteger))
+    # hash_text() of entry_title, the key into the translation cache
+    entry_title_hash: bytes | None = Field(default=None, sa_column=Column(LargeBinary))
 
     feed_source: FeedSource = Relationship(back_populates="feed_entries")
+    # Only loaded on access. DB side ON DELETE CASCADE removes it with the entry.
+    entry_content: FeedEntryContent | None = Relationship(
+        back_populates="feed_entry", cascade_delete=True, passive_deletes=True
+    )
+
+
+class FeedEntryPublic(FeedEntryBase):
+    id: int
+    updated_at: datetime
+    first_seen_at: datetime
+
+
+class FeedEntryTranslated(FeedEntryPublic):
+    # Language of entry_title, None when no translation was requested or cached
+    entry_title_lang: str | None
+
+
+class FeedEntryRecommended(FeedEntryPublic):
+    score: float
+
+
+class FeedEntryDetail(FeedEntryPublic):
+    entry_summary: str | None
+    entry_content: str | None
 
 
 class FeedEntryCreate(FeedEntryBase):
     first_seen_at: datetime
+    canonical_link_hash: int | None = None
+    entry_title_hash: bytes | None = None
 
 
 class FeedEntryUpdate(SQLModel):
     entry_title: str | None
     entry_link: str | None
     entry_updated_at: datetime | None
+    canonical_link_hash: int | None
+    entry_title_hash: bytes | None
@@ -0,0 +1,35 @@
+from sqlmodel import Field, SQLModel, Relationship, Column, LargeBinary
+from typing import TYPE_CHECKING
+import zstandard
+
+if TYPE_CHECKING:
+    from .feed_entry import FeedEntry
+
+# Level 3 is zstd's default. Higher levels cost ingest CPU for little gain on
+# short HTML fragments.
+ZSTD_LEVEL = 3
+
+
+def compress_text(text: str | None) -> bytes | None:
+    if text is None:
+        return None
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(text.encode("utf-8"))
+
+
+def decompress_text(data: bytes | None) -> str | None:
+    if data is None:
+        return None
+    return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+
+
+# Entry bodies live in their own table so that timeline queries over
+# feedentry never read (or detoast) them.
+class FeedEntryContent(SQLModel, table=True):
+    feed_entry_id: int = Field(
+        foreign_key="feedentry.id", primary_key=True, ondelete="CASCADE"
+    )
+    # zstd compressed UTF-8 text
+    summary: bytes | None = Field(default=None, sa_column=Column(LargeBinary))
+    content: bytes | None = Field(default=None, sa_column=Column(LargeBinary))
+
+    feed_entry: "FeedEntry" = Relationship(back_populates="entry_content")
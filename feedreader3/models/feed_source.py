@@ -1,8 +1,19 @@
-from sqlmodel import Field, SQLModel, Relationship
-
+from sqlmodel import (
+    Field,
+    SQLModel,
+    Relationship,
+    Index,
+    DateTime,
+    Column,
+    select,
+    text,
+)
+
+from sqlalchemy import ColumnElement
 from sqlalchemy.orm import Mapped
+from datetime import datetime
 from pydantic import AnyUrl, AnyHttpUrl, field_validator
-from typing import Any, TYPE_CHECKING
+from typing import Any, TYPE_CHECKING, cast
 
 if TYPE_CHECKING:
     from .feed_entry import FeedEntry
@@ -16,8 +27,11 @@ def convert_url(url: Any) -> Any:
 
 
 class FeedSourceBase(SQLModel):
-    name: str = Field(index=True, unique=True)
-    feed_url: str = Field(index=True, unique=True)
+    name: str
+    feed_url: str
+    # Weight of the source's staleness when a fetch cycle orders its sources.
+    # A source of 2.0 is fetched as if it had waited twice as long.
+    fetch_priority: float = Field(default=1.0, sa_column_kwargs={"server_default": "1"})
 
     @field_validator("feed_url", mode="before")
     @classmethod
@@ -26,7 +40,28 @@ class FeedSourceBase(SQLModel):
 
 
 class FeedSource(FeedSourceBase, table=True):
+    __table_args__ = (
+        # Deleted sources wait for the worker to purge their entries, and do
+        # not keep their name or URL from being used again meanwhile
+        Index(
+            "ix_feedsource_name",
+            "name",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+        Index(
+            "ix_feedsource_feed_url",
+            "feed_url",
+            unique=True,
+            postgresql_where=text("deleted_at IS NULL"),
+        ),
+    )
+
     id: int | None = Field(default=None, primary_key=True)
+    # Set by DELETE /feed-sources/{id}. The source is hidden from then on.
+    deleted_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
 
     feed_entries: Mapped[list["FeedEntry"]] = Relationship(
         back_populates="feed_source", cascade_delete=True
@@ -40,8 +75,35 @@ class FeedSourcePublic(FeedSourceBase):
 class FeedSourceCreate(SQLModel):
     name: str
     feed_url: AnyHttpUrl
+    fetch_priority: float = Field(default=1.0, gt=0)
 
 
 class FeedSourceUpdate(SQLModel):
     name: str | None = None
     feed_url: AnyHttpUrl | None = None
+    fetch_priority: float | None = Field(default=None, gt=0)
+
+
+class FeedSourceBatchUpdate(FeedSourceUpdate):
+    id: int
+
+
+# One per item of a batch request, in the order of the items. status is the
+# HTTP status the single-item endpoint would have answered with.
+class FeedSourceBatchResult(SQLModel):
+    status: int
+    feed_source: FeedSourcePublic | None = None
+    detail: Any = None
+
+
+def is_feed_source_deleted(feed_source_id: Any) -> ColumnElement[bool]:
+    # For queries over entries and other rows of a source. Only the few
+    # sources waiting to be purged match.
+    return (
+        select(FeedSource.id)
+        .where(
+            FeedSource.id == feed_source_id,
+            cast(Column[datetime], FeedSource.deleted_at).is_not(None),
+        )
+        .exists()
+    )
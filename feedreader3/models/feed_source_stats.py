@@ -0,0 +1,38 @@
+from sqlmodel import Field, SQLModel, DateTime, Column, BigInteger
+from datetime import datetime
+from .feed_source import FeedSourcePublic
+
+
+class FeedSourceStatsBase(SQLModel):
+    entry_count: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
+    # Newest entry_updated_at (or first_seen_at when the feed has none)
+    last_entry_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+    last_fetched_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+    last_new_entry_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+    # Set when a fetch starts, whether it succeeds or not
+    last_attempted_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+
+
+# Counters maintained by the worker in the same transaction as the entries, so
+# that listing sources never has to aggregate feedentry.
+class FeedSourceStats(FeedSourceStatsBase, table=True):
+    feed_source_id: int = Field(
+        foreign_key="feedsource.id", primary_key=True, ondelete="CASCADE"
+    )
+
+
+class FeedSourceStatsPublic(FeedSourceStatsBase):
+    pass
+
+
+class FeedSourcePublicWithStats(FeedSourcePublic):
+    # None until the worker has seen the source
+    stats: FeedSourceStatsPublic | None
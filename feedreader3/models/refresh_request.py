@@ -0,0 +1,23 @@
+from sqlmodel import Field, SQLModel, DateTime, Column
+from datetime import datetime
+
+
+class RefreshRequestBase(SQLModel):
+    # Higher is fetched first, then older requests
+    priority: int
+    requested_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+
+
+# Pending refreshes. At most one row per source: requesting again only raises
+# the priority. The worker deletes the row in the transaction that stores the
+# fetched entries, or once the fetch has failed.
+class RefreshRequest(RefreshRequestBase, table=True):
+    feed_source_id: int = Field(
+        foreign_key="feedsource.id", primary_key=True, ondelete="CASCADE"
+    )
+
+
+class RefreshRequestPublic(RefreshRequestBase):
+    feed_source_id: int
@@ -0,0 +1,19 @@
+from sqlmodel import Field, SQLModel, DateTime, Column, LargeBinary
+from datetime import datetime, timezone
+import hashlib
+
+
+def hash_text(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+# Translations are memoized by the hash of the source text, so the same title
+# stored by several sources or fetched again is only translated once.
+class Translation(SQLModel, table=True):
+    source_hash: bytes = Field(sa_column=Column(LargeBinary, primary_key=True))
+    target_lang: str = Field(primary_key=True)
+    translated_text: str
+    created_at: datetime = Field(
+        default_factory=lambda: datetime.now(timezone.utc),
+        sa_column=Column(DateTime(timezone=True), nullable=False),
+    )
@@ -0,0 +1,25 @@
+from sqlmodel import Field, SQLModel, DateTime, Column
+from datetime import datetime
+
+
+# One subscription per source, created when its feed advertises a WebSub hub.
+# state is "pending" until the hub has verified the callback, then "active"
+# until the lease runs out. A hub may also answer "denied".
+class WebSubSubscription(SQLModel, table=True):
+    feed_source_id: int = Field(
+        foreign_key="feedsource.id", primary_key=True, ondelete="CASCADE"
+    )
+    hub_url: str
+    topic_url: str
+    # Shared with the hub to sign deliveries
+    secret: str
+    state: str
+    requested_at: datetime = Field(
+        sa_column=Column(DateTime(timezone=True), nullable=False)
+    )
+    lease_expires_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
+    last_delivery_at: datetime | None = Field(
+        default=None, sa_column=Column(DateTime(timezone=True))
+    )
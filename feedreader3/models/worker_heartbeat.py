@@ -0,0 +1,22 @@
+from sqlmodel import Field, SQLModel, DateTime, Column
+from datetime import datetime
+
+
+class WorkerHeartbeatBase(SQLModel):
+    # Process that last finished a cycle of the job
+    hostname: str
+    pid: int
+    beat_at: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+    duration_ms: int
+    # Runs of the job the process skipped since it started
+    skipped_runs: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+
+
+# One row per scheduled job (each fetch shard is a job of its own), written
+# when a cycle finishes. A row that stops moving means the job has stalled.
+class WorkerHeartbeat(WorkerHeartbeatBase, table=True):
+    job_id: str = Field(primary_key=True)
+
+
+class WorkerHeartbeatPublic(WorkerHeartbeatBase):
+    job_id: str
@@ -0,0 +1,36 @@
+from sqlmodel import Session, select, func, text, Column
+from typing import cast
+from datetime import datetime
+from .models.feed_source import FeedSource, is_feed_source_deleted
+from .models.feed_source_stats import FeedSourceStats
+
+TOTAL_COUNT_HEADER = "X-Total-Count"
+
+
+def estimate_feed_source_count(session: Session) -> int:
+    # The planner's estimate is a single catalog lookup. reltuples is -1 until
+    # the table is first analyzed, which autovacuum does long before an exact
+    # count of feedsource would be expensive. Deleted sources waiting to be
+    # purged are counted by the estimate.
+    reltuples = session.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = 'feedsource'::regclass")
+    ).scalar_one()
+    if reltuples >= 0:
+        return int(reltuples)
+    return session.exec(
+        select(func.count())
+        .select_from(FeedSource)
+        .where(cast(Column[datetime | None], FeedSource.deleted_at).is_(None))
+    ).one()
+
+
+def count_feed_entries(session: Session) -> int:
+    # Sum of the per-source counters instead of COUNT(*) over feedentry
+    entry_count = cast(Column[int], FeedSourceStats.entry_count)
+    return int(
+        session.exec(
+            select(func.coalesce(func.sum(entry_count), 0)).where(
+                ~is_feed_source_deleted(FeedSourceStats.feed_source_id)
+            )
+        ).one()
+    )
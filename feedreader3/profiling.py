@@ -0,0 +1,215 @@
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+from .settings import get_settings
+import cProfile
+import os
+import threading
+import tracemalloc
+import logging
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_FILE_HEADER = b"x-profile-file"
+
+_lock = threading.Lock()
+_remaining_fetch_runs = 0
+# Since Python 3.12 cProfile records every thread and coroutine of the
+# process, not just the one that enabled it, and only one profiler can be
+# enabled at a time. A fetch run or request that finds it taken runs
+# unprofiled. The dumps cover whatever else ran meanwhile (other shards,
+# other requests) and are named "process-..." to say so.
+_profiler_lock = threading.Lock()
+# tracemalloc is process-wide too. Shards that run while another one is being
+# measured are not reported, as their allocations land in the same snapshots.
+_memory_profiler_lock = threading.Lock()
+_memory_top_sites = 0
+
+
+def arm_fetch_profiling(runs: int) -> None:
+    # Also called from the SIGUSR1 handler, which only ever adds runs
+    global _remaining_fetch_runs
+    _remaining_fetch_runs += runs
+    logger.info(f"Profiling the next {_remaining_fetch_runs} fetch runs")
+
+
+def get_remaining_fetch_runs() -> int:
+    return _remaining_fetch_runs
+
+
+def take_fetch_run() -> bool:
+    global _remaining_fetch_runs
+    with _lock:
+        if _remaining_fetch_runs <= 0:
+            return False
+        _remaining_fetch_runs -= 1
+        return True
+
+
+def dump_profile(profiler: cProfile.Profile, name: str) -> Path:
+    profile_dir = Path(get_settings().profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+    path = profile_dir / f"process-{name}-{timestamp}-{os.getpid()}.prof"
+    profiler.dump_stats(path)
+    logger.info(
+        f"Wrote profile {path} of the whole process while the {name} ran. "
+        f"Inspect it with `python -m pstats {path}`"
+    )
+    return path
+
+
+@contextmanager
+def fetch_profiling() -> Iterator[None]:
+    # A single integer check when profiling is not armed
+    if get_remaining_fetch_runs() <= 0 or not _profiler_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        if not take_fetch_run():
+            yield
+            return
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            dump_profile(profiler, "fetch")
+    finally:
+        _profiler_lock.release()
+
+
+def start_memory_profiling(top_sites: int) -> None:
+    # Tracing slows every allocation down, so it only runs when asked for
+    global _memory_top_sites
+    _memory_top_sites = top_sites
+    tracemalloc.start()
+    logger.info(f"Tracing memory allocations, reporting the top {top_sites} sites")
+
+
+def stop_memory_profiling() -> None:
+    global _memory_top_sites
+    _memory_top_sites = 0
+    tracemalloc.stop()
+
+
+def get_rss_bytes() -> int | None:
+    # Current resident set size, so that a run can be measured by what it
+    # added. getrusage() only has the peak since the process started, which
+    # stops moving after the first large run. None where there is no /proc.
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+    except OSError:
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def get_rss_diff_bytes(before: int | None, after: int | None) -> int | None:
+    return after - before if before is not None and after is not None else None
+
+
+def take_memory_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    )
+
+
+@contextmanager
+def memory_profiling(job_id: str) -> Iterator[None]:
+    if _memory_top_sites <= 0 or not _memory_profiler_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        rss_before = get_rss_bytes()
+        before = take_memory_snapshot()
+        tracemalloc.reset_peak()
+        yield
+        traced_bytes, traced_peak_bytes = tracemalloc.get_traced_memory()
+        rss_after = get_rss_bytes()
+        after = take_memory_snapshot()
+        # Sites whose allocations grew the most over the run. Memory that is
+        # still held once the run is over shows up here.
+        top_sites = after.compare_to(before, "lineno")[:_memory_top_sites]
+        logger.info(
+            "Memory profile",
+            extra={
+                "job_id": job_id,
+                "traced_bytes": traced_bytes,
+                "traced_peak_bytes": traced_peak_bytes,
+                "rss_bytes": rss_after,
+                "rss_diff_bytes": get_rss_diff_bytes(rss_before, rss_after),
+                "top_sites": [
+                    {
+                        "site": str(stat.traceback[0]),
+                        "size_bytes": stat.size,
+                        "size_diff_bytes": stat.size_diff,
+                        "count_diff": stat.count_diff,
+                    }
+                    for stat in top_sites
+                ],
+            },
+        )
+    finally:
+        _memory_profiler_lock.release()
+
+
+# Profiles requests that carry "X-Profile: 1" and come from an allowed client
+# address. main.py only installs it when PROFILE_REQUESTS is enabled.
+class RequestProfilingMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.is_requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        # The response is held back until the profile has been written, so
+        # that the file name can be returned in a header
+        messages: list[Message] = []
+
+        async def buffer_send(message: Message) -> None:
+            messages.append(message)
+
+        if not _profiler_lock.acquire(blocking=False):
+            logger.warning("Another request is being profiled")
+            await self.app(scope, receive, send)
+            return
+        try:
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, buffer_send)
+            finally:
+                profiler.disable()
+                path = dump_profile(profiler, "request")
+        finally:
+            _profiler_lock.release()
+
+        for message in messages:
+            if message["type"] == "http.response.start":
+                headers = [
+                    *message.get("headers", []),
+                    (PROFILE_FILE_HEADER, path.name.encode()),
+                ]
+                message = {**message, "headers": headers}
+            await send(message)
+
+    def is_requested(self, scope: Scope) -> bool:
+        if (PROFILE_HEADER, b"1") not in scope["headers"]:
+            return False
+        client = scope.get("client")
+        allowed = client is not None and client[0] in (
+            get_settings().profile_allowed_clients
+        )
+        if not allowed:
+            logger.warning(f"Profiling is not allowed for client {client}")
+        return allowed
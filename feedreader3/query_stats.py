@@ -0,0 +1,203 @@
+from dataclasses import dataclass, field
+from sqlalchemy import Engine, event
+from sqlalchemy.engine import Connection, ExceptionContext, ExecutionContext
+from typing import Any, Callable
+import bisect
+import logging
+import random
+import re
+import threading
+import time
+
+logger = logging.getLogger("uvicorn." + __name__)
+
+# Upper bounds of the latency histogram buckets in milliseconds. The last
+# bucket takes everything slower.
+LATENCY_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+MAX_LOGGED_PARAMETERS_LENGTH = 1000
+
+PARAMETER = re.compile(r"%\(\w+\)s|%s")
+PARAMETER_LIST = re.compile(r"\?(?:, \?)+")
+REPEATED_ROW = re.compile(r"(\([^()]*\))(?:, \1)+")
+WHITESPACE = re.compile(r"\s+")
+WRITE = re.compile(r"\b(?:INSERT|UPDATE|DELETE)\b")
+
+_lock = threading.Lock()
+_query_stats: dict[str, "QueryStats"] = {}
+_slow_query_ms = 0.0
+_explain_sample_rate = 0.0
+_collect_query_stats = False
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    )
+
+    def add(self, duration_ms: float) -> None:
+        self.count += 1
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.histogram[bisect.bisect_left(LATENCY_BUCKETS_MS, duration_ms)] += 1
+
+
+def get_fingerprint(statement: str) -> str:
+    # Statements that only differ in their parameters, or in how many of them
+    # an IN list or a multi-row VALUES has, are counted together
+    fingerprint = WHITESPACE.sub(" ", statement).strip()
+    fingerprint = PARAMETER.sub("?", fingerprint)
+    fingerprint = PARAMETER_LIST.sub("?, ...", fingerprint)
+    return REPEATED_ROW.sub(r"\1, ...", fingerprint)
+
+
+def configure_query_stats(
+    engine: Engine,
+    slow_query_ms: float,
+    explain_sample_rate: float,
+    collect_query_stats: bool,
+) -> None:
+    # Plans are only taken of slow queries, so with neither slow query logging
+    # nor the statistics there is nothing to time and no listener at all
+    global _slow_query_ms, _explain_sample_rate, _collect_query_stats
+    _slow_query_ms = slow_query_ms
+    _explain_sample_rate = explain_sample_rate
+    _collect_query_stats = collect_query_stats
+    enabled = slow_query_ms > 0 or collect_query_stats
+    listeners: list[tuple[str, Callable[..., None]]] = [
+        ("before_cursor_execute", before_cursor_execute),
+        ("after_cursor_execute", after_cursor_execute),
+        ("handle_error", handle_error),
+    ]
+    for identifier, listener in listeners:
+        if enabled and not event.contains(engine, identifier, listener):
+            event.listen(engine, identifier, listener)
+        elif not enabled and event.contains(engine, identifier, listener):
+            event.remove(engine, identifier, listener)
+
+
+def before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext | None,
+    executemany: bool,
+) -> None:
+    query_start = conn.info.get("query_start")
+    # Started before the listeners were installed
+    if not query_start:
+        return
+    duration_ms = (time.perf_counter() - query_start.pop()) * 1000
+    fingerprint: str | None = None
+    if _collect_query_stats:
+        fingerprint = get_fingerprint(statement)
+        with _lock:
+            stats = _query_stats.get(fingerprint)
+            if stats is None:
+                stats = _query_stats[fingerprint] = QueryStats()
+            stats.add(duration_ms)
+
+    if _slow_query_ms <= 0 or duration_ms < _slow_query_ms:
+        return
+    if fingerprint is None:
+        fingerprint = get_fingerprint(statement)
+    logger.warning(
+        "Slow query",
+        extra={
+            "statement": fingerprint,
+            "parameters": repr(parameters)[:MAX_LOGGED_PARAMETERS_LENGTH],
+            "duration_ms": round(duration_ms, 1),
+        },
+    )
+    if (
+        not executemany
+        and _explain_sample_rate > 0
+        and random.random() < _explain_sample_rate
+        and is_explainable(statement)
+    ):
+        log_query_plan(cursor.connection, statement, parameters, fingerprint)
+
+
+def handle_error(context: ExceptionContext) -> None:
+    # A failed statement gets no after_cursor_execute. Its start is dropped so
+    # that the next statement on the connection is not timed from it.
+    if context.connection is None or context.statement is None:
+        return
+    query_start = context.connection.info.get("query_start")
+    if query_start:
+        query_start.pop()
+
+
+def is_explainable(statement: str) -> bool:
+    # Only plain reads qualify (SELECT ... FOR UPDATE is left out with the
+    # writes), as the time of a write mostly goes to locks a plan does not show
+    normalized = statement.lstrip().upper()
+    return normalized.startswith(("SELECT", "WITH")) and not WRITE.search(normalized)
+
+
+def log_query_plan(
+    dbapi_connection: Any, statement: str, parameters: Any, fingerprint: str
+) -> None:
+    # Runs in the caller's transaction. The savepoint keeps a failed EXPLAIN
+    # from aborting it. Plain EXPLAIN only plans the statement: ANALYZE would
+    # run it again, along with functions such as pg_try_advisory_xact_lock that
+    # a SELECT may call for their side effects.
+    with dbapi_connection.cursor() as cursor:
+        cursor.execute("SAVEPOINT query_stats_explain")
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            plan = "\n".join(row[0] for row in cursor.fetchall())
+        except Exception as exc:
+            cursor.execute("ROLLBACK TO SAVEPOINT query_stats_explain")
+            logger.warning(f"Failed to explain query: {exc}")
+            return
+        finally:
+            cursor.execute("RELEASE SAVEPOINT query_stats_explain")
+    logger.warning("Query plan", extra={"statement": fingerprint, "plan": plan})
+
+
+def get_query_stats() -> list[dict[str, Any]]:
+    with _lock:
+        items = [
+            (fingerprint, QueryStats(s.count, s.total_ms, s.max_ms, s.histogram[:]))
+            for fingerprint, s in _query_stats.items()
+        ]
+    # Where the time goes first
+    items.sort(key=lambda item: item[1].total_ms, reverse=True)
+    return [
+        {
+            "statement": fingerprint,
+            "count": stats.count,
+            "total_ms": round(stats.total_ms, 3),
+            "mean_ms": round(stats.total_ms / stats.count, 3),
+            "max_ms": round(stats.max_ms, 3),
+            "histogram": {
+                **{
+                    f"le_{bound}ms": count
+                    for bound, count in zip(LATENCY_BUCKETS_MS, stats.histogram)
+                },
+                "slower": stats.histogram[-1],
+            },
+        }
+        for fingerprint, stats in items
+    ]
+
+
+def reset_query_stats() -> None:
+    with _lock:
+        _query_stats.clear()
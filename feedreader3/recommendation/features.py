@@ -0,0 +1,38 @@
+from typing import Sequence
+import re
+import zlib
+import numpy as np
+import numpy.typing as npt
+
+TOKEN_PATTERN = re.compile(r"\w+")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(TAG_PATTERN.sub(" ", text).lower())
+
+
+def vectorize(texts: Sequence[str], dim: int) -> npt.NDArray[np.float32]:
+    # Feature hashing: no vocabulary to keep in sync between the worker and
+    # the web app, and new entries can be appended without refitting.
+    # crc32 is used because hash() is randomized per process.
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        tokens = tokenize(text)
+        if not tokens:
+            continue
+        hashes = np.fromiter(
+            (zlib.crc32(token.encode("utf-8")) for token in tokens),
+            dtype=np.uint32,
+            count=len(tokens),
+        )
+        # The top bit picks the sign so that collisions tend to cancel out
+        signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+        np.add.at(vectors[row], hashes % dim, signs)
+
+    # Sublinear term frequency, then L2 normalization so that dot products
+    # are cosine similarities
+    np.copysign(np.log1p(np.abs(vectors)), vectors, out=vectors)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
@@ -0,0 +1,215 @@
+from pathlib import Path
+from typing import Any, Literal
+import json
+import os
+import numpy as np
+import numpy.typing as npt
+
+VECTORS_FILE = "vectors.f32"
+IDS_FILE = "ids.i64"
+META_FILE = "meta.json"
+
+INITIAL_CAPACITY = 1024
+# Rows scored per matrix product. Bounds the temporary score matrix to
+# SEARCH_CHUNK_SIZE * number of queries floats.
+SEARCH_CHUNK_SIZE = 65536
+
+
+# Entry vectors stored as a memory-mapped float32 matrix plus the matching
+# feed entry ids. The worker appends rows, mostly in ascending entry id order,
+# and then publishes the new size in meta.json. Readers only look at rows below the
+# published size, so they never see a partially written row, and rows appended
+# after the last publish are simply written again after a crash.
+class RecommendationIndex:
+    def __init__(self, path: Path, dim: int, writable: bool) -> None:
+        self.path = path
+        self.dim = dim
+        self.writable = writable
+        self.size = 0
+        self.capacity = 0
+        self.max_entry_id = 0
+        self.meta_mtime_ns = 0
+        self.vectors: npt.NDArray[np.float32] = np.zeros((0, dim), dtype=np.float32)
+        self.ids: npt.NDArray[np.int64] = np.zeros(0, dtype=np.int64)
+
+        if writable:
+            path.mkdir(parents=True, exist_ok=True)
+        if (path / META_FILE).exists():
+            self.reload()
+        elif writable:
+            self.map_files(INITIAL_CAPACITY)
+            self.write_meta()
+
+    def read_meta(self) -> dict[str, Any]:
+        with open(self.path / META_FILE) as f:
+            meta: dict[str, Any] = json.load(f)
+        return meta
+
+    def write_meta(self) -> None:
+        meta = {"dim": self.dim, "size": self.size, "capacity": self.capacity}
+        tmp_path = self.path / (META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self.path / META_FILE)
+        self.meta_mtime_ns = (self.path / META_FILE).stat().st_mtime_ns
+
+    def map_files(self, capacity: int) -> None:
+        mode: Literal["r", "r+"]
+        if self.writable:
+            for file_name, row_bytes in (
+                (VECTORS_FILE, self.dim * 4),
+                (IDS_FILE, 8),
+            ):
+                with open(self.path / file_name, "ab") as f:
+                    f.truncate(max(capacity * row_bytes, f.tell()))
+            mode = "r+"
+            rows = capacity
+        else:
+            mode = "r"
+            rows = self.size
+        self.capacity = capacity
+        if rows == 0:
+            self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self.ids = np.zeros(0, dtype=np.int64)
+            return
+        self.vectors = np.memmap(
+            self.path / VECTORS_FILE,
+            dtype=np.float32,
+            mode=mode,
+            shape=(rows, self.dim),
+        )
+        self.ids = np.memmap(
+            self.path / IDS_FILE, dtype=np.int64, mode=mode, shape=(rows,)
+        )
+
+    def reload(self) -> None:
+        meta = self.read_meta()
+        if meta["dim"] != self.dim:
+            raise ValueError(
+                f"Index dim {meta['dim']} does not match configured dim {self.dim}"
+            )
+        self.size = meta["size"]
+        self.meta_mtime_ns = (self.path / META_FILE).stat().st_mtime_ns
+        self.map_files(meta["capacity"])
+        self.max_entry_id = int(self.ids[: self.size].max()) if self.size > 0 else 0
+
+    def refresh(self) -> None:
+        # Cheap stat() so that readers pick up rows appended by the worker
+        meta_path = self.path / META_FILE
+        if not meta_path.exists():
+            return
+        if meta_path.stat().st_mtime_ns != self.meta_mtime_ns:
+            self.reload()
+
+    def warm_up(self) -> None:
+        # Reads every published row once, so the mapped pages are in memory
+        # before the first search
+        for start in range(0, self.size, SEARCH_CHUNK_SIZE):
+            end = min(start + SEARCH_CHUNK_SIZE, self.size)
+            np.sum(self.vectors[start:end])
+            np.sum(self.ids[start:end])
+
+    def contains(self, entry_ids: npt.NDArray[np.int64]) -> npt.NDArray[np.bool_]:
+        return np.isin(entry_ids, self.ids[: self.size])
+
+    def add(
+        self, entry_ids: npt.NDArray[np.int64], vectors: npt.NDArray[np.float32]
+    ) -> None:
+        if not self.writable:
+            raise RuntimeError("RecommendationIndex is read-only")
+        count = len(entry_ids)
+        if count == 0:
+            return
+        # Only ids below the highest one can already be there
+        if entry_ids.min() <= self.max_entry_id and self.contains(entry_ids).any():
+            raise ValueError("Entry ids are already in the index")
+
+        if self.size + count > self.capacity:
+            capacity = self.capacity
+            while self.size + count > capacity:
+                capacity *= 2
+            self.flush()
+            self.map_files(capacity)
+
+        self.vectors[self.size : self.size + count] = vectors
+        self.ids[self.size : self.size + count] = entry_ids
+        self.size += count
+        self.max_entry_id = max(self.max_entry_id, int(entry_ids.max()))
+
+    def publish(self) -> None:
+        # Stores to a shared mapping are visible to readers through the page
+        # cache right away, so only meta.json has to be replaced. Batches are
+        # published together because the rename is the expensive part.
+        if not self.writable:
+            raise RuntimeError("RecommendationIndex is read-only")
+        self.write_meta()
+
+    def flush(self) -> None:
+        for array in (self.vectors, self.ids):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def get_vectors(self, entry_ids: list[int]) -> npt.NDArray[np.float32]:
+        # In the order of the rows. Entries committed late are appended after
+        # higher ids, so the ids are not sorted.
+        found = np.flatnonzero(np.isin(self.ids[: self.size], entry_ids))
+        return np.asarray(self.vectors[found], dtype=np.float32)
+
+    def search(
+        self,
+        queries: npt.NDArray[np.float32],
+        k: int,
+        exclude_ids: list[int] | None = None,
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        # Batched top-k by dot product. Each chunk of the matrix is multiplied
+        # by all queries at once, and only the best k per chunk are kept.
+        query_count = len(queries)
+        best_scores = np.full((query_count, 0), -np.inf, dtype=np.float32)
+        best_ids = np.zeros((query_count, 0), dtype=np.int64)
+        excluded = np.asarray(exclude_ids or [], dtype=np.int64)
+
+        for start in range(0, self.size, SEARCH_CHUNK_SIZE):
+            end = min(start + SEARCH_CHUNK_SIZE, self.size)
+            chunk_ids = np.asarray(self.ids[start:end])
+            scores = queries @ self.vectors[start:end].T
+            if len(excluded) > 0:
+                scores[:, np.isin(chunk_ids, excluded)] = -np.inf
+            if scores.shape[1] > k:
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+                scores = np.take_along_axis(scores, top, axis=1)
+                ids = chunk_ids[top]
+            else:
+                ids = np.broadcast_to(chunk_ids, scores.shape)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_ids = np.concatenate([best_ids, ids], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_ids = np.take_along_axis(best_ids, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+        best_ids = np.take_along_axis(best_ids, order, axis=1)
+        return best_ids, best_scores
+
+
+_index: RecommendationIndex | None = None
+
+
+def initialize_recommendation_index(path: str, dim: int, writable: bool) -> None:
+    global _index
+    if _index is not None:
+        raise RuntimeError("_index is not None. _index has already initialized")
+    _index = RecommendationIndex(Path(path), dim, writable)
+
+
+def finalize_recommendation_index() -> None:
+    global _index
+    if _index is None:
+        raise RuntimeError("_index is None. _index doesn't need to finalize")
+    _index.flush()
+    _index = None
+
+
+def get_recommendation_index() -> RecommendationIndex | None:
+    return _index
@@ -0,0 +1,86 @@
+from sqlmodel import Session, select, delete, func, Column
+from sqlalchemy.dialects.postgresql import insert
+from typing import Collection, Sequence, cast
+from datetime import datetime, timezone
+from .models.refresh_request import RefreshRequest
+
+# A new source has no entries at all, so it goes before manual refreshes
+REFRESH_PRIORITY_INITIAL = 100
+REFRESH_PRIORITY_MANUAL = 50
+
+
+def enqueue_refresh(
+    session: Session, feed_source_id: int, priority: int
+) -> RefreshRequest:
+    # Duplicate requests are coalesced into the pending one, which keeps its
+    # place in the queue and takes the higher priority
+    stmt = insert(RefreshRequest).values(
+        feed_source_id=feed_source_id,
+        priority=priority,
+        requested_at=datetime.now(timezone.utc),
+    )
+    table = stmt.table.c
+    upsert = stmt.on_conflict_do_update(
+        index_elements=["feed_source_id"],
+        set_={"priority": func.greatest(table.priority, stmt.excluded.priority)},
+    ).returning(RefreshRequest)
+    refresh_request = session.scalars(
+        upsert, execution_options={"populate_existing": True}
+    ).one()
+    session.commit()
+    return refresh_request
+
+
+def enqueue_refreshes(
+    session: Session, feed_source_ids: Sequence[int], priority: int
+) -> None:
+    # For sources created in the caller's transaction, which commits the
+    # requests along with them
+    if not feed_source_ids:
+        return
+    requested_at = datetime.now(timezone.utc)
+    stmt = insert(RefreshRequest).values(
+        [
+            {
+                "feed_source_id": feed_source_id,
+                "priority": priority,
+                "requested_at": requested_at,
+            }
+            for feed_source_id in feed_source_ids
+        ]
+    )
+    table = stmt.table.c
+    session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=["feed_source_id"],
+            set_={"priority": func.greatest(table.priority, stmt.excluded.priority)},
+        )
+    )
+
+
+def get_next_refresh_request(
+    session: Session, skipped_ids: Collection[int] = ()
+) -> int | None:
+    # The request stays queued until complete_refresh_request() is committed
+    # with the fetch, so it is not lost when the worker dies before the
+    # entries are stored. Workers that pick the same request are kept apart by
+    # the feed source lock, and the one that misses it skips the request.
+    feed_source_id = cast(Column[int], RefreshRequest.feed_source_id)
+    return session.exec(
+        select(feed_source_id)
+        .where(feed_source_id.not_in(skipped_ids))
+        .order_by(
+            cast(Column[int], RefreshRequest.priority).desc(),
+            cast(Column[datetime], RefreshRequest.requested_at),
+        )
+        .limit(1)
+    ).first()
+
+
+def complete_refresh_request(session: Session, feed_source_id: int) -> None:
+    # Committed by the caller
+    session.execute(
+        delete(RefreshRequest).where(
+            cast(Column[int], RefreshRequest.feed_source_id) == feed_source_id
+        )
+    )
@@ -0,0 +1,139 @@
+# Stores the feeds kept in the fetch archive (FETCH_ARCHIVE_DIR) again, without
+# the network: `python -m feedreader3.replay [--limit N] [--create-sources]`
+# Each archived response goes through the same parsing and store_feed_entries
+# as a fetch, so it serves as a repeatable throughput benchmark and as a
+# backfill after the parsing or storage changes.
+from .settings import initialize_settings, get_settings
+from .database import initialize_engine, finalize_engine, get_engine
+from .feed_archive import FeedArchive
+from .feed_fetcher import is_http_url
+from .feed_parser import EntryParser, create_entry_parser, iter_feed_entries
+from .jobs.fetch_feeds_job import FeedEntryCounts, lock_feed_source, store_feed_entries
+from .models.feed_source import FeedSource
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from sqlmodel import Session, Column, select
+from typing import cast
+import argparse
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReplayCounts:
+    records: int = 0
+    skipped_records: int = 0
+    replayed_bytes: int = 0
+    entries: FeedEntryCounts = field(default_factory=FeedEntryCounts)
+
+
+def replay_archive(
+    session: Session,
+    archive: FeedArchive,
+    entry_parser: EntryParser,
+    create_sources: bool = False,
+    limit: int | None = None,
+) -> ReplayCounts:
+    settings = get_settings()
+    counts = ReplayCounts()
+    # Sources are matched by URL, as ids differ between databases
+    feed_source_ids: dict[str, int | None] = {}
+    for record in archive.iter_records():
+        if limit is not None and counts.records + counts.skipped_records >= limit:
+            break
+        if record.feed_url not in feed_source_ids:
+            feed_source_ids[record.feed_url] = find_feed_source_id(
+                session, record.feed_url, create_sources
+            )
+        feed_source_id = feed_source_ids[record.feed_url]
+        if feed_source_id is None or not lock_feed_source(session, feed_source_id):
+            counts.skipped_records += 1
+            continue
+        feed_source = session.get(FeedSource, feed_source_id)
+        if feed_source is None:
+            raise ValueError(f"Feed source {feed_source_id} is locked but missing")
+        # Every entry is stored, even past a run of unchanged ones
+        entry_counts = store_feed_entries(
+            session,
+            feed_source,
+            iter_feed_entries(
+                archive.iter_chunks(record.sha256),
+                record.feed_url if is_http_url(record.feed_url) else None,
+                entry_parser,
+            ),
+            skip_duplicate_entries=settings.fetch_skip_duplicate_entries,
+        )
+        counts.records += 1
+        counts.replayed_bytes += record.size
+        counts.entries.add(entry_counts)
+    return counts
+
+
+def find_feed_source_id(
+    session: Session, feed_url: str, create_sources: bool
+) -> int | None:
+    feed_source_id = session.exec(
+        select(FeedSource.id).where(
+            FeedSource.feed_url == feed_url,
+            cast(Column[datetime | None], FeedSource.deleted_at).is_(None),
+        )
+    ).first()
+    if feed_source_id is not None:
+        return feed_source_id
+    if not create_sources:
+        logger.warning(f"No feed source for {feed_url}. Its records are skipped")
+        return None
+    feed_source = FeedSource(name=feed_url, feed_url=feed_url)
+    session.add(feed_source)
+    session.commit()
+    return feed_source.id
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    initialize_settings()
+    settings = get_settings()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archive-dir", default=settings.fetch_archive_dir)
+    parser.add_argument("--limit", type=int, default=None, help="Records to replay")
+    parser.add_argument(
+        "--create-sources",
+        action="store_true",
+        help="Add sources that are not in the database",
+    )
+    args = parser.parse_args()
+    if args.archive_dir is None:
+        parser.error("Set FETCH_ARCHIVE_DIR or pass --archive-dir")
+
+    initialize_engine()
+    try:
+        start = time.perf_counter()
+        with Session(get_engine()) as session:
+            counts = replay_archive(
+                session,
+                FeedArchive(Path(args.archive_dir)),
+                create_entry_parser(settings.fetch_parser_backend),
+                args.create_sources,
+                args.limit,
+            )
+        duration = time.perf_counter() - start
+    finally:
+        finalize_engine()
+
+    entries = counts.entries
+    print(
+        f"Replayed {counts.records} records ({counts.skipped_records} skipped), "
+        f"{counts.replayed_bytes / 1024 / 1024:.1f} MiB in {duration:.2f}s: "
+        f"{counts.records / duration:.0f} records/s, "
+        f"{counts.replayed_bytes / 1024 / 1024 / duration:.1f} MiB/s. "
+        f"new {entries.new}, updated {entries.updated}, "
+        f"unchanged {entries.unchanged}, "
+        f"skipped duplicates {entries.skipped_duplicates}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from typing import Any
+from fastapi import APIRouter, HTTPException, status
+from ..query_stats import get_query_stats, reset_query_stats
+from ..settings import get_settings
+
+# Statistics of the SQL this process has run. Only served with
+# DEBUG_QUERIES=true, as statements reveal the schema.
+router = APIRouter(prefix="/debug")
+
+
+def check_debug_queries_enabled() -> None:
+    if not get_settings().debug_queries:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Not Found")
+
+
+@router.get("/queries")
+async def read_query_stats() -> list[dict[str, Any]]:
+    check_debug_queries_enabled()
+    return get_query_stats()
+
+
+@router.delete("/queries", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_query_stats() -> None:
+    check_debug_queries_enabled()
+    reset_query_stats()
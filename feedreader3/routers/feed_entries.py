@@ -1,13 +1,44 @@
-from typing import Annotated, Sequence, Literal, cast
-from fastapi import Query, APIRouter
-from sqlmodel import select, func, Column
+from typing import Annotated, Any, Literal, cast, get_args
+from fastapi import status, Header, Query, HTTPException, APIRouter, Response
+from sqlmodel import select, func, and_, case, literal, null, Column
+from sqlalchemy import ColumnElement
+from sqlalchemy.orm import aliased
 from datetime import datetime
 from ..dependencies import SessionDep
-from ..models.feed_entry import FeedEntry
+from ..models.feed_entry import (
+    FeedEntry,
+    FeedEntryPublic,
+    FeedEntryTranslated,
+    FeedEntryRecommended,
+    FeedEntryDetail,
+)
+from ..models.feed_source import is_feed_source_deleted
+from ..models.translation import Translation
+from ..models.feed_entry_content import decompress_text
+from ..recommendation.index import get_recommendation_index
+from ..pagination import TOTAL_COUNT_HEADER, count_feed_entries
 from pydantic import AfterValidator
+from pydantic_core import to_json
+import numpy as np
 
 router = APIRouter(prefix="/feed-entries")
 
+# Fields of FeedEntryTranslated that can be selected with fields=
+FeedEntryField = Literal[
+    "id",
+    "feed_source_id",
+    "entry_id",
+    "entry_title",
+    "entry_link",
+    "entry_updated_at",
+    "updated_at",
+    "first_seen_at",
+    "entry_title_lang",
+]
+
+# One array per field instead of one object per entry, which repeats no keys
+COLUMNAR_MEDIA_TYPE = "application/vnd.feedreader3.columnar+json"
+
 
 def check_timezone_aware_datetime(dt: datetime) -> datetime:
     # https://docs.python.org/3.14/library/datetime.html#determining-if-an-object-is-aware-or-naive
@@ -16,9 +47,22 @@ def check_timezone_aware_datetime(dt: datetime) -> datetime:
     raise ValueError("Invalid datetime, it must be timezone-aware")
 
 
-@router.get("")
+@router.get(
+    "",
+    response_model=list[FeedEntryTranslated],
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                COLUMNAR_MEDIA_TYPE: {
+                    "example": {"id": [1, 2], "entry_title": ["First", "Second"]}
+                }
+            }
+        }
+    },
+)
 async def read_feed_entries(
     session: SessionDep,
+    response: Response,
     start: Annotated[
         datetime | None, AfterValidator(check_timezone_aware_datetime)
     ] = None,
@@ -28,18 +72,188 @@ async def read_feed_entries(
     order: Literal["asc", "desc"] = "asc",
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=100)] = 100,
-) -> Sequence[FeedEntry]:
+    dedupe: bool = False,
+    lang: Annotated[str | None, Query(pattern=r"^[A-Za-z-]{2,16}$")] = None,
+    fields: Annotated[list[FeedEntryField] | None, Query()] = None,
+    accept: Annotated[str | None, Header()] = None,
+) -> list[FeedEntryTranslated] | Response:
     ts = func.coalesce(FeedEntry.entry_updated_at, FeedEntry.first_seen_at)
     ts_order = ts.asc() if order == "asc" else ts.desc()
     id_col = cast(Column[int], FeedEntry.id)
     id_order = id_col.asc() if order == "asc" else id_col.desc()
 
-    query = select(FeedEntry)
+    translated_title = (
+        null()
+        if lang is None
+        else cast(Column[str | None], Translation.translated_text)
+    )
+    query = select(FeedEntry, translated_title).where(
+        ~is_feed_source_deleted(FeedEntry.feed_source_id)
+    )
+    if lang is not None:
+        # Translations are produced by the worker. Entries without a cached
+        # translation fall back to the original title.
+        query = query.outerjoin(
+            Translation,
+            and_(
+                Translation.source_hash == FeedEntry.entry_title_hash,
+                Translation.target_lang == lang,
+            ),
+        )
     if start is not None:
         query = query.where(start <= ts)
     if end is not None:
         query = query.where(ts <= end)
+    if dedupe:
+        # Keep only the first stored copy of each canonical link
+        other = aliased(FeedEntry)
+        other_id = cast(Column[int], other.id)
+        query = query.where(
+            ~select(other_id)
+            .where(
+                other.canonical_link_hash == FeedEntry.canonical_link_hash,
+                other_id < id_col,
+                ~is_feed_source_deleted(other.feed_source_id),
+            )
+            .exists()
+        )
     query = query.order_by(ts_order, id_order).offset(offset).limit(limit)
 
-    feed_entries = session.exec(query).all()
-    return feed_entries
+    # Only the unfiltered total is known from the per-source counters
+    headers = {}
+    if start is None and end is None and not dedupe:
+        headers[TOTAL_COUNT_HEADER] = str(count_feed_entries(session))
+    response.headers.update(headers)
+
+    columnar = accepts_media_type(accept, COLUMNAR_MEDIA_TYPE)
+    if fields is not None or columnar:
+        # Only the requested columns are selected, and the rows are serialized
+        # straight to JSON without building a model per entry
+        field_names = list(dict.fromkeys(fields or get_args(FeedEntryField)))
+        columns = get_feed_entry_columns(lang, translated_title)
+        projected_rows = session.execute(
+            query.with_only_columns(*(columns[name] for name in field_names))
+        ).all()
+        content: Any
+        if columnar:
+            content = {
+                name: [row[i] for row in projected_rows]
+                for i, name in enumerate(field_names)
+            }
+        else:
+            content = [dict(zip(field_names, row)) for row in projected_rows]
+        return Response(
+            to_json(content),
+            headers=headers,
+            media_type=COLUMNAR_MEDIA_TYPE if columnar else "application/json",
+        )
+
+    rows = session.exec(query).all()
+    return [
+        FeedEntryTranslated.model_validate(
+            feed_entry,
+            update={
+                "entry_title": translated_title or feed_entry.entry_title,
+                "entry_title_lang": lang if translated_title is not None else None,
+            },
+        )
+        for feed_entry, translated_title in rows
+    ]
+
+
+def accepts_media_type(accept: str | None, media_type: str) -> bool:
+    if accept is None:
+        return False
+    return any(
+        value.split(";")[0].strip().lower() == media_type for value in accept.split(",")
+    )
+
+
+def get_feed_entry_columns(
+    lang: str | None, translated_title: Any
+) -> dict[str, ColumnElement[Any]]:
+    # The same values as FeedEntryTranslated, computed in SQL
+    entry_title: ColumnElement[Any] = cast(Column[str], FeedEntry.entry_title)
+    entry_title_lang: ColumnElement[Any] = null()
+    if lang is not None:
+        entry_title = func.coalesce(func.nullif(translated_title, ""), entry_title)
+        entry_title_lang = case(
+            (translated_title.is_not(None), literal(lang)), else_=null()
+        )
+    return {
+        "id": cast(Column[int], FeedEntry.id),
+        "feed_source_id": cast(Column[int], FeedEntry.feed_source_id),
+        "entry_id": cast(Column[str], FeedEntry.entry_id),
+        "entry_title": entry_title,
+        "entry_link": cast(Column[str], FeedEntry.entry_link),
+        "entry_updated_at": cast(Column[datetime], FeedEntry.entry_updated_at),
+        "updated_at": cast(Column[datetime], FeedEntry.updated_at),
+        "first_seen_at": cast(Column[datetime], FeedEntry.first_seen_at),
+        "entry_title_lang": entry_title_lang,
+    }
+
+
+# Declared before /{feed_entry_id} so that "recommended" is not parsed as an id
+@router.get("/recommended", response_model=list[FeedEntryRecommended])
+async def read_recommended_feed_entries(
+    session: SessionDep,
+    ids: Annotated[list[int], Query(min_length=1, max_length=100)],
+    limit: Annotated[int, Query(ge=1, le=100)] = 10,
+) -> list[FeedEntryRecommended]:
+    index = get_recommendation_index()
+    if index is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Recommendation is disabled",
+        )
+    index.refresh()
+
+    # Entries similar to the given ones, scored against the sum of their vectors
+    seed_vectors = index.get_vectors(ids)
+    if len(seed_vectors) == 0:
+        return []
+    query = seed_vectors.sum(axis=0, keepdims=True)
+    recommended_ids, scores = index.search(query, limit, exclude_ids=ids)
+    recommendations = [
+        (int(feed_entry_id), float(score))
+        for feed_entry_id, score in zip(recommended_ids[0], scores[0])
+        if np.isfinite(score)
+    ]
+
+    id_col = cast(Column[int], FeedEntry.id)
+    feed_entries = {
+        feed_entry.id: feed_entry
+        for feed_entry in session.exec(
+            select(FeedEntry).where(
+                id_col.in_([feed_entry_id for feed_entry_id, _ in recommendations]),
+                ~is_feed_source_deleted(FeedEntry.feed_source_id),
+            )
+        ).all()
+    }
+    # Entries deleted after they were indexed, or of deleted sources, are skipped
+    return [
+        FeedEntryRecommended.model_validate(
+            feed_entries[feed_entry_id], update={"score": score}
+        )
+        for feed_entry_id, score in recommendations
+        if feed_entry_id in feed_entries
+    ]
+
+
+@router.get("/{feed_entry_id}", response_model=FeedEntryDetail)
+async def read_feed_entry(feed_entry_id: int, session: SessionDep) -> FeedEntryDetail:
+    feed_entry = session.get(FeedEntry, feed_entry_id)
+    if not feed_entry or feed_entry.feed_source.deleted_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Feed entry not found"
+        )
+    feed_entry_content = feed_entry.entry_content
+    return FeedEntryDetail(
+        **FeedEntryPublic.model_validate(feed_entry).model_dump(),
+        entry_summary=(
+            decompress_text(feed_entry_content.summary) if feed_entry_content else None
+        ),
+        entry_content=(
+            decompress_text(feed_entry_content.content) if feed_entry_content else None
+        ),
+    )
@@ -1,19 +1,40 @@
-from typing import Annotated, Any
-from fastapi import status, Query, HTTPException, APIRouter
-from sqlmodel import select
+from typing import Annotated, Any, Literal
+from fastapi import status, Body, Query, HTTPException, APIRouter, Response
+from sqlmodel import select, delete, update, Column
+from sqlalchemy.dialects.postgresql import insert
+from datetime import datetime, timezone
 from ..models.feed_source import (
     FeedSource,
     FeedSourcePublic,
     FeedSourceCreate,
     FeedSourceUpdate,
+    FeedSourceBatchUpdate,
+    FeedSourceBatchResult,
 )
+from ..models.feed_source_stats import (
+    FeedSourceStats,
+    FeedSourceStatsPublic,
+    FeedSourcePublicWithStats,
+)
+from ..models.refresh_request import RefreshRequest, RefreshRequestPublic
+from ..models.websub_subscription import WebSubSubscription
 from ..dependencies import SessionDep
+from ..refresh_queue import (
+    REFRESH_PRIORITY_INITIAL,
+    REFRESH_PRIORITY_MANUAL,
+    enqueue_refresh,
+    enqueue_refreshes,
+)
+from ..pagination import TOTAL_COUNT_HEADER, estimate_feed_source_count
 from sqlalchemy.exc import IntegrityError as SqlAlchemyIntegrityError
 from psycopg.errors import IntegrityError as PsycopgIntegrityError
 from typing import cast
 from ..models.feed_source import convert_url
 
 
+# Items in one batch request, and so in one transaction
+BATCH_MAX_ITEMS = 1000
+
 router = APIRouter(prefix="/feed-sources")
 
 
@@ -22,23 +43,36 @@ def try_commit(session: SessionDep) -> None:
         session.commit()
     except SqlAlchemyIntegrityError as exc:
         session.rollback()
-        orig = cast(PsycopgIntegrityError, exc.orig)
-        # PostgreSQL Error Code
-        # https://www.postgresql.org/docs/current/errcodes-appendix.html
-        # 23505: unique_violation
-        if orig.sqlstate == "23505":
-            field_name = str(orig.diag.constraint_name).removeprefix("ix_feedsource_")
-            raise HTTPException(
-                status.HTTP_409_CONFLICT,
-                {"field": field_name, "message": "already exists"},
-            )
-        else:
+        conflict = get_conflict(exc)
+        if conflict is None:
             raise
+        raise HTTPException(status.HTTP_409_CONFLICT, conflict)
     except Exception:
         session.rollback()
         raise
 
 
+def get_conflict(exc: SqlAlchemyIntegrityError) -> dict[str, str] | None:
+    orig = cast(PsycopgIntegrityError, exc.orig)
+    # PostgreSQL Error Code
+    # https://www.postgresql.org/docs/current/errcodes-appendix.html
+    # 23505: unique_violation
+    if orig.sqlstate != "23505":
+        return None
+    field_name = str(orig.diag.constraint_name).removeprefix("ix_feedsource_")
+    return {"field": field_name, "message": "already exists"}
+
+
+def get_feed_source(session: SessionDep, feed_source_id: int) -> FeedSource:
+    feed_source = session.get(FeedSource, feed_source_id)
+    # Deleted sources are kept only until the worker has purged their entries
+    if not feed_source or feed_source.deleted_at is not None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Feed source not found"
+        )
+    return feed_source
+
+
 HTTP_409_CONFLICT_RESPONSE = {
     "content": {
         "application/json": {
@@ -60,27 +94,263 @@ async def create_feed_source(feed_source: FeedSourceCreate, session: SessionDep)
     try_commit(session)
 
     session.refresh(db_feed_source)
+    # Entries are fetched right away instead of at the next scheduled run
+    enqueue_refresh(session, cast(int, db_feed_source.id), REFRESH_PRIORITY_INITIAL)
     return db_feed_source
 
 
-@router.get("", response_model=list[FeedSourcePublic])
+# Batches run in one transaction. Every item is first written with a single
+# statement, and only when that hits a unique violation is each item written
+# again in a savepoint of its own, to tell which of them conflict.
+@router.post("/batch", response_model=list[FeedSourceBatchResult])
+async def create_feed_sources(
+    feed_sources: Annotated[
+        list[FeedSourceCreate], Body(min_length=1, max_length=BATCH_MAX_ITEMS)
+    ],
+    session: SessionDep,
+) -> list[FeedSourceBatchResult]:
+    db_feed_sources = [
+        FeedSource.model_validate(feed_source) for feed_source in feed_sources
+    ]
+    try:
+        with session.begin_nested():
+            # Rows come back in the order of the parameters
+            created: list[FeedSource | dict[str, str]] = list(
+                session.scalars(
+                    insert(FeedSource).returning(
+                        FeedSource, sort_by_parameter_order=True
+                    ),
+                    [
+                        db_feed_source.model_dump(exclude={"id"})
+                        for db_feed_source in db_feed_sources
+                    ],
+                ).all()
+            )
+    except SqlAlchemyIntegrityError as exc:
+        if get_conflict(exc) is None:
+            raise
+        created = []
+        for db_feed_source in db_feed_sources:
+            conflict = add_in_savepoint(session, db_feed_source)
+            created.append(db_feed_source if conflict is None else conflict)
+
+    # Entries are fetched right away instead of at the next scheduled run
+    enqueue_refreshes(
+        session,
+        [cast(int, item.id) for item in created if isinstance(item, FeedSource)],
+        REFRESH_PRIORITY_INITIAL,
+    )
+    # Built before the commit expires the sources, which would otherwise be
+    # loaded again one by one
+    results = [
+        FeedSourceBatchResult(
+            status=status.HTTP_201_CREATED,
+            feed_source=FeedSourcePublic.model_validate(item),
+        )
+        if isinstance(item, FeedSource)
+        else FeedSourceBatchResult(status=status.HTTP_409_CONFLICT, detail=item)
+        for item in created
+    ]
+    try_commit(session)
+    return results
+
+
+def add_in_savepoint(
+    session: SessionDep, feed_source: FeedSource
+) -> dict[str, str] | None:
+    try:
+        with session.begin_nested():
+            session.add(feed_source)
+    except SqlAlchemyIntegrityError as exc:
+        conflict = get_conflict(exc)
+        if conflict is None:
+            raise
+        return conflict
+    return None
+
+
+@router.patch("/batch", response_model=list[FeedSourceBatchResult])
+async def update_feed_sources(
+    feed_sources: Annotated[
+        list[FeedSourceBatchUpdate], Body(min_length=1, max_length=BATCH_MAX_ITEMS)
+    ],
+    session: SessionDep,
+) -> list[FeedSourceBatchResult]:
+    # One SELECT for every source instead of a session.get() per item
+    db_feed_sources = {
+        db_feed_source.id: db_feed_source
+        for db_feed_source in session.exec(
+            select(FeedSource).where(
+                cast(Column[int], FeedSource.id).in_(
+                    {feed_source.id for feed_source in feed_sources}
+                ),
+                cast(Column[datetime | None], FeedSource.deleted_at).is_(None),
+            )
+        )
+    }
+    updates = []
+    for feed_source in feed_sources:
+        feed_source_data = feed_source.model_dump(exclude_unset=True, exclude={"id"})
+        if "feed_url" in feed_source_data:
+            feed_source_data["feed_url"] = convert_url(feed_source_data["feed_url"])
+        updates.append((db_feed_sources.get(feed_source.id), feed_source_data))
+
+    conflicts: list[dict[str, str] | None]
+    try:
+        # The changed rows are flushed together when the savepoint ends
+        with session.begin_nested():
+            for db_feed_source, feed_source_data in updates:
+                if db_feed_source is not None:
+                    db_feed_source.sqlmodel_update(feed_source_data)
+        conflicts = [None] * len(updates)
+    except SqlAlchemyIntegrityError as exc:
+        if get_conflict(exc) is None:
+            raise
+        # The rolled back sources are loaded again as they were
+        conflicts = [
+            update_in_savepoint(session, db_feed_source, feed_source_data)
+            if db_feed_source is not None
+            else None
+            for db_feed_source, feed_source_data in updates
+        ]
+
+    # Built before the commit, as for created sources
+    results = []
+    for (db_feed_source, _), conflict in zip(updates, conflicts):
+        if db_feed_source is None:
+            results.append(
+                FeedSourceBatchResult(
+                    status=status.HTTP_404_NOT_FOUND, detail="Feed source not found"
+                )
+            )
+        elif conflict is not None:
+            results.append(
+                FeedSourceBatchResult(status=status.HTTP_409_CONFLICT, detail=conflict)
+            )
+        else:
+            results.append(
+                FeedSourceBatchResult(
+                    status=status.HTTP_200_OK,
+                    feed_source=FeedSourcePublic.model_validate(db_feed_source),
+                )
+            )
+    try_commit(session)
+    return results
+
+
+def update_in_savepoint(
+    session: SessionDep, feed_source: FeedSource, feed_source_data: dict[str, Any]
+) -> dict[str, str] | None:
+    try:
+        with session.begin_nested():
+            feed_source.sqlmodel_update(feed_source_data)
+    except SqlAlchemyIntegrityError as exc:
+        conflict = get_conflict(exc)
+        if conflict is None:
+            raise
+        return conflict
+    return None
+
+
+@router.delete("/batch", response_model=list[FeedSourceBatchResult])
+async def delete_feed_sources(
+    feed_source_ids: Annotated[
+        list[int], Body(min_length=1, max_length=BATCH_MAX_ITEMS)
+    ],
+    session: SessionDep,
+) -> list[FeedSourceBatchResult]:
+    # Marks the sources deleted as DELETE /feed-sources/{id} does
+    deleted_ids = set(
+        session.execute(
+            update(FeedSource)
+            .where(
+                cast(Column[int], FeedSource.id).in_(set(feed_source_ids)),
+                cast(Column[datetime | None], FeedSource.deleted_at).is_(None),
+            )
+            .values(deleted_at=datetime.now(timezone.utc))
+            .returning(cast(Column[int], FeedSource.id))
+        ).scalars()
+    )
+    session.execute(
+        delete(RefreshRequest).where(
+            cast(Column[int], RefreshRequest.feed_source_id).in_(deleted_ids)
+        )
+    )
+    session.execute(
+        delete(WebSubSubscription).where(
+            cast(Column[int], WebSubSubscription.feed_source_id).in_(deleted_ids)
+        )
+    )
+    session.commit()
+    return [
+        FeedSourceBatchResult(status=status.HTTP_204_NO_CONTENT)
+        if feed_source_id in deleted_ids
+        else FeedSourceBatchResult(
+            status=status.HTTP_404_NOT_FOUND, detail="Feed source not found"
+        )
+        for feed_source_id in feed_source_ids
+    ]
+
+
+@router.get("", response_model=list[FeedSourcePublicWithStats])
 async def read_feed_sources(
     session: SessionDep,
+    response: Response,
     offset: Annotated[int, Query(ge=0)] = 0,
     limit: Annotated[int, Query(ge=1, le=100)] = 100,
-) -> Any:
-    feed_sources = session.exec(select(FeedSource).offset(offset).limit(limit)).all()
-    return feed_sources
+    sort: Literal["id", "freshness"] = "id",
+) -> list[FeedSourcePublicWithStats]:
+    id_col = cast(Column[int], FeedSource.id)
+    query = (
+        select(FeedSource, FeedSourceStats)
+        .outerjoin(
+            FeedSourceStats,
+            cast(Column[int], FeedSourceStats.feed_source_id) == id_col,
+        )
+        .where(cast(Column[datetime | None], FeedSource.deleted_at).is_(None))
+    )
+    if sort == "freshness":
+        # Sources that produced new entries most recently first
+        last_new_entry_at = cast(Column[Any], FeedSourceStats.last_new_entry_at)
+        query = query.order_by(last_new_entry_at.desc().nulls_last(), id_col)
+    else:
+        query = query.order_by(id_col)
+    rows = session.exec(query.offset(offset).limit(limit)).all()
+
+    response.headers[TOTAL_COUNT_HEADER] = str(estimate_feed_source_count(session))
+    return [
+        FeedSourcePublicWithStats.model_validate(
+            feed_source,
+            update={
+                "stats": (
+                    FeedSourceStatsPublic.model_validate(feed_source_stats)
+                    if feed_source_stats is not None
+                    else None
+                )
+            },
+        )
+        for feed_source, feed_source_stats in rows
+    ]
 
 
 @router.get("/{feed_source_id}", response_model=FeedSourcePublic)
 async def read_feed_source(feed_source_id: int, session: SessionDep) -> FeedSource:
-    feed_source = session.get(FeedSource, feed_source_id)
-    if not feed_source:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Feed source not found"
-        )
-    return feed_source
+    return get_feed_source(session, feed_source_id)
+
+
+@router.post(
+    "/{feed_source_id}/refresh",
+    status_code=status.HTTP_202_ACCEPTED,
+    response_model=RefreshRequestPublic,
+)
+async def refresh_feed_source(
+    feed_source_id: int,
+    session: SessionDep,
+    priority: Annotated[int, Query(ge=0, le=100)] = REFRESH_PRIORITY_MANUAL,
+) -> RefreshRequest:
+    # The worker fetches the source ahead of the scheduled ones
+    get_feed_source(session, feed_source_id)
+    return enqueue_refresh(session, feed_source_id, priority)
 
 
 @router.patch(
@@ -91,11 +361,7 @@ async def read_feed_source(feed_source_id: int, session: SessionDep) -> FeedSour
 async def update_feed_source(
     feed_source_id: int, feed_source: FeedSourceUpdate, session: SessionDep
 ) -> Any:
-    db_feed_source = session.get(FeedSource, feed_source_id)
-    if not db_feed_source:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Feed source not found"
-        )
+    db_feed_source = get_feed_source(session, feed_source_id)
     feed_source_data = feed_source.model_dump(exclude_unset=True)
     if "feed_url" in feed_source_data:
         feed_source_data["feed_url"] = convert_url(feed_source_data["feed_url"])
@@ -108,10 +374,21 @@ async def update_feed_source(
 
 @router.delete("/{feed_source_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_feed_source(feed_source_id: int, session: SessionDep) -> None:
-    feed_source = session.get(FeedSource, feed_source_id)
-    if not feed_source:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND, detail="Feed source not found"
+    # Only marks the source deleted, which hides it and its entries. Deleting
+    # every entry in this request would hold one long transaction, so the
+    # worker purges them in chunks (purge_feed_sources_job).
+    feed_source = get_feed_source(session, feed_source_id)
+    feed_source.deleted_at = datetime.now(timezone.utc)
+    session.add(feed_source)
+    # Nothing is fetched or pushed for the source from now on
+    session.execute(
+        delete(RefreshRequest).where(
+            cast(Column[int], RefreshRequest.feed_source_id) == feed_source_id
+        )
+    )
+    session.execute(
+        delete(WebSubSubscription).where(
+            cast(Column[int], WebSubSubscription.feed_source_id) == feed_source_id
         )
-    session.delete(feed_source)
+    )
     session.commit()
@@ -1,9 +1,178 @@
-from fastapi import APIRouter
+from typing import Annotated, Any, cast
+from fastapi import APIRouter, Query, Response, status
+from sqlalchemy import Float, QueuePool, text
+from sqlmodel import Column, select, func
+from datetime import datetime, timezone, timedelta
+from ..database import get_engine
+from ..dependencies import SessionDep
+from ..models.feed_entry import FeedEntry
+from ..models.feed_source import FeedSource
+from ..models.feed_source_stats import FeedSourceStats
+from ..models.worker_heartbeat import WorkerHeartbeat
+from ..settings import get_settings
+import time
 
+# Sources listed by how long ago they were last fetched
+STALEST_SOURCES = 10
 
 router = APIRouter(prefix="/health")
 
 
+# Liveness: the process answers
 @router.get("")
 async def check_health() -> dict[str, str]:
     return {"status": "healthy"}
+
+
+# Readiness: the process can serve requests that need the database. Load
+# balancers stop routing to an instance that answers 503.
+@router.get("/ready")
+async def check_readiness(response: Response) -> dict[str, Any]:
+    settings = get_settings()
+    engine = get_engine()
+    pool: dict[str, Any] = {"status": "ok"}
+    if isinstance(engine.pool, QueuePool):
+        checked_out = engine.pool.checkedout()
+        capacity = engine.pool.size() + settings.database_max_overflow
+        pool |= {"checked_out": checked_out, "capacity": capacity}
+        if checked_out >= capacity:
+            pool["status"] = "exhausted"
+
+    # A ping on an exhausted pool would wait for a connection to be returned
+    database: dict[str, Any] = {"status": "skipped"}
+    if pool["status"] == "ok":
+        start = time.perf_counter()
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+        except Exception as exc:
+            database = {"status": "unreachable", "error": str(exc)}
+        else:
+            latency_ms = (time.perf_counter() - start) * 1000
+            database = {
+                "status": "ok"
+                if latency_ms <= settings.health_max_db_latency_ms
+                else "slow",
+                "latency_ms": round(latency_ms, 1),
+            }
+
+    ready = pool["status"] == "ok" and database["status"] == "ok"
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "status": "ready" if ready else "unavailable",
+        "database": database,
+        "pool": pool,
+    }
+
+
+# How far behind the feeds the worker is. For dashboards and alerts rather
+# than load balancers: a stalled worker does not stop the web app serving.
+@router.get("/freshness")
+async def read_freshness(
+    session: SessionDep,
+    entries: Annotated[int, Query(ge=1, le=100000)] = 10000,
+    hours: Annotated[int, Query(ge=1, le=24 * 30)] = 24,
+) -> dict[str, Any]:
+    settings = get_settings()
+    now = datetime.now(timezone.utc)
+
+    workers = []
+    for heartbeat in session.exec(
+        select(WorkerHeartbeat).order_by(WorkerHeartbeat.job_id)
+    ).all():
+        age_seconds = (now - heartbeat.beat_at).total_seconds()
+        workers.append(
+            {
+                **heartbeat.model_dump(),
+                "age_seconds": round(age_seconds),
+                "stalled": age_seconds > settings.health_max_heartbeat_age_seconds,
+            }
+        )
+
+    return {
+        "workers": workers,
+        "sources": get_fetch_lag(session),
+        "entries": get_publish_delay(session, entries, hours),
+    }
+
+
+def get_seconds_since(column: Any) -> Any:
+    return func.extract("epoch", func.now() - column).cast(Float)
+
+
+def get_percentiles(expression: Any) -> list[Any]:
+    return [
+        func.percentile_cont(fraction).within_group(expression)
+        for fraction in (0.5, 0.99)
+    ]
+
+
+def get_fetch_lag(session: SessionDep) -> dict[str, Any]:
+    # Time since each live source was last fetched successfully
+    last_fetched_at = cast(Column[datetime | None], FeedSourceStats.last_fetched_at)
+    lag = get_seconds_since(last_fetched_at)
+    live_sources = (
+        select(FeedSource.id, FeedSource.name, last_fetched_at)
+        .outerjoin(
+            FeedSourceStats,
+            cast(Column[int], FeedSourceStats.feed_source_id)
+            == cast(Column[int], FeedSource.id),
+        )
+        .where(cast(Column[datetime | None], FeedSource.deleted_at).is_(None))
+    )
+    count, never_fetched, p50, p99, max_lag = session.execute(
+        live_sources.with_only_columns(
+            func.count(),
+            func.count().filter(last_fetched_at.is_(None)),
+            *get_percentiles(lag),
+            func.max(lag),
+        )
+    ).one()
+    stalest = session.execute(
+        live_sources.add_columns(lag)
+        .where(last_fetched_at.is_not(None))
+        .order_by(last_fetched_at)
+        .limit(STALEST_SOURCES)
+    ).all()
+    return {
+        "count": count,
+        "never_fetched": never_fetched,
+        "fetch_lag_seconds": {"p50": p50, "p99": p99, "max": max_lag},
+        "stalest": [
+            {
+                "feed_source_id": feed_source_id,
+                "name": name,
+                "last_fetched_at": fetched_at,
+                "lag_seconds": round(lag_seconds),
+            }
+            for feed_source_id, name, fetched_at, lag_seconds in stalest
+        ],
+    }
+
+
+def get_publish_delay(session: SessionDep, entries: int, hours: int) -> dict[str, Any]:
+    # From the time in the feed to first_seen_at, over the newest entries. Only
+    # entries dated within the last hours count, so that the old entries found
+    # when a source is added do not stand for delays.
+    first_seen_at = cast(Column[datetime], FeedEntry.first_seen_at)
+    entry_updated_at = cast(Column[datetime | None], FeedEntry.entry_updated_at)
+    newest = (
+        select(first_seen_at, entry_updated_at)
+        .order_by(cast(Column[int], FeedEntry.id).desc())
+        .limit(entries)
+        .subquery()
+    )
+    delay = func.greatest(
+        func.extract("epoch", newest.c.first_seen_at - newest.c.entry_updated_at), 0
+    ).cast(Float)
+    sample_size, p50, p99 = session.exec(
+        select(func.count(), *get_percentiles(delay)).where(
+            newest.c.entry_updated_at
+            >= datetime.now(timezone.utc) - timedelta(hours=hours)
+        )
+    ).one()
+    return {
+        "sample_size": sample_size,
+        "publish_delay_seconds": {"p50": p50, "p99": p99},
+    }
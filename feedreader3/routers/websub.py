@@ -0,0 +1,120 @@
+from typing import Annotated
+from fastapi import status, Query, HTTPException, APIRouter, Request
+from fastapi.responses import PlainTextResponse
+from datetime import datetime, timezone, timedelta
+from ..dependencies import SessionDep
+from ..feed_parser import create_entry_parser, iter_feed_entries
+from ..jobs.fetch_feeds_job import lock_feed_source, store_feed_entries
+from ..models.feed_source import FeedSource
+from ..models.websub_subscription import WebSubSubscription
+from ..settings import get_settings
+from ..websub import SIGNATURE_HEADER, verify_signature
+import logging
+
+logger = logging.getLogger("uvicorn." + __name__)
+
+# WEBSUB_CALLBACK_URL points here, followed by the feed source id
+router = APIRouter(prefix="/websub/callback")
+
+
+@router.get("/{feed_source_id}", response_class=PlainTextResponse)
+async def verify_websub_intent(
+    feed_source_id: int,
+    session: SessionDep,
+    mode: Annotated[str, Query(alias="hub.mode")],
+    topic: Annotated[str, Query(alias="hub.topic")],
+    challenge: Annotated[str | None, Query(alias="hub.challenge")] = None,
+    lease_seconds: Annotated[int | None, Query(alias="hub.lease_seconds", ge=0)] = None,
+) -> str:
+    # The hub confirms that we asked for this. Echoing the challenge agrees,
+    # 404 refuses.
+    subscription = session.get(WebSubSubscription, feed_source_id)
+    if mode == "unsubscribe":
+        # Only sources that were deleted (and their subscription with them)
+        # are let go
+        if subscription is None and challenge is not None:
+            return challenge
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Subscription is still in use")
+    if subscription is None or subscription.topic_url != topic:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Subscription not found")
+
+    log_extra = {"feed_source_id": feed_source_id, "topic_url": topic}
+    if mode == "denied":
+        subscription.state = "denied"
+        session.add(subscription)
+        session.commit()
+        logger.warning("WebSub hub denied the subscription", extra=log_extra)
+        return ""
+    if mode != "subscribe" or challenge is None:
+        raise HTTPException(status.HTTP_404_NOT_FOUND, "Unexpected verification")
+
+    if lease_seconds is None:
+        lease_seconds = get_settings().websub_lease_seconds
+    subscription.state = "active"
+    subscription.lease_expires_at = datetime.now(timezone.utc) + timedelta(
+        seconds=lease_seconds
+    )
+    session.add(subscription)
+    session.commit()
+    logger.info(
+        "WebSub subscription verified",
+        extra={**log_extra, "lease_seconds": lease_seconds},
+    )
+    return challenge
+
+
+@router.post("/{feed_source_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def receive_websub_delivery(
+    feed_source_id: int, request: Request, session: SessionDep
+) -> None:
+    settings = get_settings()
+    subscription = session.get(WebSubSubscription, feed_source_id)
+    # 410 tells the hub to drop a subscription we no longer have
+    if subscription is None or subscription.state == "denied":
+        raise HTTPException(status.HTTP_410_GONE, "Subscription not found")
+
+    # Same limit as for fetched feeds
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > settings.fetch_max_bytes:
+            raise HTTPException(status.HTTP_413_CONTENT_TOO_LARGE, "Payload too large")
+
+    log_extra = {"feed_source_id": feed_source_id, "topic_url": subscription.topic_url}
+    if not verify_signature(
+        subscription.secret, bytes(body), request.headers.get(SIGNATURE_HEADER)
+    ):
+        # Still acknowledged, as the spec asks, so a forger learns nothing
+        logger.warning("Ignored WebSub delivery with a bad signature", extra=log_extra)
+        return
+
+    feed_source = session.get(FeedSource, feed_source_id)
+    if feed_source is None:
+        raise HTTPException(status.HTTP_410_GONE, "Feed source not found")
+    # Stored under the same lock as a fetch, so the two never insert the same
+    # entries at once. The hub retries a delivery that fails with a 5xx.
+    if not lock_feed_source(session, feed_source_id):
+        logger.info("Deferred WebSub delivery to a busy source", extra=log_extra)
+        raise HTTPException(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Feed source is being fetched",
+            headers={"Retry-After": "10"},
+        )
+    subscription.last_delivery_at = datetime.now(timezone.utc)
+    session.add(subscription)
+    # The payload is the updated feed, stored like a fetched one
+    counts = store_feed_entries(
+        session,
+        feed_source,
+        iter_feed_entries(
+            [bytes(body)],
+            subscription.topic_url,
+            create_entry_parser(settings.fetch_parser_backend),
+        ),
+        skip_duplicate_entries=settings.fetch_skip_duplicate_entries,
+        entry_log_sample_rate=settings.log_entry_sample_rate,
+    )
+    logger.info(
+        "Received WebSub delivery",
+        extra={**log_extra, **vars(counts), "delivered_bytes": len(body)},
+    )
@@ -1,40 +1,179 @@
-from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.events import (
+    EVENT_JOB_MAX_INSTANCES,
+    EVENT_JOB_MISSED,
+    JobEvent,
+    JobExecutionEvent,
+)
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from .jobs.fetch_feeds_job import fetch_feeds_job
+from apscheduler.triggers.interval import IntervalTrigger
+from concurrent.futures import ThreadPoolExecutor
+from .heartbeat import count_skipped_run
+from .jobs.fetch_feeds_job import (
+    fetch_feeds_job,
+    refresh_feeds_job,
+    renew_websub_subscriptions_job,
+)
+from .jobs.process_feed_entries_job import process_feed_entries_job
+from .jobs.purge_feed_sources_job import purge_feed_sources_job
 from datetime import timezone
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
-_scheduler: BlockingScheduler | None = None
+_scheduler: AsyncIOScheduler | None = None
+_executor: ThreadPoolExecutor | None = None
+_executor_threads = 0
+_retired_executors: list[ThreadPoolExecutor] = []
 
 
-def get_scheduler() -> BlockingScheduler:
+def get_scheduler() -> AsyncIOScheduler:
     if _scheduler is None:
         raise RuntimeError("_scheduler is None. Call initialize_scheduler()")
     return _scheduler
 
 
-def initialize_scheduler(crontab_expr: str, misfire_grace_time: int) -> None:
+def initialize_scheduler(
+    crontab_expr: str,
+    misfire_grace_time: int,
+    fetch_shards: int,
+    maintenance_interval_seconds: int,
+    refresh_interval_seconds: int,
+    purge_interval_seconds: int,
+) -> None:
     global _scheduler
     if _scheduler is not None:
         if _scheduler.running:
-            # With BlockingScheduler, control never returns after start().
-            # So this exception is never raised.
-            raise RuntimeError(
-                "_scheduler is running. BlockingScheduler cannot be reinitialized"
-            )
+            raise RuntimeError("_scheduler is running. Stop it before reinitializing")
         logger.warning("_scheduler has been already initialized. Reinitialize it")
         _scheduler = None
 
-    _scheduler = BlockingScheduler()
-    _scheduler.add_job(
-        fetch_feeds_job,
-        CronTrigger.from_crontab(crontab_expr, timezone.utc),
-        misfire_grace_time=misfire_grace_time,
+    # Every job runs in a thread of its own, and at most one run of each job at
+    # a time, so a slow job only ever delays itself
+    _scheduler = AsyncIOScheduler()
+    _scheduler.add_listener(
+        record_skipped_run, EVENT_JOB_MISSED | EVENT_JOB_MAX_INSTANCES
+    )
+    schedule_jobs(
+        crontab_expr,
+        misfire_grace_time,
+        fetch_shards,
+        maintenance_interval_seconds,
+        refresh_interval_seconds,
+        purge_interval_seconds,
+    )
+
+
+def schedule_jobs(
+    crontab_expr: str,
+    misfire_grace_time: int,
+    fetch_shards: int,
+    maintenance_interval_seconds: int,
+    refresh_interval_seconds: int,
+    purge_interval_seconds: int,
+) -> None:
+    # Called again with reloaded settings while the scheduler runs. The jobs
+    # are replaced in place: a run in progress finishes as it started, and no
+    # job runs twice at once, as the instances are counted by job id.
+    scheduler = get_scheduler()
+    for shard in range(fetch_shards):
+        scheduler.add_job(
+            fetch_feeds_job,
+            CronTrigger.from_crontab(crontab_expr, timezone.utc),
+            args=(shard, fetch_shards),
+            id=f"fetch_feeds_job:{shard}",
+            misfire_grace_time=misfire_grace_time,
+            coalesce=True,
+            max_instances=1,
+            replace_existing=True,
+        )
+    # Shards left over from a larger count
+    for job in scheduler.get_jobs():
+        if job.id.startswith("fetch_feeds_job:") and job.args[0] >= fetch_shards:
+            job.remove()
+    # Requested refreshes. A run that finds the queue empty costs one query.
+    scheduler.add_job(
+        refresh_feeds_job,
+        IntervalTrigger(seconds=refresh_interval_seconds),
+        id="refresh_feeds_job",
+        coalesce=True,
+        max_instances=1,
+        replace_existing=True,
+    )
+    # Maintenance
+    scheduler.add_job(
+        process_feed_entries_job,
+        IntervalTrigger(seconds=maintenance_interval_seconds),
+        id="process_feed_entries_job",
+        coalesce=True,
+        max_instances=1,
+        replace_existing=True,
+    )
+    scheduler.add_job(
+        renew_websub_subscriptions_job,
+        IntervalTrigger(seconds=maintenance_interval_seconds),
+        id="renew_websub_subscriptions_job",
         coalesce=True,
+        max_instances=1,
+        replace_existing=True,
+    )
+    # Entries of deleted sources, removed in the background
+    scheduler.add_job(
+        purge_feed_sources_job,
+        IntervalTrigger(seconds=purge_interval_seconds),
+        id="purge_feed_sources_job",
+        coalesce=True,
+        max_instances=1,
+        replace_existing=True,
+    )
+    if scheduler.running and len(scheduler.get_jobs()) > _executor_threads:
+        set_executor(len(scheduler.get_jobs()))
+
+
+def set_executor(threads: int) -> None:
+    # Jobs are plain functions, which the scheduler runs in the event loop's
+    # default executor. One thread per job is enough for all of them at once.
+    global _executor, _executor_threads
+    if _executor is not None:
+        # Its running jobs finish first. run_scheduler() waits for them.
+        _retired_executors.append(_executor)
+        _executor.shutdown(wait=False)
+    _executor = ThreadPoolExecutor(threads, "scheduler")
+    _executor_threads = threads
+    asyncio.get_running_loop().set_default_executor(_executor)
+
+
+def record_skipped_run(event: JobEvent) -> None:
+    skipped_runs = count_skipped_run(event.job_id)
+    # Missed runs come as JobExecutionEvent, skipped ones as JobSubmissionEvent
+    scheduled_run_time = (
+        event.scheduled_run_time
+        if isinstance(event, JobExecutionEvent)
+        else event.scheduled_run_times[-1]
+    )
+    logger.warning(
+        "Scheduled job run skipped",
+        extra={
+            "job_id": event.job_id,
+            "reason": "missed" if event.code == EVENT_JOB_MISSED else "still_running",
+            "scheduled_run_time": scheduled_run_time.isoformat(),
+            "skipped_runs": skipped_runs,
+        },
     )
 
 
-def startup_scheduler() -> None:
-    get_scheduler().start()
+async def run_scheduler(stopped: asyncio.Event) -> None:
+    global _executor, _executor_threads
+    scheduler = get_scheduler()
+    set_executor(len(scheduler.get_jobs()))
+    scheduler.start()
+    await stopped.wait()
+    # Running jobs are not interrupted. asyncio.run() waits for them when it
+    # shuts down the default executor, but not for executors that were
+    # replaced on the way.
+    scheduler.shutdown(wait=False)
+    while _retired_executors:
+        await asyncio.to_thread(_retired_executors.pop().shutdown)
+    _executor = None
+    _executor_threads = 0
@@ -0,0 +1,30 @@
+# Production server for the web app: `python -m feedreader3.serve`
+# Each worker is a separate process with its own connection pool, and runs
+# the app's lifespan (which warms the pool) before it accepts connections.
+import os
+import uvicorn
+
+
+def get_web_workers() -> int:
+    # Read apart from Settings, which each worker process loads for itself
+    workers = int(os.getenv("WEB_WORKERS", 0))
+    if workers > 0:
+        return workers
+    return os.cpu_count() or 1
+
+
+def main() -> None:
+    uvicorn.run(
+        "feedreader3.main:app",
+        host=os.getenv("WEB_HOST", "0.0.0.0"),
+        port=int(os.getenv("WEB_PORT", 8000)),
+        workers=get_web_workers(),
+        # On SIGTERM a worker stops accepting, lets running requests finish for
+        # up to this long, and then runs the lifespan shutdown
+        timeout_graceful_shutdown=int(os.getenv("WEB_GRACEFUL_SHUTDOWN_SECONDS", 30)),
+        proxy_headers=True,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,190 @@
+from apscheduler.triggers.cron import CronTrigger
+from pydantic import Field, ValidationError, field_validator
+from pydantic_settings import (
+    BaseSettings,
+    NoDecode,
+    PydanticBaseSettingsSource,
+    SettingsConfigDict,
+)
+from typing import Annotated, Any, Literal
 import os
 import logging
 
 logger = logging.getLogger("uvicorn." + __name__)
 
+# Never logged
+SECRET_SETTINGS = frozenset({"postgres_password"})
 
-class Settings:
-    scheduler_crontab_expr: str
-    scheduler_misfire_grace_time: int
+# Keys of ENTRY_PARSER_FACTORIES, TRANSLATOR_FACTORIES and
+# SPAN_EXPORTER_FACTORIES, plus "none" where the feature can be turned off.
+# Spelled out here so that loading the settings imports none of the backends.
+ParserBackend = Literal["fast", "feedparser"]
+TranslationBackend = Literal["none", "stub"]
+TracingExporter = Literal["none", "console", "file", "otlp"]
+
+# Settings that reload_settings() applies to a running worker. Jobs read them
+# when a run starts or a source is fetched, and the worker reschedules its jobs
+# or reconfigures the HTTP client and the query statistics for the rest.
+# Everything else is read once at startup and takes a restart.
+RELOADABLE_SETTINGS = frozenset(
+    {
+        "scheduler_crontab_expr",
+        "scheduler_misfire_grace_time",
+        "scheduler_fetch_shards",
+        "scheduler_maintenance_interval_seconds",
+        "scheduler_refresh_interval_seconds",
+        "scheduler_purge_interval_seconds",
+        "fetch_skip_duplicate_entries",
+        "fetch_max_bytes",
+        "fetch_connect_timeout",
+        "fetch_read_timeout",
+        "fetch_total_timeout",
+        "fetch_stop_after_unchanged",
+        "fetch_parser_backend",
+        "fetch_dns_cache_ttl",
+        "fetch_cycle_budget_seconds",
+        "purge_batch_size",
+        "websub_lease_seconds",
+        "websub_renew_before_seconds",
+        "websub_poll_interval_hours",
+        "translation_target_langs",
+        "translation_batch_size",
+        "translation_lookback_hours",
+        "recommendation_batch_size",
+        "recommendation_lookback_hours",
+        "log_entry_sample_rate",
+        "database_slow_query_ms",
+        "database_explain_sample_rate",
+    }
+)
+
+
+# Each setting is read from the environment variable of the same name in upper
+# case. An empty variable counts as unset.
+class Settings(BaseSettings):
+    model_config = SettingsConfigDict(env_ignore_empty=True, extra="ignore")
+
+    scheduler_crontab_expr: str = "*/10 * * * *"
+    scheduler_misfire_grace_time: int = Field(default=30, ge=1)
+    # Sources are split into this many fetch jobs that run at the same time
+    scheduler_fetch_shards: int = Field(default=4, ge=1)
+    # How often translation, indexing and WebSub renewal run
+    scheduler_maintenance_interval_seconds: int = Field(default=60, ge=1)
+    # How often the worker looks for requested refreshes between scheduled runs
+    scheduler_refresh_interval_seconds: int = Field(default=5, ge=1)
+    # How often the worker looks for deleted sources to purge
+    scheduler_purge_interval_seconds: int = Field(default=60, ge=1)
+
+    fetch_skip_duplicate_entries: bool = False
+    fetch_max_bytes: int = Field(default=10 * 1024 * 1024, ge=1)
+    fetch_connect_timeout: float = Field(default=10, gt=0)
+    fetch_read_timeout: float = Field(default=30, gt=0)
+    fetch_total_timeout: float = Field(default=60, gt=0)
+    # Assumes feeds list their newest entries first, and only applies while the
+    # dates of the entries read so far agree. 0 reads every feed to the end.
+    fetch_stop_after_unchanged: int = Field(default=0, ge=0)
+    fetch_parser_backend: ParserBackend = "fast"
+    # Used with hosts that offer HTTP/2 over TLS, HTTP/1.1 otherwise
+    fetch_http2: bool = False
+    # Seconds that resolved host addresses are reused for new connections
+    fetch_dns_cache_ttl: float = Field(default=300, ge=0)
+    fetch_archive_dir: str | None = None
+    # 0: a cycle fetches every source however long it takes
+    fetch_cycle_budget_seconds: float = Field(default=0, ge=0)
+
+    # Entries deleted per transaction when a deleted source is purged
+    purge_batch_size: int = Field(default=1000, ge=1)
+
+    # Public URL that routes to /websub/callback of the web app. Unset, no
+    # source is subscribed.
+    websub_callback_url: str | None = None
+    websub_lease_seconds: int = Field(default=864000, ge=1)
+    websub_renew_before_seconds: int = Field(default=86400, ge=0)
+    # Sources with an active subscription are still polled this often, in case
+    # the hub misses an update
+    websub_poll_interval_hours: int = Field(default=24, ge=1)
+
+    translation_backend: TranslationBackend = "none"
+    translation_target_langs: Annotated[list[str], NoDecode] = ["ja"]
+    translation_batch_size: int = Field(default=32, ge=1)
+    translation_lookback_hours: int = Field(default=24, ge=1)
+
+    recommendation_index_dir: str | None = None
+    recommendation_dim: int = Field(default=256, ge=1)
+    recommendation_batch_size: int = Field(default=1000, ge=1)
+    # Has to be longer than a fetch transaction is open
+    recommendation_lookback_hours: int = Field(default=1, ge=1)
+
+    log_entry_sample_rate: float = Field(default=0.0, ge=0, le=1)
+
+    profile_dir: str = "profiles"
+    profile_fetch_runs: int = Field(default=0, ge=0)
+    profile_signal_runs: int = Field(default=1, ge=0)
+    profile_memory_top_sites: int = Field(default=0, ge=0)
+    profile_allowed_clients: Annotated[list[str], NoDecode] = ["127.0.0.1", "::1"]
 
     postgres_user: str
     postgres_password: str
     postgres_db: str
     postgres_host: str
     postgres_port: int
+    # Connections kept open per process. The web app opens them all at
+    # startup, before it takes requests.
+    database_pool_size: int = Field(default=5, ge=1)
+    database_max_overflow: int = Field(default=10, ge=0)
+    database_slow_query_ms: float = Field(default=500, ge=0)
+    database_explain_sample_rate: float = Field(default=0.0, ge=0, le=1)
+    debug_queries: bool = False
 
+    tracing_exporter: TracingExporter = "none"
+    tracing_file: str = "traces.jsonl"
 
-_settings: Settings | None = None
-
-
-def initialize_settings() -> None:
-    global _settings
-    if _settings is not None:
-        logger.warning("settings has been already initialized")
-        return
+    health_max_db_latency_ms: float = Field(default=500, ge=0)
+    health_max_heartbeat_age_seconds: int = Field(default=3600, ge=1)
 
-    settings = Settings()
+    @field_validator("scheduler_crontab_expr")
+    @classmethod
+    def check_crontab_expr(cls, value: str) -> str:
+        # Caught here rather than when a reload reschedules the jobs
+        CronTrigger.from_crontab(value)
+        return value
 
-    settings.scheduler_crontab_expr = os.getenv(
-        "SCHEDULER_CRONTAB_EXPR", "*/10 * * * *"
+    @field_validator(
+        "translation_target_langs", "profile_allowed_clients", mode="before"
     )
-    logger.info(f"settings.scheduler_crontab_expr={settings.scheduler_crontab_expr}")
+    @classmethod
+    def split_comma_separated(cls, value: Any) -> Any:
+        if isinstance(value, str):
+            return [item.strip() for item in value.split(",") if item.strip()]
+        return value
 
-    settings.scheduler_misfire_grace_time = int(
-        os.getenv("SCHEDULER_MISFIRE_GRACE_TIME", 30)
-    )
-    logger.info(
-        f"settings.scheduler_misfire_grace_time={settings.scheduler_misfire_grace_time}"
-    )
+    @classmethod
+    def settings_customise_sources(
+        cls,
+        settings_cls: type[BaseSettings],
+        init_settings: PydanticBaseSettingsSource,
+        env_settings: PydanticBaseSettingsSource,
+        dotenv_settings: PydanticBaseSettingsSource,
+        file_secret_settings: PydanticBaseSettingsSource,
+    ) -> tuple[PydanticBaseSettingsSource, ...]:
+        # The settings file goes before the environment, so that editing it
+        # changes a setting that docker compose also passes as a variable
+        return init_settings, dotenv_settings, env_settings, file_secret_settings
 
-    settings.postgres_user = get_required_environment_variable("POSTGRES_USER")
-    logger.info(f"settings.postgres_user={settings.postgres_user}")
 
-    settings.postgres_password = get_required_environment_variable("POSTGRES_PASSWORD")
+_settings: Settings | None = None
 
-    settings.postgres_db = get_required_environment_variable("POSTGRES_DB")
-    logger.info(f"settings.postgres_db={settings.postgres_db}")
 
-    settings.postgres_host = get_required_environment_variable("POSTGRES_HOST")
-    logger.info(f"settings.postgres_host={settings.postgres_host}")
+def initialize_settings() -> None:
+    global _settings
+    if _settings is not None:
+        logger.warning("settings has been already initialized")
+        return
 
-    settings.postgres_port = int(get_required_environment_variable("POSTGRES_PORT"))
-    logger.info(f"settings.postgres_port={settings.postgres_port}")
+    settings = load_settings()
+    for name, value in settings.model_dump().items():
+        if name not in SECRET_SETTINGS:
+            logger.info(f"settings.{name}={value}")
 
     _settings = settings
 
@@ -69,8 +203,56 @@ def get_settings() -> Settings:
     return _settings
 
 
-def get_required_environment_variable(key: str) -> str:
+def load_settings() -> Settings:
+    # Settings() takes its values from the environment and the settings file
+    return Settings(_env_file=get_settings_file())  # type: ignore[call-arg]
+
+
+def reload_settings() -> dict[str, Any]:
+    # Reads the environment and the settings file again, and returns the
+    # reloadable settings that changed. The settings are replaced as a whole,
+    # so a job keeps the values it started with until its run ends.
+    global _settings
+    settings = get_settings()
+    try:
+        loaded = load_settings()
+    except ValidationError as exc:
+        logger.error(f"Failed to reload settings. The current ones are kept: {exc}")
+        return {}
+
+    changed = {}
+    for name in Settings.model_fields:
+        value = getattr(loaded, name)
+        if value == getattr(settings, name):
+            continue
+        if name in RELOADABLE_SETTINGS:
+            changed[name] = value
+            logger.info(f"settings.{name}={value}")
+        else:
+            logger.warning(f"settings.{name} is only changed by a restart")
+    if changed:
+        _settings = settings.model_copy(update=changed)
+    return changed
+
+
+def get_settings_file() -> str | None:
+    # Read apart from Settings, as it tells where the settings are. A file in
+    # the .env format whose values take precedence over the environment.
+    return os.getenv("SETTINGS_FILE") or None
+
+
+def get_log_format() -> str:
+    # Read apart from Settings because logging is set up before the settings
+    # are loaded, so that the lines above are formatted the same way
+    return os.getenv("LOG_FORMAT", "json")
+
+
+def get_bool_environment_variable(key: str, default: bool) -> bool:
     value = os.getenv(key)
-    if value is None:
-        raise ValueError(f"{key} is None")
-    return value
+    if not value:
+        return default
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"{key} is not a boolean: {value}")
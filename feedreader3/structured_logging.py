@@ -0,0 +1,97 @@
+from logging.handlers import QueueHandler, QueueListener
+from datetime import datetime, timezone
+from typing import Any
+import copy
+import json
+import logging
+import queue
+
+# Attributes every LogRecord has. Anything else was passed with extra=.
+LOG_RECORD_ATTRIBUTES = set(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "taskName",
+}
+TEXT_FORMAT = "%(levelname)s:%(name)s:%(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data: dict[str, Any] = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in LOG_RECORD_ATTRIBUTES:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc_info"] = record.exc_text
+        if record.stack_info:
+            data["stack_info"] = record.stack_info
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class StructuredQueueHandler(QueueHandler):
+    # QueueHandler.prepare() folds the traceback into the message. Keep them
+    # apart so that the JSON formatter can put them in separate fields.
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener: QueueListener | None = None
+_saved_handlers: list[tuple[logging.Logger, list[logging.Handler]]] = []
+
+
+def initialize_logging(
+    logger_names: list[str], log_format: str, level: int | None = None
+) -> None:
+    # Handlers of the given loggers are replaced with a queue, and a background
+    # thread does the formatting and the writes. Logging calls on the fetch or
+    # request path only enqueue the record.
+    global _listener
+    if _listener is not None:
+        raise RuntimeError("_listener is not None. logging has already initialized")
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    elif log_format == "text":
+        formatter = logging.Formatter(TEXT_FORMAT)
+    else:
+        raise ValueError(f"Unknown log format: {log_format}")
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(formatter)
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    queue_handler = StructuredQueueHandler(log_queue)
+
+    for logger_name in logger_names:
+        target_logger = logging.getLogger(logger_name)
+        _saved_handlers.append((target_logger, target_logger.handlers[:]))
+        target_logger.handlers = [queue_handler]
+        if level is not None:
+            target_logger.setLevel(level)
+
+    _listener = QueueListener(log_queue, stream_handler)
+    _listener.start()
+
+
+def finalize_logging() -> None:
+    global _listener
+    if _listener is None:
+        raise RuntimeError("_listener is None. logging doesn't need to finalize")
+    # Flushes the records that are still queued
+    _listener.stop()
+    _listener = None
+    for target_logger, handlers in _saved_handlers:
+        target_logger.handlers = handlers
+    _saved_handlers.clear()
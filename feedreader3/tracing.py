@@ -0,0 +1,107 @@
+from opentelemetry import trace
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SpanExporter,
+)
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from fastapi import FastAPI
+from sqlalchemy import Engine
+from typing import Callable
+import httpx
+import logging
+import os
+
+logger = logging.getLogger("uvicorn." + __name__)
+
+_tracer_provider: TracerProvider | None = None
+
+
+def format_span_line(span: ReadableSpan) -> str:
+    return f"{span.to_json(indent=None)}\n"
+
+
+def create_file_span_exporter(path: str) -> SpanExporter:
+    # One JSON object per line, appended
+    return ConsoleSpanExporter(
+        out=open(path, "a", encoding="utf-8"), formatter=format_span_line
+    )
+
+
+# The OTLP exporter reads its endpoint and headers from the standard
+# OTEL_EXPORTER_OTLP_* environment variables
+SPAN_EXPORTER_FACTORIES: dict[str, Callable[[str], SpanExporter]] = {
+    "console": lambda file_path: ConsoleSpanExporter(),
+    "file": create_file_span_exporter,
+    "otlp": lambda file_path: OTLPSpanExporter(),
+}
+
+
+def create_span_exporter(backend: str, file_path: str) -> SpanExporter | None:
+    if backend == "none":
+        return None
+    factory = SPAN_EXPORTER_FACTORIES.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown tracing exporter: {backend}")
+    return factory(file_path)
+
+
+def get_tracing_exporter() -> str:
+    # Read apart from Settings, as the web app is instrumented when it is
+    # created, before its lifespan initializes the settings
+    return os.getenv("TRACING_EXPORTER", "none")
+
+
+def initialize_tracing(service_name: str, exporter: SpanExporter) -> None:
+    # Spans started through trace.get_tracer() before this are not recorded.
+    # The global provider can only be set once per process.
+    global _tracer_provider
+    if _tracer_provider is not None:
+        raise RuntimeError("_tracer_provider is not None. Tracing has been initialized")
+    _tracer_provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: service_name})
+    )
+    # Spans are exported from a background thread in batches
+    _tracer_provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_tracer_provider)
+    logger.info(f"Tracing as {service_name} with {type(exporter).__name__}")
+
+
+def finalize_tracing() -> None:
+    # Exports the spans that are still queued
+    global _tracer_provider
+    if _tracer_provider is None:
+        raise RuntimeError("_tracer_provider is None. Tracing doesn't need to finalize")
+    _tracer_provider.shutdown()
+    _tracer_provider = None
+
+
+def flush_tracing() -> None:
+    if _tracer_provider is not None:
+        _tracer_provider.force_flush()
+
+
+def is_tracing_enabled() -> bool:
+    return _tracer_provider is not None
+
+
+def instrument_app(app: FastAPI) -> None:
+    FastAPIInstrumentor.instrument_app(app, excluded_urls="health")
+
+
+def instrument_engine(engine: Engine) -> None:
+    SQLAlchemyInstrumentor().instrument(engine=engine)
+
+
+def uninstrument_engine() -> None:
+    # The instrumentor takes a single engine at a time
+    SQLAlchemyInstrumentor().uninstrument()
+
+
+def instrument_http_client(client: httpx.Client) -> None:
+    HTTPXClientInstrumentor.instrument_client(client)
@@ -0,0 +1,25 @@
+from typing import Protocol, Sequence, Callable
+
+
+class Translator(Protocol):
+    def translate(self, texts: Sequence[str], target_lang: str) -> list[str]: ...
+
+
+class StubTranslator:
+    # Local backend for tests and development. It never calls an external service.
+    def translate(self, texts: Sequence[str], target_lang: str) -> list[str]:
+        return [f"[{target_lang}] {text}" for text in texts]
+
+
+TRANSLATOR_FACTORIES: dict[str, Callable[[], Translator]] = {
+    "stub": StubTranslator,
+}
+
+
+def create_translator(backend: str) -> Translator | None:
+    if backend == "none":
+        return None
+    factory = TRANSLATOR_FACTORIES.get(backend)
+    if factory is None:
+        raise ValueError(f"Unknown translator backend: {backend}")
+    return factory()
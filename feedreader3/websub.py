@@ -0,0 +1,60 @@
+import hmac
+import httpx
+from .feed_fetcher import FetchLimits, get_http_client
+
+SIGNATURE_HEADER = "X-Hub-Signature"
+SIGNATURE_METHODS = {"sha1", "sha256", "sha384", "sha512"}
+
+
+class WebSubError(Exception):
+    pass
+
+
+def get_callback_url(callback_url: str, feed_source_id: int) -> str:
+    return f"{callback_url.rstrip('/')}/{feed_source_id}"
+
+
+def request_subscription(
+    hub_url: str,
+    topic_url: str,
+    callback_url: str,
+    secret: str,
+    lease_seconds: int,
+    limits: FetchLimits,
+) -> None:
+    # The hub answers 202 Accepted and then verifies the intent with a GET to
+    # the callback, which activates the subscription
+    try:
+        response = get_http_client().post(
+            hub_url,
+            data={
+                "hub.mode": "subscribe",
+                "hub.topic": topic_url,
+                "hub.callback": callback_url,
+                "hub.lease_seconds": str(lease_seconds),
+                "hub.secret": secret,
+            },
+            timeout=httpx.Timeout(
+                limits.read_timeout,
+                connect=limits.connect_timeout,
+                pool=limits.connect_timeout,
+            ),
+        )
+    except httpx.HTTPError as exc:
+        raise WebSubError(f"Failed to request subscription: {exc!r}") from exc
+    if not response.is_success:
+        raise WebSubError(
+            f"Hub refused subscription: {response.status_code} {response.text[:200]}"
+        )
+
+
+def verify_signature(secret: str, body: bytes, signature: str | None) -> bool:
+    # X-Hub-Signature: method=hex HMAC of the body keyed with the secret
+    if signature is None:
+        return False
+    method, _, digest = signature.partition("=")
+    method = method.strip().lower()
+    if method not in SIGNATURE_METHODS:
+        return False
+    expected = hmac.new(secret.encode(), body, method).hexdigest()
+    return hmac.compare_digest(expected, digest.strip().lower())
@@ -1,35 +1,157 @@
-from .database import initialize_engine, finalize_engine
-from .scheduler import (
-    initialize_scheduler,
-    startup_scheduler,
+from .database import initialize_engine, finalize_engine, get_engine
+from .feed_fetcher import (
+    initialize_http_client,
+    finalize_http_client,
+    set_dns_cache_ttl,
 )
-from .settings import initialize_settings, get_settings
+from .feed_archive import initialize_feed_archive, finalize_feed_archive
+from .query_stats import configure_query_stats
+from .scheduler import initialize_scheduler, run_scheduler, schedule_jobs
+from .settings import (
+    initialize_settings,
+    get_settings,
+    get_log_format,
+    get_settings_file,
+    reload_settings,
+)
+from .structured_logging import initialize_logging, finalize_logging
+from .tracing import create_span_exporter, initialize_tracing, finalize_tracing
+from .profiling import arm_fetch_profiling, start_memory_profiling
+from .recommendation.index import (
+    initialize_recommendation_index,
+    finalize_recommendation_index,
+)
+from pathlib import Path
+from watchfiles import awatch
+import asyncio
 import logging
+import signal
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 def main() -> None:
+    # logging
+    initialize_logging([""], get_log_format(), logging.INFO)
+    # Every job run is logged by apscheduler, which for refresh_feeds_job is
+    # every few seconds. The jobs log their own summaries, and skipped runs are
+    # reported by scheduler.record_skipped_run.
+    logging.getLogger("apscheduler").setLevel(logging.ERROR)
     logger.info("worker started")
     # settings
     initialize_settings()
     settings = get_settings()
 
+    # tracing
+    # Set up first, so that the engine and the HTTP client are instrumented
+    span_exporter = create_span_exporter(
+        settings.tracing_exporter, settings.tracing_file
+    )
+    if span_exporter is not None:
+        initialize_tracing("feedreader3-worker", span_exporter)
+
     # DB
     initialize_engine()
 
+    # HTTP client shared by the fetch jobs
+    initialize_http_client(settings.fetch_http2, settings.fetch_dns_cache_ttl)
+    # Raw response bodies, kept for `python -m feedreader3.replay`
+    if settings.fetch_archive_dir is not None:
+        initialize_feed_archive(settings.fetch_archive_dir)
+
+    # recommendation
+    if settings.recommendation_index_dir is not None:
+        initialize_recommendation_index(
+            settings.recommendation_index_dir,
+            settings.recommendation_dim,
+            writable=True,
+        )
+
+    # profiling
+    if settings.profile_fetch_runs > 0:
+        arm_fetch_profiling(settings.profile_fetch_runs)
+    if settings.profile_memory_top_sites > 0:
+        start_memory_profiling(settings.profile_memory_top_sites)
+
     # scheduler
     initialize_scheduler(
-        settings.scheduler_crontab_expr, settings.scheduler_misfire_grace_time
+        settings.scheduler_crontab_expr,
+        settings.scheduler_misfire_grace_time,
+        settings.scheduler_fetch_shards,
+        settings.scheduler_maintenance_interval_seconds,
+        settings.scheduler_refresh_interval_seconds,
+        settings.scheduler_purge_interval_seconds,
     )
 
     try:
-        startup_scheduler()
+        asyncio.run(run_worker(settings.profile_signal_runs))
+        logger.info("worker stopped: SIGTERM")
     except (KeyboardInterrupt, SystemExit) as exc:
         logger.info(f"worker stopped: {type(exc).__name__}")
     finally:
+        if settings.recommendation_index_dir is not None:
+            finalize_recommendation_index()
+        if settings.fetch_archive_dir is not None:
+            finalize_feed_archive()
+        finalize_http_client()
         finalize_engine()
+        if span_exporter is not None:
+            finalize_tracing()
+        finalize_logging()
+
+
+async def run_worker(profile_signal_runs: int) -> None:
+    loop = asyncio.get_running_loop()
+    # `kill -USR1 <pid>` profiles the next PROFILE_SIGNAL_RUNS fetch runs
+    loop.add_signal_handler(signal.SIGUSR1, arm_fetch_profiling, profile_signal_runs)
+    # `docker stop` sends SIGTERM. Running jobs finish before asyncio.run()
+    # returns.
+    stopped = asyncio.Event()
+    loop.add_signal_handler(signal.SIGTERM, stopped.set)
+    # `kill -HUP <pid>`, or saving SETTINGS_FILE, reloads the settings
+    loop.add_signal_handler(signal.SIGHUP, apply_reloaded_settings)
+    settings_file = get_settings_file()
+    if settings_file is None:
+        await run_scheduler(stopped)
+        return
+    watcher = asyncio.create_task(watch_settings_file(Path(settings_file), stopped))
+    await run_scheduler(stopped)
+    await watcher
+
+
+async def watch_settings_file(path: Path, stopped: asyncio.Event) -> None:
+    # The directory is watched, as editors often replace the file instead of
+    # writing to it
+    path = path.resolve()
+    async for _ in awatch(
+        path.parent,
+        watch_filter=lambda change, changed_path: Path(changed_path) == path,
+        stop_event=stopped,
+    ):
+        apply_reloaded_settings()
+
+
+def apply_reloaded_settings() -> None:
+    changed = reload_settings()
+    settings = get_settings()
+    if any(name.startswith("scheduler_") for name in changed):
+        schedule_jobs(
+            settings.scheduler_crontab_expr,
+            settings.scheduler_misfire_grace_time,
+            settings.scheduler_fetch_shards,
+            settings.scheduler_maintenance_interval_seconds,
+            settings.scheduler_refresh_interval_seconds,
+            settings.scheduler_purge_interval_seconds,
+        )
+    if "fetch_dns_cache_ttl" in changed:
+        set_dns_cache_ttl(settings.fetch_dns_cache_ttl)
+    if changed.keys() & {"database_slow_query_ms", "database_explain_sample_rate"}:
+        configure_query_stats(
+            get_engine(),
+            settings.database_slow_query_ms,
+            settings.database_explain_sample_rate,
+            settings.debug_queries,
+        )
 
 
 if __name__ == "__main__":
@@ -1,14 +1,23 @@
 import pytest
 from pytest import Session as PytestSession
 from typing import Generator
-from sqlmodel import Session, SQLModel, text
+from sqlmodel import Session, SQLModel, text, create_engine
 from sqlalchemy import Engine
 from fastapi.testclient import TestClient
 from feedreader3.settings import initialize_settings, get_settings
-from feedreader3.database import get_engine
+from feedreader3.database import get_engine, get_database_url
+from feedreader3.feed_fetcher import initialize_http_client, finalize_http_client
+from feedreader3.migration import upgrade_schema
+from feedreader3.query_stats import configure_query_stats
+from feedreader3.tracing import initialize_tracing, finalize_tracing, flush_tracing
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
 
 from feedreader3.main import app
 
+# Tracing is on for the whole run, as the global tracer provider can only be
+# set once. Finished spans are kept here.
+_span_exporter = InMemorySpanExporter()
+
 
 def pytest_sessionstart(session: PytestSession) -> None:
     initialize_settings()
@@ -16,6 +25,32 @@ def pytest_sessionstart(session: PytestSession) -> None:
     if not settings.postgres_db.startswith("test_"):
         pytest.exit("Tests require postgres_db=test_*")
 
+    engine = create_engine(get_database_url())
+    try:
+        upgrade_schema(engine)
+    finally:
+        engine.dispose()
+
+    initialize_tracing("feedreader3-test", _span_exporter)
+
+    # The worker's fetch client, which the app itself does not use
+    initialize_http_client(settings.fetch_http2, settings.fetch_dns_cache_ttl)
+
+
+def pytest_sessionfinish(session: PytestSession) -> None:
+    finalize_http_client()
+    finalize_tracing()
+
+
+@pytest.fixture(name="span_exporter", autouse=True)
+def span_exporter_fixture() -> Generator[InMemorySpanExporter, None, None]:
+    # Spans of earlier tests are not seen, nor kept around
+    flush_tracing()
+    _span_exporter.clear()
+    yield _span_exporter
+    flush_tracing()
+    _span_exporter.clear()
+
 
 @pytest.fixture(name="session")
 def session_fixture(client: TestClient) -> Generator[Session, None, None]:
@@ -35,6 +70,25 @@ def client_fixture() -> Generator[TestClient, None, None]:
         truncate_all_tables(engine)
 
 
+@pytest.fixture(name="collect_query_stats")
+def collect_query_stats_fixture(client: TestClient) -> Generator[None, None, None]:
+    # Statistics are only collected with DEBUG_QUERIES=true
+    settings = get_settings()
+    configure_query_stats(
+        get_engine(),
+        settings.database_slow_query_ms,
+        settings.database_explain_sample_rate,
+        True,
+    )
+    yield
+    configure_query_stats(
+        get_engine(),
+        settings.database_slow_query_ms,
+        settings.database_explain_sample_rate,
+        settings.debug_queries,
+    )
+
+
 def truncate_all_tables(engine: Engine) -> None:
     table_names = SQLModel.metadata.tables.keys()
     if not table_names:
@@ -1,13 +1,37 @@
-from pytest import MonkeyPatch
+from pytest import MonkeyPatch, LogCaptureFixture
 from sqlmodel import Session, select
 import feedparser
+import logging
 from datetime import datetime, tzinfo, timezone, timedelta
-from typing import Self
-
+from pathlib import Path
+from typing import Iterator, Self, cast
+import gc
+import time
+import tracemalloc
+import os
+
+from feedreader3.database import get_engine
 from feedreader3.jobs import fetch_feeds_job
-from feedreader3.jobs.fetch_feeds_job import fetch_feeds, store_feed_entries
+from feedreader3.jobs.fetch_feeds_job import (
+    fetch_feeds,
+    lock_feed_source,
+    record_fetch_attempt,
+    refresh_feeds_job,
+    store_feed_entries,
+    FeedEntryCounts,
+)
 from feedreader3.models.feed_source import FeedSource
 from feedreader3.models.feed_entry import FeedEntry, FeedEntryCreate
+from feedreader3.models.feed_entry_content import FeedEntryContent, decompress_text
+from feedreader3.links import canonicalize_link, hash_link
+from feedreader3.models.translation import hash_text
+from feedreader3.models.feed_source_stats import FeedSourceStats
+from feedreader3.models.refresh_request import RefreshRequest
+from feedreader3.models.worker_heartbeat import WorkerHeartbeat
+from feedreader3.refresh_queue import enqueue_refresh
+from feedreader3.tracing import flush_tracing
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import StatusCode
 
 
 def test_fetch_feeds_insert(session: Session) -> None:
@@ -43,6 +67,7 @@ def test_fetch_feeds_insert(session: Session) -> None:
         parsed_entry.updated_parsed[5],
         tzinfo=timezone.utc,
     )
+    assert results[0].entry_title_hash == hash_text(parsed_entry.title)
 
 
 def test_fetch_feeds_update(session: Session) -> None:
@@ -217,3 +242,680 @@ def test_store_feed_entries_first_seen_at_timezone(
 
     assert has_called["value"]
     assert results[0].first_seen_at == MockDateTime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def test_fetch_feeds_store_entry_content(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    parsed_feed = feedparser.parse(feed_source.feed_url)
+    parsed_entry = parsed_feed.entries[0]
+
+    fetch_feeds(session)
+
+    feed_entry = session.exec(select(FeedEntry)).one()
+    feed_entry_content = session.get(FeedEntryContent, feed_entry.id)
+    assert feed_entry_content is not None
+    assert decompress_text(feed_entry_content.summary) == parsed_entry.summary
+    assert decompress_text(feed_entry_content.content) == parsed_entry.content[0].value
+
+
+def test_fetch_feeds_update_entry_content(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    feed_entry_create = FeedEntryCreate(
+        first_seen_at=datetime.now(timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id="tag:feedparser.org,2005-11-09:/docs/examples/atom10.xml:3",
+        entry_title="",
+        entry_link="",
+        entry_updated_at=datetime.min.replace(tzinfo=timezone.utc),
+    )
+    db_feed_entry = FeedEntry.model_validate(feed_entry_create)
+    session.add(db_feed_entry)
+    session.commit()
+
+    parsed_feed = feedparser.parse(feed_source.feed_url)
+    parsed_entry = parsed_feed.entries[0]
+
+    fetch_feeds(session)
+
+    feed_entry_content = session.get(FeedEntryContent, db_feed_entry.id)
+    assert feed_entry_content is not None
+    assert decompress_text(feed_entry_content.summary) == parsed_entry.summary
+    assert decompress_text(feed_entry_content.content) == parsed_entry.content[0].value
+
+
+def test_store_feed_entries_canonical_link_hash(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    parsed_entries = [
+        feedparser.util.FeedParserDict(
+            id="entry0",
+            title="Entry 0",
+            link="http://example.com/entry0?utm_source=rss",
+        ),
+        feedparser.util.FeedParserDict(
+            id="entry1",
+            title="Entry 1",
+            link="http://feeds.example.com/~r/example/~3/entry1",
+            feedburner_origlink="https://example.com/entry1",
+        ),
+    ]
+
+    store_feed_entries(session, feed_source, parsed_entries)
+
+    results = session.exec(select(FeedEntry).order_by(FeedEntry.entry_id)).all()
+    assert len(results) == 2
+    assert results[0].entry_link == "http://example.com/entry0?utm_source=rss"
+    assert results[0].canonical_link_hash == hash_link(
+        canonicalize_link("https://example.com/entry0")
+    )
+    assert results[1].entry_link == "http://feeds.example.com/~r/example/~3/entry1"
+    assert results[1].canonical_link_hash == hash_link(
+        canonicalize_link("https://example.com/entry1")
+    )
+
+
+def test_store_feed_entries_skip_duplicate_entries(session: Session) -> None:
+    feed_source1 = FeedSource(name="test_feed1", feed_url="feed1.xml")
+    feed_source2 = FeedSource(name="test_feed2", feed_url="feed2.xml")
+    session.add(feed_source1)
+    session.add(feed_source2)
+    session.commit()
+    session.refresh(feed_source1)
+    session.refresh(feed_source2)
+
+    store_feed_entries(
+        session,
+        feed_source1,
+        [
+            feedparser.util.FeedParserDict(
+                id="entry0", title="Entry 0", link="https://example.com/entry0"
+            )
+        ],
+        skip_duplicate_entries=True,
+    )
+    store_feed_entries(
+        session,
+        feed_source2,
+        [
+            feedparser.util.FeedParserDict(
+                id="mirror0",
+                title="Entry 0",
+                link="http://www.example.com/entry0?utm_campaign=mirror",
+            ),
+            feedparser.util.FeedParserDict(
+                id="mirror1", title="Entry 1", link="https://example.com/entry1"
+            ),
+        ],
+        skip_duplicate_entries=True,
+    )
+
+    results = session.exec(
+        select(FeedEntry).where(FeedEntry.feed_source_id == feed_source2.id)
+    ).all()
+    assert len(results) == 1
+    assert results[0].entry_id == "mirror1"
+
+
+def test_store_feed_entries_keep_duplicate_entries(session: Session) -> None:
+    feed_source1 = FeedSource(name="test_feed1", feed_url="feed1.xml")
+    feed_source2 = FeedSource(name="test_feed2", feed_url="feed2.xml")
+    session.add(feed_source1)
+    session.add(feed_source2)
+    session.commit()
+    session.refresh(feed_source1)
+    session.refresh(feed_source2)
+
+    parsed_entries = [
+        feedparser.util.FeedParserDict(
+            id="entry0", title="Entry 0", link="https://example.com/entry0"
+        )
+    ]
+    store_feed_entries(session, feed_source1, parsed_entries)
+    store_feed_entries(session, feed_source2, parsed_entries)
+
+    results = session.exec(select(FeedEntry)).all()
+    assert len(results) == 2
+    assert results[0].canonical_link_hash == results[1].canonical_link_hash
+
+
+def test_fetch_feeds_feed_source_stats(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    fetch_feeds(session)
+
+    stats = session.get(FeedSourceStats, feed_source.id)
+    assert stats is not None
+    assert stats.entry_count == 1
+    assert stats.last_entry_at == datetime(2005, 11, 9, 11, 56, 34, tzinfo=timezone.utc)
+    assert stats.last_fetched_at is not None
+    assert stats.last_new_entry_at == stats.last_fetched_at
+    last_new_entry_at = stats.last_new_entry_at
+    last_fetched_at = stats.last_fetched_at
+
+    # Fetching again updates the entry without counting it twice
+    fetch_feeds(session)
+    session.refresh(stats)
+
+    assert stats.entry_count == 1
+    assert stats.last_fetched_at > last_fetched_at
+    assert stats.last_new_entry_at == last_new_entry_at
+
+
+def test_fetch_feeds_backfill_feed_source_stats(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    # Entries stored before the source had a stats row
+    first_seen_at = datetime(2025, 11, 1, tzinfo=timezone.utc)
+    for i in range(3):
+        session.add(
+            FeedEntry(
+                first_seen_at=first_seen_at,
+                feed_source_id=feed_source.id,
+                entry_id=f"entry{i}",
+                entry_title=f"Entry {i}",
+                entry_link=f"entry{i}.html",
+                entry_updated_at=None,
+            )
+        )
+    session.commit()
+
+    fetch_feeds(session)
+
+    stats = session.get(FeedSourceStats, feed_source.id)
+    assert stats is not None
+    assert stats.entry_count == 4
+    assert stats.last_entry_at == first_seen_at
+
+
+def test_feed_source_stats_created_outside_backfill(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+
+    first_seen_at = datetime(2025, 11, 1, tzinfo=timezone.utc)
+    for i in range(3):
+        session.add(
+            FeedEntry(
+                first_seen_at=first_seen_at,
+                feed_source_id=feed_source.id,
+                entry_id=f"entry{i}",
+                entry_title=f"Entry {i}",
+                entry_link=f"entry{i}.html",
+                entry_updated_at=None,
+            )
+        )
+    session.commit()
+
+    # A refresh records its attempt before the backfill of the next cycle
+    record_fetch_attempt(session, feed_source.id)
+    stats = session.get(FeedSourceStats, feed_source.id)
+    assert stats is not None
+    assert stats.entry_count == 3
+    assert stats.last_attempted_at is not None
+    session.delete(stats)
+    session.commit()
+
+    # WebSub deliveries store entries without any fetch attempt
+    store_feed_entries(
+        session, feed_source, feedparser.parse(feed_source.feed_url).entries
+    )
+    stats = session.get(FeedSourceStats, feed_source.id)
+    assert stats is not None
+    assert stats.entry_count == 4
+
+
+def test_store_feed_entries_counts(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    parsed_entries = feedparser.parse(feed_source.feed_url).entries
+
+    counts = store_feed_entries(session, feed_source, parsed_entries)
+    assert counts.new == 1
+    assert counts.stored_bytes > 0
+
+    # The same feed again touches nothing
+    counts = store_feed_entries(session, feed_source, parsed_entries)
+    assert counts == FeedEntryCounts(unchanged=1)
+
+    parsed_entries[0]["title"] = "Changed title"
+    counts = store_feed_entries(session, feed_source, parsed_entries)
+    assert counts == FeedEntryCounts(updated=1)
+
+
+def test_store_feed_entries_log_sampling(
+    session: Session, caplog: LogCaptureFixture
+) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    parsed_entries = feedparser.parse(feed_source.feed_url).entries
+
+    with caplog.at_level(logging.INFO, logger="feedreader3.jobs.fetch_feeds_job"):
+        store_feed_entries(session, feed_source, parsed_entries)
+        assert not [r for r in caplog.records if r.message == "Stored entry"]
+
+        parsed_entries[0]["title"] = "Changed title"
+        store_feed_entries(
+            session, feed_source, parsed_entries, entry_log_sample_rate=1.0
+        )
+        records = [r for r in caplog.records if r.message == "Stored entry"]
+
+    assert len(records) == 1
+    assert getattr(records[0], "action") == "updated"
+    assert getattr(records[0], "entry_title") == "Changed title"
+
+
+def test_fetch_feeds_summary(session: Session, caplog: LogCaptureFixture) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+
+    with caplog.at_level(logging.INFO, logger="feedreader3.jobs.fetch_feeds_job"):
+        counts = fetch_feeds(session)
+
+    assert counts.new == 1
+    records = [r for r in caplog.records if r.message == "Fetched feed"]
+    assert len(records) == 1
+    assert getattr(records[0], "feed_source") == "test_feed"
+    assert getattr(records[0], "new") == 1
+
+
+def test_store_feed_entries_stop_after_unchanged(session: Session) -> None:
+    feed_source = FeedSource(name="test_feed", feed_url="feed.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    parsed_entry = feedparser.parse("tests/jobs/atom10.xml").entries[0]
+    parsed_entries = []
+    for i in range(50):
+        entry = feedparser.util.FeedParserDict(parsed_entry)
+        entry["id"] = f"entry-{i}"
+        entry["link"] = f"http://example.org/entry/{i}"
+        parsed_entries.append(entry)
+    store_feed_entries(session, feed_source, parsed_entries[2:])
+
+    read_count = 0
+
+    def read_entries() -> Iterator[feedparser.util.FeedParserDict]:
+        nonlocal read_count
+        for entry in parsed_entries:
+            read_count += 1
+            yield entry
+
+    counts = store_feed_entries(
+        session, feed_source, read_entries(), stop_after_unchanged=3
+    )
+
+    assert (counts.new, counts.updated, counts.unchanged) == (2, 0, 3)
+    assert read_count < len(parsed_entries)
+
+    # Listed oldest first, the same feed is read to the end
+    for i, entry in enumerate(parsed_entries):
+        entry["updated_parsed"] = time.struct_time((2025, 1, 1, 0, i, 0, 0, 1, 0))
+    store_feed_entries(session, feed_source, parsed_entries)
+    read_count = 0
+    counts = store_feed_entries(
+        session, feed_source, read_entries(), stop_after_unchanged=3
+    )
+
+    assert counts.unchanged == len(parsed_entries)
+    assert read_count == len(parsed_entries)
+
+
+def test_fetch_feeds_skip_failed_feed(
+    session: Session, caplog: LogCaptureFixture
+) -> None:
+    session.add(FeedSource(name="missing_feed", feed_url="tests/jobs/missing.xml"))
+    session.add(FeedSource(name="test_feed", feed_url="tests/jobs/atom10.xml"))
+    session.commit()
+
+    with caplog.at_level(logging.INFO, logger="feedreader3.jobs.fetch_feeds_job"):
+        counts = fetch_feeds(session)
+
+    assert counts.new == 1
+    records = [r for r in caplog.records if r.message == "Failed to fetch feed"]
+    assert len(records) == 1
+    assert getattr(records[0], "feed_source") == "missing_feed"
+
+
+def test_fetch_feeds_refresh_queue_first(
+    session: Session, caplog: LogCaptureFixture
+) -> None:
+    feed_source1 = FeedSource(name="scheduled", feed_url="tests/jobs/atom10.xml")
+    feed_source2 = FeedSource(name="requested", feed_url="tests/jobs/atom11.xml")
+    session.add(feed_source1)
+    session.add(feed_source2)
+    session.commit()
+    session.refresh(feed_source2)
+    assert feed_source2.id is not None
+    enqueue_refresh(session, feed_source2.id, 50)
+
+    with caplog.at_level(logging.INFO, logger="feedreader3.jobs.fetch_feeds_job"):
+        fetch_feeds(session)
+
+    # Fetched once, before the scheduled source
+    records = [r for r in caplog.records if r.message == "Fetched feed"]
+    assert [getattr(r, "feed_source") for r in records] == ["requested", "scheduled"]
+    assert session.exec(select(RefreshRequest)).all() == []
+
+
+def test_refresh_feeds_job(session: Session) -> None:
+    feed_source1 = FeedSource(name="scheduled", feed_url="tests/jobs/atom10.xml")
+    feed_source2 = FeedSource(name="requested", feed_url="tests/jobs/atom11.xml")
+    session.add(feed_source1)
+    session.add(feed_source2)
+    session.commit()
+    session.refresh(feed_source2)
+    assert feed_source2.id is not None
+    enqueue_refresh(session, feed_source2.id, 50)
+
+    refresh_feeds_job()
+
+    feed_source_ids = session.exec(select(FeedEntry.feed_source_id)).all()
+    assert set(feed_source_ids) == {feed_source2.id}
+    assert session.exec(select(RefreshRequest)).all() == []
+
+
+def test_refresh_feeds_job_locked_feed_source(session: Session) -> None:
+    feed_source = FeedSource(name="requested", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+    enqueue_refresh(session, feed_source.id, 50)
+
+    # The request is kept while another worker holds the source
+    with Session(get_engine()) as other_session:
+        assert lock_feed_source(other_session, feed_source.id)
+        refresh_feeds_job()
+    assert session.get(RefreshRequest, feed_source.id) is not None
+    assert session.exec(select(FeedEntry)).all() == []
+
+    refresh_feeds_job()
+    session.expire_all()
+    assert session.get(RefreshRequest, feed_source.id) is None
+    assert len(session.exec(select(FeedEntry)).all()) == 1
+
+
+def test_refresh_feeds_job_failed_fetch(session: Session) -> None:
+    feed_source = FeedSource(name="missing", feed_url="tests/jobs/missing.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+    enqueue_refresh(session, feed_source.id, 50)
+
+    refresh_feeds_job()
+
+    # Answered by the failed attempt rather than retried by every drain
+    assert session.get(RefreshRequest, feed_source.id) is None
+
+
+def test_fetch_feeds_locked_feed_source(session: Session) -> None:
+    feed_source = FeedSource(name="locked", feed_url="tests/jobs/atom10.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+
+    # Being fetched by another shard or worker
+    with Session(get_engine()) as other_session:
+        assert lock_feed_source(other_session, feed_source.id)
+        counts = fetch_feeds(session)
+    assert counts.new == 0
+
+    counts = fetch_feeds(session)
+    assert counts.new == 1
+
+
+def test_fetch_feeds_shards(session: Session) -> None:
+    feed_sources = [
+        FeedSource(name=f"feed{i}", feed_url=f"tests/jobs/atom1{i}.xml")
+        for i in range(4)
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+
+    fetched_ids = []
+    for shard in range(2):
+        fetch_feeds(session, shard, 2)
+        fetched_ids.append(
+            set(session.exec(select(FeedEntry.feed_source_id).distinct()).all())
+        )
+
+    # Each shard fetches its own half of the sources
+    assert fetched_ids[0] == {2, 4}
+    assert fetched_ids[1] == {1, 2, 3, 4}
+
+
+def write_atom_feed(path: Path, cycle: int, entry_count: int) -> None:
+    # Each cycle adds entry_count new entries on top of the previous ones
+    entries = "".join(
+        f"<entry><id>urn:entry:{cycle}:{i}</id><title>Entry {cycle} {i}</title>"
+        f'<link href="http://example.org/{cycle}/{i}"/>'
+        f"<content>{'x' * 1000}</content>"
+        "<updated>2026-10-19T00:00:00Z</updated></entry>"
+        for i in range(entry_count)
+    )
+    path.write_text(
+        '<?xml version="1.0" encoding="utf-8"?>'
+        f'<feed xmlns="http://www.w3.org/2005/Atom"><title>Feed</title>{entries}</feed>'
+    )
+
+
+def test_fetch_feeds_job_memory_does_not_grow(
+    session: Session,
+    tmp_path: Path,
+    caplog: LogCaptureFixture,
+    span_exporter: InMemorySpanExporter,
+) -> None:
+    # Records kept by caplog would grow with the cycles themselves
+    caplog.set_level(logging.WARNING)
+    paths = [tmp_path / f"feed{i}.xml" for i in range(5)]
+    session.add_all(FeedSource(name=path.stem, feed_url=str(path)) for path in paths)
+    session.commit()
+
+    traced_bytes = []
+    tracemalloc.start()
+    try:
+        for cycle in range(12):
+            for path in paths:
+                write_atom_feed(path, cycle, 20)
+            fetch_feeds_job.fetch_feeds_job()
+            # So are the spans kept by the test exporter
+            flush_tracing()
+            span_exporter.clear()
+            gc.collect()
+            traced_bytes.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+
+    # The first cycles fill bounded caches such as SQLAlchemy's compiled
+    # statements. Afterwards, keeping even a single cycle's entries around
+    # would take more than this.
+    assert traced_bytes[-1] - traced_bytes[5] < 64 * 1024, traced_bytes
+
+
+def test_fetch_feeds_job_spans(
+    session: Session, span_exporter: InMemorySpanExporter
+) -> None:
+    session.add(FeedSource(name="feed", feed_url="tests/jobs/atom10.xml"))
+    session.add(FeedSource(name="missing", feed_url="tests/jobs/missing.xml"))
+    session.commit()
+
+    fetch_feeds_job.fetch_feeds_job()
+
+    flush_tracing()
+    spans = span_exporter.get_finished_spans()
+    [job_span] = [span for span in spans if span.name == "fetch_feeds_job"]
+    assert job_span.parent is None
+    assert job_span.attributes is not None
+    assert job_span.attributes["feedreader3.entries.new"] == 1
+    children = {
+        span.name: span
+        for span in spans
+        if span.parent is not None and span.parent.span_id == job_span.context.span_id
+    }
+    assert {"backfill_feed_source_stats", "select_feed_sources"} <= children.keys()
+
+    fetch_spans = {
+        str(span.attributes["url.full"]): span
+        for span in spans
+        if span.name == "fetch_feed_source" and span.attributes is not None
+    }
+    fetched = fetch_spans["tests/jobs/atom10.xml"]
+    assert fetched.attributes is not None
+    assert fetched.attributes["feedreader3.entries.new"] == 1
+    assert cast(int, fetched.attributes["feedreader3.fetched_bytes"]) > 0
+    assert fetched.status.status_code == StatusCode.UNSET
+    # Its SQL is traced beneath it
+    assert any(
+        span.parent is not None
+        and span.parent.span_id == fetched.context.span_id
+        and span.attributes is not None
+        and "db.statement" in span.attributes
+        for span in spans
+    )
+    failed = fetch_spans["tests/jobs/missing.xml"]
+    assert failed.status.status_code == StatusCode.ERROR
+    assert failed.events[0].name == "exception"
+
+
+def test_fetch_feeds_job_heartbeat(session: Session) -> None:
+    fetch_feeds_job.fetch_feeds_job(1, 2)
+    fetch_feeds_job.fetch_feeds_job(1, 2)
+
+    [heartbeat] = session.exec(select(WorkerHeartbeat)).all()
+    assert heartbeat.job_id == "fetch_feeds_job:1"
+    assert heartbeat.pid == os.getpid()
+    assert heartbeat.duration_ms >= 0
+    assert datetime.now(timezone.utc) - heartbeat.beat_at < timedelta(minutes=1)
+
+
+def get_fetched_source_ids(span_exporter: InMemorySpanExporter) -> list[int]:
+    flush_tracing()
+    spans = [
+        span
+        for span in span_exporter.get_finished_spans()
+        if span.name == "fetch_feed_source" and span.attributes is not None
+    ]
+    span_exporter.clear()
+    spans.sort(key=lambda span: cast(int, span.start_time))
+    return [
+        cast(dict[str, int], span.attributes)["feedreader3.feed_source.id"]
+        for span in spans
+    ]
+
+
+def test_fetch_feeds_order(
+    session: Session, span_exporter: InMemorySpanExporter
+) -> None:
+    now = datetime.now(timezone.utc)
+    feed_sources = [
+        FeedSource(
+            name=name, feed_url=f"tests/jobs/{name}.xml", fetch_priority=priority
+        )
+        for name, priority in [
+            ("recent", 1.0),
+            ("stale", 1.0),
+            ("new", 1.0),
+            ("recent_important", 10.0),
+        ]
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+    recent, stale, new, recent_important = [cast(int, s.id) for s in feed_sources]
+    session.add_all(
+        [
+            FeedSourceStats(
+                feed_source_id=recent, last_attempted_at=now - timedelta(minutes=10)
+            ),
+            # Failed since its last successful fetch
+            FeedSourceStats(
+                feed_source_id=stale,
+                last_fetched_at=now - timedelta(days=1),
+                last_attempted_at=now - timedelta(hours=1),
+            ),
+            FeedSourceStats(
+                feed_source_id=recent_important,
+                last_attempted_at=now - timedelta(minutes=10),
+            ),
+        ]
+    )
+    session.commit()
+
+    fetch_feeds(session)
+
+    assert get_fetched_source_ids(span_exporter) == [
+        new,
+        recent_important,
+        stale,
+        recent,
+    ]
+    last_attempted_at = session.exec(
+        select(FeedSourceStats.last_attempted_at).where(
+            FeedSourceStats.feed_source_id == recent
+        )
+    ).one()
+    assert last_attempted_at is not None
+    assert last_attempted_at > now
+
+
+def test_fetch_feeds_budget_carries_over(
+    session: Session, span_exporter: InMemorySpanExporter, monkeypatch: MonkeyPatch
+) -> None:
+    feed_sources = [
+        FeedSource(name=f"feed{i}", feed_url=f"tests/jobs/missing{i}.xml")
+        for i in range(5)
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+    feed_source_ids = [cast(int, feed_source.id) for feed_source in feed_sources]
+    checks = 0
+
+    # The budget is spent after two sources in every cycle
+    def is_fetch_budget_spent(start: float, budget_seconds: float) -> bool:
+        nonlocal checks
+        checks += 1
+        return checks > 2
+
+    monkeypatch.setattr(fetch_feeds_job, "is_fetch_budget_spent", is_fetch_budget_spent)
+
+    fetch_feeds(session)
+    first = get_fetched_source_ids(span_exporter)
+    checks = 0
+    fetch_feeds(session)
+    second = get_fetched_source_ids(span_exporter)
+    checks = 0
+    fetch_feeds(session)
+    third = get_fetched_source_ids(span_exporter)
+
+    assert first == feed_source_ids[:2]
+    assert second == feed_source_ids[2:4]
+    # The one left twice goes first
+    assert third == [feed_source_ids[4], feed_source_ids[0]]
@@ -0,0 +1,77 @@
+from sqlmodel import Session
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+from feedreader3.jobs.index_feed_entries_job import index_feed_entries
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_entry_content import FeedEntryContent, compress_text
+from feedreader3.recommendation.index import RecommendationIndex
+
+
+def test_index_feed_entries(session: Session, tmp_path: Path) -> None:
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    titles = ["Python release", "Python security release", "Football result"]
+    for i, title in enumerate(titles):
+        feed_entry = FeedEntry(
+            first_seen_at=datetime(2025, 11, 1, tzinfo=timezone.utc),
+            feed_source_id=feed_source.id,
+            entry_id=f"entry{i}",
+            entry_title=title,
+            entry_link=f"entry{i}.html",
+            entry_updated_at=None,
+        )
+        if i == 0:
+            feed_entry.entry_content = FeedEntryContent(
+                summary=compress_text("<p>Notes about the new version</p>")
+            )
+        session.add(feed_entry)
+    session.commit()
+
+    index = RecommendationIndex(tmp_path, 64, writable=True)
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    assert index_feed_entries(session, index, since, 2) == 3
+    assert index.ids[: index.size].tolist() == [1, 2, 3]
+    assert RecommendationIndex(tmp_path, 64, writable=False).size == 3
+
+    ids, _ = index.search(index.get_vectors([1]), 2, exclude_ids=[1])
+    assert ids[0][0] == 2
+
+    # Only new entries are indexed on the next run
+    assert index_feed_entries(session, index, since, 2) == 0
+
+
+def test_index_feed_entries_committed_late(session: Session, tmp_path: Path) -> None:
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    def add_feed_entry(feed_entry_id: int) -> None:
+        session.add(
+            FeedEntry(
+                id=feed_entry_id,
+                first_seen_at=datetime.now(timezone.utc),
+                feed_source_id=feed_source.id,
+                entry_id=f"entry{feed_entry_id}",
+                entry_title=f"Entry {feed_entry_id}",
+                entry_link=f"entry{feed_entry_id}.html",
+                entry_updated_at=None,
+            )
+        )
+        session.commit()
+
+    index = RecommendationIndex(tmp_path, 64, writable=True)
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+    add_feed_entry(1)
+    add_feed_entry(3)
+    assert index_feed_entries(session, index, since, 10) == 2
+
+    # Id 2 was taken by a fetch that committed after entry 3 was indexed
+    add_feed_entry(2)
+    assert index_feed_entries(session, index, since, 10) == 1
+    assert index.ids[: index.size].tolist() == [1, 3, 2]
+    assert index_feed_entries(session, index, since, 10) == 0
@@ -0,0 +1,42 @@
+from pytest import MonkeyPatch, LogCaptureFixture
+from sqlmodel import Session, select
+from datetime import datetime, timezone
+import logging
+
+from feedreader3.jobs.process_feed_entries_job import process_feed_entries_job
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.translation import Translation, hash_text
+from feedreader3.settings import get_settings
+
+
+def test_process_feed_entries_job(
+    session: Session, monkeypatch: MonkeyPatch, caplog: LogCaptureFixture
+) -> None:
+    monkeypatch.setattr(get_settings(), "translation_backend", "stub")
+    monkeypatch.setattr(get_settings(), "translation_target_langs", ["ja"])
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+    session.add(
+        FeedEntry(
+            first_seen_at=datetime.now(timezone.utc),
+            feed_source_id=feed_source.id,
+            entry_id="entry0",
+            entry_title="Hello",
+            entry_link="entry0.html",
+            entry_title_hash=hash_text("Hello"),
+        )
+    )
+    session.commit()
+
+    with caplog.at_level(logging.INFO, logger="feedreader3.jobs"):
+        process_feed_entries_job()
+        # Nothing left to do, and nothing logged
+        process_feed_entries_job()
+
+    translations = session.exec(select(Translation)).all()
+    assert [t.translated_text for t in translations] == ["[ja] Hello"]
+    records = [r for r in caplog.records if r.message == "Processed feed entries"]
+    assert len(records) == 1
+    assert getattr(records[0], "translated") == 1
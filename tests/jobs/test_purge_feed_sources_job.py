@@ -0,0 +1,109 @@
+from pytest import MonkeyPatch, LogCaptureFixture
+from sqlmodel import Session, select, func
+from datetime import datetime, timezone
+import logging
+
+from feedreader3.jobs import purge_feed_sources_job
+from feedreader3.database import get_engine
+from feedreader3.heartbeat import count_skipped_run
+from feedreader3.jobs.fetch_feeds_job import lock_feed_source
+from feedreader3.jobs.purge_feed_sources_job import purge_feed_sources
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_entry_content import FeedEntryContent
+from feedreader3.models.feed_source_stats import FeedSourceStats
+from feedreader3.models.worker_heartbeat import WorkerHeartbeat
+
+
+def create_feed_source(
+    session: Session, name: str, entry_count: int, deleted: bool
+) -> FeedSource:
+    feed_source = FeedSource(
+        name=name,
+        feed_url=f"http://example.com/{name}.xml",
+        deleted_at=datetime.now(timezone.utc) if deleted else None,
+    )
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+    for i in range(entry_count):
+        session.add(
+            FeedEntry(
+                first_seen_at=datetime(2026, 2, 3, tzinfo=timezone.utc),
+                feed_source_id=feed_source.id,
+                entry_id=f"{name}-{i}",
+                entry_title=f"Entry {i}",
+                entry_link=f"http://example.com/{name}/{i}",
+                entry_content=FeedEntryContent(summary=b"summary"),
+            )
+        )
+    session.add(FeedSourceStats(feed_source_id=feed_source.id, entry_count=entry_count))
+    session.commit()
+    return feed_source
+
+
+def count_rows(
+    session: Session, model: type[FeedEntry] | type[FeedEntryContent]
+) -> int:
+    return session.exec(select(func.count()).select_from(model)).one()
+
+
+def test_purge_feed_sources(
+    session: Session, monkeypatch: MonkeyPatch, caplog: LogCaptureFixture
+) -> None:
+    deleted = create_feed_source(session, "deleted", 7, deleted=True)
+    kept = create_feed_source(session, "kept", 2, deleted=False)
+    deleted_id = deleted.id
+    # Every chunk reports its progress
+    monkeypatch.setattr(purge_feed_sources_job, "PROGRESS_LOG_INTERVAL_SECONDS", 0)
+
+    with caplog.at_level(logging.INFO):
+        purged_count = purge_feed_sources(session, batch_size=3)
+
+    assert purged_count == 1
+    session.expire_all()
+    assert session.get(FeedSource, deleted_id) is None
+    assert session.get(FeedSource, kept.id) is not None
+    assert count_rows(session, FeedEntry) == 2
+    assert count_rows(session, FeedEntryContent) == 2
+    assert session.get(FeedSourceStats, deleted_id) is None
+
+    progress = [
+        (getattr(record, "deleted_entries"), getattr(record, "remaining_entries"))
+        for record in caplog.records
+        if record.message == "Purging feed source"
+    ]
+    assert progress == [(3, 4), (6, 1), (7, 0)]
+    purged = [
+        record for record in caplog.records if record.message == "Purged feed source"
+    ]
+    assert len(purged) == 1
+    assert getattr(purged[0], "deleted_entries") == 7
+
+
+def test_purge_feed_sources_while_fetching(session: Session) -> None:
+    deleted = create_feed_source(session, "deleted", 3, deleted=True)
+    deleted_id = deleted.id
+
+    # The entries are purged, but the source is left for the next run
+    with Session(get_engine()) as other_session:
+        assert deleted_id is not None
+        assert lock_feed_source(other_session, deleted_id, include_deleted=True)
+        assert purge_feed_sources(session, batch_size=2) == 0
+    session.expire_all()
+    assert count_rows(session, FeedEntry) == 0
+    assert session.get(FeedSource, deleted_id) is not None
+
+    assert purge_feed_sources(session, batch_size=2) == 1
+    assert session.get(FeedSource, deleted_id) is None
+
+
+def test_purge_feed_sources_job_heartbeat(session: Session) -> None:
+    skipped_runs = count_skipped_run("purge_feed_sources_job")
+
+    purge_feed_sources_job.purge_feed_sources_job()
+
+    heartbeat = session.get(WorkerHeartbeat, "purge_feed_sources_job")
+    assert heartbeat is not None
+    assert heartbeat.skipped_runs == skipped_runs
@@ -0,0 +1,117 @@
+from sqlmodel import Session, select
+from datetime import datetime, timezone, timedelta
+from typing import Sequence
+
+from feedreader3.jobs.translate_feed_entries_job import translate_feed_entries
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.translation import Translation, hash_text
+from feedreader3.translators import StubTranslator
+
+
+class CountingTranslator(StubTranslator):
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def translate(self, texts: Sequence[str], target_lang: str) -> list[str]:
+        self.calls.append(list(texts))
+        return super().translate(texts, target_lang)
+
+
+def add_feed_entry(
+    session: Session, feed_source: FeedSource, entry_id: str, entry_title: str
+) -> FeedEntry:
+    feed_entry = FeedEntry(
+        first_seen_at=datetime(2025, 11, 1, tzinfo=timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id=entry_id,
+        entry_title=entry_title,
+        entry_link=f"{entry_id}.html",
+        entry_updated_at=None,
+        entry_title_hash=hash_text(entry_title),
+    )
+    session.add(feed_entry)
+    return feed_entry
+
+
+def test_translate_feed_entries(session: Session) -> None:
+    feed_source1 = FeedSource(name="feed1", feed_url="feed1.rss")
+    feed_source2 = FeedSource(name="feed2", feed_url="feed2.rss")
+    session.add(feed_source1)
+    session.add(feed_source2)
+    session.commit()
+
+    add_feed_entry(session, feed_source1, "entry0", "Hello")
+    add_feed_entry(session, feed_source1, "entry1", "World")
+    # The same title from another source
+    add_feed_entry(session, feed_source2, "entry2", "Hello")
+    session.commit()
+
+    translator = CountingTranslator()
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    translated_count = translate_feed_entries(session, translator, "ja", since, 32)
+
+    assert translated_count == 2
+    assert len(translator.calls) == 1
+    assert sorted(translator.calls[0]) == ["Hello", "World"]
+
+    translations = session.exec(select(Translation)).all()
+    assert {t.translated_text for t in translations} == {"[ja] Hello", "[ja] World"}
+    assert all(t.target_lang == "ja" for t in translations)
+
+
+def test_translate_feed_entries_cached(session: Session) -> None:
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    add_feed_entry(session, feed_source, "entry0", "Hello")
+    session.commit()
+
+    translator = CountingTranslator()
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    translate_feed_entries(session, translator, "ja", since, 32)
+    # A re-fetched entry with the same title
+    add_feed_entry(session, feed_source, "entry1", "Hello")
+    session.commit()
+    translated_count = translate_feed_entries(session, translator, "ja", since, 32)
+
+    assert translated_count == 0
+    assert len(translator.calls) == 1
+
+
+def test_translate_feed_entries_batch(session: Session) -> None:
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    for i in range(5):
+        add_feed_entry(session, feed_source, f"entry{i}", f"Title {i}")
+    session.commit()
+
+    translator = CountingTranslator()
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+
+    translated_count = translate_feed_entries(session, translator, "ja", since, 2)
+
+    assert translated_count == 5
+    assert [len(texts) for texts in translator.calls] == [2, 2, 1]
+
+
+def test_translate_feed_entries_since(session: Session) -> None:
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    add_feed_entry(session, feed_source, "entry0", "Hello")
+    session.commit()
+
+    translator = CountingTranslator()
+    since = datetime.now(timezone.utc) + timedelta(hours=1)
+
+    translated_count = translate_feed_entries(session, translator, "ja", since, 32)
+
+    assert translated_count == 0
+    assert translator.calls == []
@@ -0,0 +1,243 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Generator
+from urllib.parse import parse_qs, urlsplit
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+from sqlmodel import Session, select
+from datetime import datetime, timezone, timedelta
+import hashlib
+import hmac
+import pytest
+
+from feedreader3.feed_fetcher import FetchLimits
+from feedreader3.database import get_engine
+from feedreader3.jobs.fetch_feeds_job import fetch_feeds, lock_feed_source
+from feedreader3.jobs.websub_job import renew_websub_subscriptions
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.websub_subscription import WebSubSubscription
+from feedreader3.settings import get_settings
+
+LIMITS = FetchLimits(max_bytes=1024, connect_timeout=1, read_timeout=1, total_timeout=5)
+CALLBACK_URL = "http://testserver/websub/callback"
+
+
+def make_feed(hub_url: str, entry_count: int) -> bytes:
+    entries = "".join(
+        f"<entry><id>urn:entry:{i}</id><title>Entry {i}</title>"
+        f'<link href="http://example.org/entry/{i}"/>'
+        "<updated>2026-10-19T00:00:00Z</updated></entry>"
+        for i in range(entry_count)
+    )
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom"><title>Pushed</title>'
+        f'<link rel="hub" href="{hub_url}"/>{entries}</feed>'
+    ).encode()
+
+
+# Serves a feed that names the hub, and takes subscription requests like a hub
+class StubHubHandler(BaseHTTPRequestHandler):
+    requests: list[dict[str, str]] = []
+
+    def do_GET(self) -> None:
+        body = make_feed(f"http://{self.headers['Host']}/hub", 1)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/atom+xml")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        form = parse_qs(body.decode())
+        StubHubHandler.requests.append({key: values[0] for key, values in form.items()})
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(name="hub_url")
+def hub_url_fixture(monkeypatch: MonkeyPatch) -> Generator[str, None, None]:
+    monkeypatch.setattr(get_settings(), "websub_callback_url", CALLBACK_URL)
+    StubHubHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHubHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def sign(secret: str, body: bytes) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_intent(client: TestClient, request: dict[str, str]) -> str:
+    response = client.get(
+        urlsplit(request["hub.callback"]).path,
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": request["hub.topic"],
+            "hub.challenge": "challenge-1",
+            "hub.lease_seconds": request["hub.lease_seconds"],
+        },
+    )
+    return response.text
+
+
+def test_websub_subscribe_and_deliver(
+    session: Session, client: TestClient, hub_url: str
+) -> None:
+    feed_source = FeedSource(name="pushed", feed_url=hub_url + "/feed.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    fetch_feeds(session)
+
+    assert len(StubHubHandler.requests) == 1
+    request = StubHubHandler.requests[0]
+    assert request["hub.mode"] == "subscribe"
+    assert request["hub.topic"] == feed_source.feed_url
+    assert request["hub.callback"] == f"{CALLBACK_URL}/{feed_source.id}"
+    subscription = session.get(WebSubSubscription, feed_source.id)
+    assert subscription is not None
+    assert subscription.state == "pending"
+    assert subscription.secret == request["hub.secret"]
+
+    assert verify_intent(client, request) == "challenge-1"
+    session.refresh(subscription)
+    assert subscription.state == "active"
+    assert subscription.lease_expires_at is not None
+
+    body = make_feed(hub_url + "/hub", 3)
+    response = client.post(
+        urlsplit(request["hub.callback"]).path,
+        content=body,
+        headers={"X-Hub-Signature": sign(request["hub.secret"], body)},
+    )
+
+    assert response.status_code == 204
+    entry_ids = session.exec(
+        select(FeedEntry.entry_id).where(FeedEntry.feed_source_id == feed_source.id)
+    ).all()
+    assert sorted(entry_ids) == ["urn:entry:0", "urn:entry:1", "urn:entry:2"]
+    session.refresh(subscription)
+    assert subscription.last_delivery_at is not None
+
+
+def test_websub_delivery_bad_signature(
+    session: Session, client: TestClient, hub_url: str
+) -> None:
+    feed_source = FeedSource(name="pushed", feed_url=hub_url + "/feed.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    fetch_feeds(session)
+    request = StubHubHandler.requests[0]
+    verify_intent(client, request)
+
+    body = make_feed(hub_url + "/hub", 3)
+    response = client.post(
+        urlsplit(request["hub.callback"]).path,
+        content=body,
+        headers={"X-Hub-Signature": sign("forged", body)},
+    )
+
+    # Acknowledged but not stored
+    assert response.status_code == 204
+    entry_ids = session.exec(
+        select(FeedEntry.entry_id).where(FeedEntry.feed_source_id == feed_source.id)
+    ).all()
+    assert entry_ids == ["urn:entry:0"]
+
+
+def test_websub_delivery_while_fetching(
+    session: Session, client: TestClient, hub_url: str
+) -> None:
+    feed_source = FeedSource(name="pushed", feed_url=hub_url + "/feed.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+    fetch_feeds(session)
+    request = StubHubHandler.requests[0]
+    verify_intent(client, request)
+    body = make_feed(hub_url + "/hub", 3)
+    headers = {"X-Hub-Signature": sign(request["hub.secret"], body)}
+
+    # Being fetched by a worker, so the hub is told to retry
+    with Session(get_engine()) as other_session:
+        assert lock_feed_source(other_session, feed_source.id)
+        response = client.post(
+            urlsplit(request["hub.callback"]).path, content=body, headers=headers
+        )
+    assert response.status_code == 503
+
+    response = client.post(
+        urlsplit(request["hub.callback"]).path, content=body, headers=headers
+    )
+    assert response.status_code == 204
+    entry_ids = session.exec(
+        select(FeedEntry.entry_id).where(FeedEntry.feed_source_id == feed_source.id)
+    ).all()
+    assert len(entry_ids) == 3
+
+
+def test_fetch_feeds_safety_net_poll(
+    session: Session, client: TestClient, hub_url: str, monkeypatch: MonkeyPatch
+) -> None:
+    feed_source = FeedSource(name="pushed", feed_url=hub_url + "/feed.xml")
+    session.add(feed_source)
+    session.commit()
+    fetch_feeds(session)
+    verify_intent(client, StubHubHandler.requests[0])
+
+    # Polled recently and pushed to, so it is skipped
+    counts = fetch_feeds(session)
+    assert (counts.new, counts.unchanged) == (0, 0)
+
+    # Due for the safety-net poll
+    monkeypatch.setattr(get_settings(), "websub_poll_interval_hours", 0)
+    counts = fetch_feeds(session)
+    assert counts.unchanged == 1
+    # Already subscribed, so the hub is not asked again
+    assert len(StubHubHandler.requests) == 1
+
+
+def test_renew_websub_subscriptions(session: Session, hub_url: str) -> None:
+    now = datetime.now(timezone.utc)
+    for name, state, lease_expires_at in [
+        ("expiring", "active", now + timedelta(minutes=10)),
+        ("fresh", "active", now + timedelta(days=5)),
+        ("denied", "denied", None),
+    ]:
+        feed_source = FeedSource(name=name, feed_url=f"http://example.com/{name}")
+        session.add(feed_source)
+        session.commit()
+        assert feed_source.id is not None
+        session.add(
+            WebSubSubscription(
+                feed_source_id=feed_source.id,
+                hub_url=hub_url + "/hub",
+                topic_url=feed_source.feed_url,
+                secret="secret",
+                state=state,
+                requested_at=now - timedelta(days=9),
+                lease_expires_at=lease_expires_at,
+            )
+        )
+    session.commit()
+
+    renewed = renew_websub_subscriptions(session, CALLBACK_URL, 3600, 86400, LIMITS)
+
+    assert renewed == 1
+    assert [request["hub.topic"] for request in StubHubHandler.requests] == [
+        "http://example.com/expiring"
+    ]
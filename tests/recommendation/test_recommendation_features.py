@@ -0,0 +1,40 @@
+import numpy as np
+
+from feedreader3.recommendation.features import tokenize, vectorize
+
+
+def test_tokenize() -> None:
+    assert tokenize("<p>Hello, <b>World</b>!</p> Python3") == [
+        "hello",
+        "world",
+        "python3",
+    ]
+
+
+def test_vectorize_normalized() -> None:
+    vectors = vectorize(["python release", "python security release", ""], 64)
+
+    assert vectors.shape == (3, 64)
+    assert vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors[:2], axis=1), 1.0)
+    assert not vectors[2].any()
+
+
+def test_vectorize_stable() -> None:
+    vectors1 = vectorize(["python release"], 64)
+    vectors2 = vectorize(["Python <em>release</em>"], 64)
+
+    assert np.array_equal(vectors1, vectors2)
+
+
+def test_vectorize_similarity() -> None:
+    vectors = vectorize(
+        [
+            "python release notes",
+            "new python release",
+            "football match result",
+        ],
+        256,
+    )
+
+    assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
@@ -0,0 +1,144 @@
+import numpy as np
+import numpy.typing as npt
+import pytest
+from pathlib import Path
+
+from feedreader3.recommendation import index as index_module
+from feedreader3.recommendation.index import RecommendationIndex
+
+DIM = 8
+
+
+def unit_vectors(rows: list[list[float]]) -> npt.NDArray[np.float32]:
+    vectors = np.array(rows, dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_recommendation_index_add_and_search(tmp_path: Path) -> None:
+    index = RecommendationIndex(tmp_path, DIM, writable=True)
+    vectors = unit_vectors(
+        [
+            [1, 0, 0, 0, 0, 0, 0, 0],
+            [1, 1, 0, 0, 0, 0, 0, 0],
+            [0, 0, 1, 0, 0, 0, 0, 0],
+        ]
+    )
+    index.add(np.array([10, 20, 30], dtype=np.int64), vectors)
+
+    ids, scores = index.search(vectors[:1], 2)
+
+    assert index.size == 3
+    assert index.max_entry_id == 30
+    assert ids.tolist() == [[10, 20]]
+    assert scores[0][0] == pytest.approx(1.0)
+    assert scores[0][1] == pytest.approx(1 / np.sqrt(2))
+
+
+def test_recommendation_index_search_batch_and_exclude(tmp_path: Path) -> None:
+    index = RecommendationIndex(tmp_path, DIM, writable=True)
+    vectors = unit_vectors(
+        [
+            [1, 0, 0, 0, 0, 0, 0, 0],
+            [1, 1, 0, 0, 0, 0, 0, 0],
+            [0, 0, 1, 0, 0, 0, 0, 0],
+        ]
+    )
+    index.add(np.array([1, 2, 3], dtype=np.int64), vectors)
+
+    ids, _ = index.search(vectors[[0, 2]], 1, exclude_ids=[1])
+
+    assert ids.tolist() == [[2], [3]]
+
+
+def test_recommendation_index_search_chunks(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(index_module, "SEARCH_CHUNK_SIZE", 3)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((10, DIM)).astype(np.float32)
+    index = RecommendationIndex(tmp_path, DIM, writable=True)
+    index.add(np.arange(1, 11, dtype=np.int64), vectors)
+
+    ids, scores = index.search(vectors[:1], 4)
+
+    expected = np.argsort(-(vectors @ vectors[0]))[:4] + 1
+    assert ids[0].tolist() == expected.tolist()
+    assert scores[0].tolist() == sorted(scores[0].tolist(), reverse=True)
+
+
+def test_recommendation_index_grow(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(index_module, "INITIAL_CAPACITY", 2)
+    index = RecommendationIndex(tmp_path, DIM, writable=True)
+    for i in range(5):
+        index.add(
+            np.array([i + 1], dtype=np.int64), np.full((1, DIM), i, dtype=np.float32)
+        )
+
+    assert index.size == 5
+    assert index.capacity == 8
+    assert index.get_vectors([3, 5, 6])[:, 0].tolist() == [2.0, 4.0]
+
+
+def test_recommendation_index_unordered_ids(tmp_path: Path) -> None:
+    index = RecommendationIndex(tmp_path, DIM, writable=True)
+    index.add(np.array([5], dtype=np.int64), np.zeros((1, DIM), dtype=np.float32))
+    # Committed after entry 5 was indexed
+    index.add(np.array([3], dtype=np.int64), np.ones((1, DIM), dtype=np.float32))
+    index.publish()
+
+    assert index.max_entry_id == 5
+    assert index.get_vectors([3])[:, 0].tolist() == [1.0]
+    assert RecommendationIndex(tmp_path, DIM, writable=False).max_entry_id == 5
+    with pytest.raises(ValueError):
+        index.add(np.array([5], dtype=np.int64), np.zeros((1, DIM), dtype=np.float32))
+
+
+def test_recommendation_index_reader_refresh(tmp_path: Path) -> None:
+    reader = RecommendationIndex(tmp_path, DIM, writable=False)
+    assert reader.size == 0
+
+    writer = RecommendationIndex(tmp_path, DIM, writable=True)
+    writer.add(np.array([1], dtype=np.int64), np.ones((1, DIM), dtype=np.float32))
+    writer.publish()
+    reader.refresh()
+    assert reader.size == 1
+
+    # Rows are not visible to readers until published
+    writer.add(np.array([2], dtype=np.int64), np.ones((1, DIM), dtype=np.float32))
+    reader.refresh()
+    assert reader.size == 1
+
+    writer.publish()
+    reader.refresh()
+    assert reader.size == 2
+    assert reader.ids.tolist() == [1, 2]
+
+    with pytest.raises(RuntimeError):
+        reader.publish()
+    with pytest.raises(RuntimeError):
+        reader.add(np.array([3], dtype=np.int64), np.ones((1, DIM), dtype=np.float32))
+
+
+def test_recommendation_index_dim_mismatch(tmp_path: Path) -> None:
+    RecommendationIndex(tmp_path, DIM, writable=True)
+
+    with pytest.raises(ValueError):
+        RecommendationIndex(tmp_path, DIM * 2, writable=False)
+
+
+def test_recommendation_index_warm_up(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(index_module, "SEARCH_CHUNK_SIZE", 2)
+    writer = RecommendationIndex(tmp_path, DIM, writable=True)
+    vectors = unit_vectors([[1, 0, 0, 0, 0, 0, 0, i] for i in range(5)])
+    writer.add(np.arange(1, 6, dtype=np.int64), vectors)
+    writer.publish()
+
+    reader = RecommendationIndex(tmp_path, DIM, writable=False)
+    reader.warm_up()
+
+    ids, _ = reader.search(vectors[:1], 1)
+    assert ids.tolist() == [[1]]
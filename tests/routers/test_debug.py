@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+
+from feedreader3.settings import get_settings
+
+
+def test_read_query_stats_disabled(client: TestClient) -> None:
+    response = client.get("/debug/queries")
+
+    assert response.status_code == 404
+
+
+def test_read_query_stats(
+    client: TestClient, monkeypatch: MonkeyPatch, collect_query_stats: None
+) -> None:
+    monkeypatch.setattr(get_settings(), "debug_queries", True)
+    assert client.delete("/debug/queries").status_code == 204
+
+    for _ in range(2):
+        client.get("/feed-sources")
+    response = client.get("/debug/queries")
+
+    assert response.status_code == 200
+    stats = {item["statement"]: item for item in response.json()}
+    [statement] = [s for s in stats if s.startswith("SELECT feedsource.name")]
+    assert stats[statement]["count"] == 2
+    assert set(stats[statement]) == {
+        "statement",
+        "count",
+        "total_ms",
+        "mean_ms",
+        "max_ms",
+        "histogram",
+    }
@@ -1,9 +1,22 @@
 from fastapi.testclient import TestClient
 from sqlmodel import Session
+from pathlib import Path
+from typing import Generator
+import numpy as np
+import pytest
 from datetime import datetime, timedelta, timezone
 import urllib.parse
 
 from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_entry_content import FeedEntryContent, compress_text
+from feedreader3.models.translation import Translation, hash_text
+from feedreader3.models.feed_source_stats import FeedSourceStats
+from feedreader3.recommendation.features import vectorize
+from feedreader3.recommendation.index import (
+    RecommendationIndex,
+    initialize_recommendation_index,
+    finalize_recommendation_index,
+)
 from feedreader3.models.feed_source import FeedSource
 
 
@@ -13,6 +26,30 @@ def test_read_feed_entries_no_entry(session: Session, client: TestClient) -> Non
 
     assert response.status_code == 200
     assert len(data) == 0
+    assert response.headers["X-Total-Count"] == "0"
+
+
+def test_read_feed_entries_total_count(session: Session, client: TestClient) -> None:
+    feed_source1 = FeedSource(name="feed1", feed_url="feed1.rss")
+    feed_source2 = FeedSource(name="feed2", feed_url="feed2.rss")
+    session.add_all([feed_source1, feed_source2])
+    session.commit()
+    # The total comes from the per-source counters, not from feedentry
+    session.add_all(
+        [
+            FeedSourceStats(feed_source_id=feed_source1.id, entry_count=3),
+            FeedSourceStats(feed_source_id=feed_source2.id, entry_count=4),
+        ]
+    )
+    session.commit()
+
+    response = client.get("/feed-entries?limit=1")
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "7"
+
+    response = client.get("/feed-entries?dedupe=true")
+    assert response.status_code == 200
+    assert "X-Total-Count" not in response.headers
 
 
 def test_read_feed_entries_get_2(session: Session, client: TestClient) -> None:
@@ -427,3 +464,370 @@ def test_read_feed_entries_invalid_end(client: TestClient) -> None:
         and "Invalid datetime, it must be timezone-aware" in err["msg"]
         for err in data["detail"]
     )
+
+
+def test_read_feed_entry(session: Session, client: TestClient) -> None:
+    # FeedEntry requires a FeedSource due to the foreign key (FeedEntry.feed_source_id)
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    feed_entry = FeedEntry(
+        first_seen_at=datetime(2025, 11, 2, tzinfo=timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id="feed_entry",
+        entry_title="Feed Entry",
+        entry_link="feed-entry.html",
+        entry_updated_at=datetime(2025, 11, 2, tzinfo=timezone.utc),
+    )
+    feed_entry.entry_content = FeedEntryContent(
+        summary=compress_text("Summary"), content=compress_text("<p>Content</p>")
+    )
+    session.add(feed_entry)
+    session.commit()
+
+    response = client.get(f"/feed-entries/{feed_entry.id}")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["id"] == feed_entry.id
+    assert data["entry_id"] == feed_entry.entry_id
+    assert data["entry_title"] == feed_entry.entry_title
+    assert data["entry_summary"] == "Summary"
+    assert data["entry_content"] == "<p>Content</p>"
+
+
+def test_read_feed_entry_without_content(session: Session, client: TestClient) -> None:
+    # FeedEntry requires a FeedSource due to the foreign key (FeedEntry.feed_source_id)
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    feed_entry = FeedEntry(
+        first_seen_at=datetime(2025, 11, 2, tzinfo=timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id="feed_entry",
+        entry_title="Feed Entry",
+        entry_link="feed-entry.html",
+        entry_updated_at=None,
+    )
+    session.add(feed_entry)
+    session.commit()
+
+    response = client.get(f"/feed-entries/{feed_entry.id}")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["entry_summary"] is None
+    assert data["entry_content"] is None
+
+
+def test_read_feed_entry_not_found(client: TestClient) -> None:
+    response = client.get("/feed-entries/1")
+
+    assert response.status_code == 404
+
+
+def test_read_feed_entries_without_content(
+    session: Session, client: TestClient
+) -> None:
+    # FeedEntry requires a FeedSource due to the foreign key (FeedEntry.feed_source_id)
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    feed_entry = FeedEntry(
+        first_seen_at=datetime(2025, 11, 2, tzinfo=timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id="feed_entry",
+        entry_title="Feed Entry",
+        entry_link="feed-entry.html",
+        entry_updated_at=None,
+    )
+    feed_entry.entry_content = FeedEntryContent(summary=compress_text("Summary"))
+    session.add(feed_entry)
+    session.commit()
+
+    response = client.get("/feed-entries")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data) == 1
+    assert "entry_summary" not in data[0]
+    assert "entry_content" not in data[0]
+
+
+def test_read_feed_entries_dedupe(session: Session, client: TestClient) -> None:
+    # FeedEntry requires a FeedSource due to the foreign key (FeedEntry.feed_source_id)
+    feed_source1 = FeedSource(name="feed1", feed_url="feed1.rss")
+    feed_source2 = FeedSource(name="feed2", feed_url="feed2.rss")
+    session.add(feed_source1)
+    session.add(feed_source2)
+    session.commit()
+
+    feed_entry0 = FeedEntry(
+        first_seen_at=datetime(2025, 11, 1, tzinfo=timezone.utc),
+        feed_source_id=feed_source1.id,
+        entry_id="feed_entry0",
+        entry_title="Feed Entry 0",
+        entry_link="feed-entry0.html",
+        entry_updated_at=None,
+        canonical_link_hash=1,
+    )
+    feed_entry1 = FeedEntry(
+        first_seen_at=datetime(2025, 11, 2, tzinfo=timezone.utc),
+        feed_source_id=feed_source2.id,
+        entry_id="feed_entry1",
+        entry_title="Feed Entry 0 (mirror)",
+        entry_link="mirror/feed-entry0.html",
+        entry_updated_at=None,
+        canonical_link_hash=1,
+    )
+    feed_entry2 = FeedEntry(
+        first_seen_at=datetime(2025, 11, 3, tzinfo=timezone.utc),
+        feed_source_id=feed_source2.id,
+        entry_id="feed_entry2",
+        entry_title="Feed Entry 2",
+        entry_link="feed-entry2.html",
+        entry_updated_at=None,
+        canonical_link_hash=2,
+    )
+    session.add(feed_entry0)
+    session.add(feed_entry1)
+    session.add(feed_entry2)
+    session.commit()
+
+    response = client.get("/feed-entries?order=asc")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data) == 3
+    assert "canonical_link_hash" not in data[0]
+
+    response = client.get("/feed-entries?order=asc&dedupe=true")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data) == 2
+    assert data[0]["entry_id"] == feed_entry0.entry_id
+    assert data[1]["entry_id"] == feed_entry2.entry_id
+
+
+def test_read_feed_entries_lang(session: Session, client: TestClient) -> None:
+    # FeedEntry requires a FeedSource due to the foreign key (FeedEntry.feed_source_id)
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    feed_entry0 = FeedEntry(
+        first_seen_at=datetime(2025, 11, 1, tzinfo=timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id="feed_entry0",
+        entry_title="Hello",
+        entry_link="feed-entry0.html",
+        entry_updated_at=None,
+        entry_title_hash=hash_text("Hello"),
+    )
+    feed_entry1 = FeedEntry(
+        first_seen_at=datetime(2025, 11, 2, tzinfo=timezone.utc),
+        feed_source_id=feed_source.id,
+        entry_id="feed_entry1",
+        entry_title="Not translated yet",
+        entry_link="feed-entry1.html",
+        entry_updated_at=None,
+        entry_title_hash=hash_text("Not translated yet"),
+    )
+    translation = Translation(
+        source_hash=hash_text("Hello"),
+        target_lang="ja",
+        translated_text="こんにちは",
+    )
+    session.add(feed_entry0)
+    session.add(feed_entry1)
+    session.add(translation)
+    session.commit()
+
+    response = client.get("/feed-entries?order=asc&lang=ja")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data) == 2
+    assert data[0]["entry_title"] == "こんにちは"
+    assert data[0]["entry_title_lang"] == "ja"
+    assert data[1]["entry_title"] == "Not translated yet"
+    assert data[1]["entry_title_lang"] is None
+
+    response = client.get("/feed-entries?order=asc")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data[0]["entry_title"] == "Hello"
+    assert data[0]["entry_title_lang"] is None
+
+
+def test_read_feed_entries_invalid_lang(client: TestClient) -> None:
+    response = client.get("/feed-entries?lang=ja;drop")
+
+    assert response.status_code == 422
+
+
+def create_translated_entries(session: Session) -> None:
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+    session.add_all(
+        [
+            FeedEntry(
+                first_seen_at=datetime(2025, 11, i + 1, tzinfo=timezone.utc),
+                feed_source_id=feed_source.id,
+                entry_id=f"feed_entry{i}",
+                entry_title=title,
+                entry_link=f"feed-entry{i}.html",
+                entry_updated_at=None,
+                entry_title_hash=hash_text(title),
+            )
+            for i, title in enumerate(["Hello", "Not translated yet"])
+        ]
+    )
+    session.add(
+        Translation(
+            source_hash=hash_text("Hello"),
+            target_lang="ja",
+            translated_text="こんにちは",
+        )
+    )
+    session.add(FeedSourceStats(feed_source_id=feed_source.id, entry_count=2))
+    session.commit()
+
+
+def test_read_feed_entries_fields(session: Session, client: TestClient) -> None:
+    create_translated_entries(session)
+
+    response = client.get(
+        "/feed-entries",
+        params={
+            "fields": ["id", "entry_title", "entry_title_lang"],
+            "lang": "ja",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "2"
+    assert response.json() == [
+        {"id": 1, "entry_title": "こんにちは", "entry_title_lang": "ja"},
+        {"id": 2, "entry_title": "Not translated yet", "entry_title_lang": None},
+    ]
+
+
+def test_read_feed_entries_fields_same_values(
+    session: Session, client: TestClient
+) -> None:
+    create_translated_entries(session)
+
+    full = client.get("/feed-entries?lang=ja").json()
+    response = client.get(
+        "/feed-entries",
+        params={"fields": list(full[0].keys()), "lang": "ja"},
+    )
+
+    assert response.json() == full
+
+
+def test_read_feed_entries_invalid_fields(client: TestClient) -> None:
+    response = client.get("/feed-entries?fields=entry_title_hash")
+
+    assert response.status_code == 422
+
+
+def test_read_feed_entries_columnar(session: Session, client: TestClient) -> None:
+    create_translated_entries(session)
+
+    response = client.get(
+        "/feed-entries",
+        params={"fields": ["id", "entry_link"], "order": "desc"},
+        headers={"Accept": "application/vnd.feedreader3.columnar+json"},
+    )
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == (
+        "application/vnd.feedreader3.columnar+json"
+    )
+    assert response.json() == {
+        "id": [2, 1],
+        "entry_link": ["feed-entry1.html", "feed-entry0.html"],
+    }
+
+    # Every field when none are selected
+    response = client.get(
+        "/feed-entries",
+        headers={"Accept": "application/vnd.feedreader3.columnar+json; q=1.0"},
+    )
+    data = response.json()
+    assert data["entry_title"] == ["Hello", "Not translated yet"]
+    assert data["entry_title_lang"] == [None, None]
+    assert data["first_seen_at"] == ["2025-11-01T00:00:00Z", "2025-11-02T00:00:00Z"]
+
+
+@pytest.fixture(name="recommendation_index_path")
+def recommendation_index_path_fixture(
+    client: TestClient, tmp_path: Path
+) -> Generator[Path, None, None]:
+    initialize_recommendation_index(str(tmp_path), 64, writable=False)
+    yield tmp_path
+    finalize_recommendation_index()
+
+
+def test_read_recommended_feed_entries(
+    session: Session, client: TestClient, recommendation_index_path: Path
+) -> None:
+    # FeedEntry requires a FeedSource due to the foreign key (FeedEntry.feed_source_id)
+    feed_source = FeedSource(name="feed", feed_url="feed.rss")
+    session.add(feed_source)
+    session.commit()
+
+    titles = ["Python release", "Python security release", "Football result"]
+    feed_entries = [
+        FeedEntry(
+            first_seen_at=datetime(2025, 11, 1, tzinfo=timezone.utc),
+            feed_source_id=feed_source.id,
+            entry_id=f"entry{i}",
+            entry_title=title,
+            entry_link=f"entry{i}.html",
+            entry_updated_at=None,
+        )
+        for i, title in enumerate(titles)
+    ]
+    session.add_all(feed_entries)
+    session.commit()
+
+    # The worker side of the index
+    index = RecommendationIndex(recommendation_index_path, 64, writable=True)
+    index.add(
+        np.array([feed_entry.id for feed_entry in feed_entries], dtype=np.int64),
+        vectorize(titles, 64),
+    )
+    index.publish()
+
+    response = client.get(f"/feed-entries/recommended?ids={feed_entries[0].id}")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert len(data) == 2
+    assert data[0]["id"] == feed_entries[1].id
+    assert data[0]["entry_title"] == feed_entries[1].entry_title
+    assert data[0]["score"] > data[1]["score"]
+
+
+def test_read_recommended_feed_entries_unknown_id(
+    client: TestClient, recommendation_index_path: Path
+) -> None:
+    response = client.get("/feed-entries/recommended?ids=1")
+
+    assert response.status_code == 200
+    assert response.json() == []
+
+
+def test_read_recommended_feed_entries_disabled(client: TestClient) -> None:
+    response = client.get("/feed-entries/recommended?ids=1")
+
+    assert response.status_code == 503
@@ -1,9 +1,20 @@
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 from sqlmodel import Session
+from contextlib import contextmanager
 from datetime import datetime, timezone
+from typing import Any, Iterator, cast
 
+from feedreader3.database import get_engine
 from feedreader3.models.feed_source import FeedSource
 from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_source_stats import FeedSourceStats
+from feedreader3.models.refresh_request import RefreshRequest
+from feedreader3.refresh_queue import (
+    REFRESH_PRIORITY_INITIAL,
+    REFRESH_PRIORITY_MANUAL,
+    enqueue_refresh,
+)
 
 
 def test_create_feed_source(client: TestClient) -> None:
@@ -19,9 +30,37 @@ def test_create_feed_source(client: TestClient) -> None:
     assert response.status_code == 201
     assert data["name"] == name
     assert data["feed_url"] == feed_url
+    assert data["fetch_priority"] == 1.0
     assert data["id"] is not None
 
 
+def test_create_feed_source_fetch_priority(client: TestClient) -> None:
+    response = client.post(
+        "/feed-sources",
+        json={
+            "name": "feed",
+            "feed_url": "http://example.com/feed.xml",
+            "fetch_priority": 2.5,
+        },
+    )
+
+    assert response.status_code == 201
+    assert response.json()["fetch_priority"] == 2.5
+
+
+def test_create_feed_source_invalid_fetch_priority(client: TestClient) -> None:
+    response = client.post(
+        "/feed-sources",
+        json={
+            "name": "feed",
+            "feed_url": "http://example.com/feed.xml",
+            "fetch_priority": 0,
+        },
+    )
+
+    assert response.status_code == 422
+
+
 def test_create_feed_source_incomplete(client: TestClient) -> None:
     response = client.post("/feed-sources", json={"name": "feed"})
 
@@ -91,6 +130,62 @@ def test_read_feed_sources(session: Session, client: TestClient) -> None:
     assert data[1]["name"] == feed_source2.name
     assert data[1]["feed_url"] == feed_source2.feed_url
     assert data[1]["id"] == feed_source2.id
+    assert data[1]["stats"] is None
+    assert response.headers["X-Total-Count"] == "2"
+
+
+def test_read_feed_sources_stats(session: Session, client: TestClient) -> None:
+    feed_source1 = FeedSource(name="feed1", feed_url="http://example.com/feed1.xml")
+    feed_source2 = FeedSource(name="feed2", feed_url="http://example.com/feed2.xml")
+    feed_source3 = FeedSource(name="feed3", feed_url="http://example.com/feed3.xml")
+    session.add_all([feed_source1, feed_source2, feed_source3])
+    session.commit()
+
+    session.add_all(
+        [
+            FeedSourceStats(
+                feed_source_id=feed_source1.id,
+                entry_count=3,
+                last_entry_at=datetime(2026, 2, 1, tzinfo=timezone.utc),
+                last_fetched_at=datetime(2026, 2, 3, tzinfo=timezone.utc),
+                last_new_entry_at=datetime(2026, 2, 1, tzinfo=timezone.utc),
+            ),
+            FeedSourceStats(
+                feed_source_id=feed_source2.id,
+                entry_count=5,
+                last_entry_at=datetime(2026, 2, 2, tzinfo=timezone.utc),
+                last_fetched_at=datetime(2026, 2, 3, tzinfo=timezone.utc),
+                last_new_entry_at=datetime(2026, 2, 2, tzinfo=timezone.utc),
+            ),
+        ]
+    )
+    session.commit()
+
+    response = client.get("/feed-sources")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data[0]["stats"]["entry_count"] == 3
+    assert data[0]["stats"]["last_entry_at"] == "2026-02-01T00:00:00Z"
+    assert data[0]["stats"]["last_fetched_at"] == "2026-02-03T00:00:00Z"
+    assert data[0]["stats"]["last_new_entry_at"] == "2026-02-01T00:00:00Z"
+    assert data[2]["stats"] is None
+
+    response = client.get("/feed-sources?sort=freshness")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [d["id"] for d in data] == [
+        feed_source2.id,
+        feed_source1.id,
+        feed_source3.id,
+    ]
+
+
+def test_read_feed_sources_invalid_sort(client: TestClient) -> None:
+    response = client.get("/feed-sources?sort=name")
+
+    assert response.status_code == 422
 
 
 def test_read_feed_source(session: Session, client: TestClient) -> None:
@@ -121,6 +216,23 @@ def test_update_feed_source(session: Session, client: TestClient) -> None:
     assert data["id"] == feed_source.id
 
 
+def test_update_feed_source_fetch_priority(
+    session: Session, client: TestClient
+) -> None:
+    feed_source = FeedSource(name="feed", feed_url="http://example.com/feed.xml")
+    session.add(feed_source)
+    session.commit()
+
+    response = client.patch(
+        f"/feed-sources/{feed_source.id}", json={"fetch_priority": 0.5}
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["name"] == "feed"
+    assert data["fetch_priority"] == 0.5
+
+
 def test_update_feed_source_duplicate_name(
     session: Session, client: TestClient
 ) -> None:
@@ -183,7 +295,13 @@ def test_delete_feed_source(session: Session, client: TestClient) -> None:
     db_feed_source = session.get(FeedSource, feed_source_id)
 
     assert response.status_code == 204
-    assert db_feed_source is None
+    # Kept for the worker to purge, but hidden
+    assert db_feed_source is not None
+    assert db_feed_source.deleted_at is not None
+    assert client.get(f"/feed-sources/{feed_source_id}").status_code == 404
+    assert client.get("/feed-sources").json() == []
+    assert client.delete(f"/feed-sources/{feed_source_id}").status_code == 404
+    assert client.post(f"/feed-sources/{feed_source_id}/refresh").status_code == 404
 
 
 def test_delete_feed_source_with_entry(session: Session, client: TestClient) -> None:
@@ -201,15 +319,259 @@ def test_delete_feed_source_with_entry(session: Session, client: TestClient) ->
         entry_updated_at=datetime(2026, 2, 3, tzinfo=timezone.utc),
     )
     session.add(feed_entry)
+    session.add(FeedSourceStats(feed_source_id=feed_source_id, entry_count=1))
     session.commit()
     feed_entry_id = feed_entry.id
 
     response = client.delete(f"/feed-sources/{feed_source_id}")
-    session.expire_all()
-
-    db_feed_source = session.get(FeedSource, feed_source_id)
-    db_feed_entry = session.get(FeedEntry, feed_entry_id)
 
     assert response.status_code == 204
-    assert db_feed_source is None
-    assert db_feed_entry is None
+    assert client.get(f"/feed-entries/{feed_entry_id}").status_code == 404
+    response = client.get("/feed-entries")
+    assert response.json() == []
+    assert response.headers["X-Total-Count"] == "0"
+
+
+def test_delete_feed_source_reuse(session: Session, client: TestClient) -> None:
+    feed_source = FeedSource(name="feed", feed_url="http://example.com/feed.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+    assert feed_source.id is not None
+    enqueue_refresh(session, feed_source.id, REFRESH_PRIORITY_MANUAL)
+
+    client.delete(f"/feed-sources/{feed_source.id}")
+
+    assert session.get(RefreshRequest, feed_source.id) is None
+    # The name and URL are free again while the old source waits to be purged
+    response = client.post(
+        "/feed-sources",
+        json={"name": "feed", "feed_url": "http://example.com/feed.xml"},
+    )
+    assert response.status_code == 201
+    assert response.json()["id"] != feed_source.id
+
+
+def test_create_feed_source_enqueue_refresh(
+    session: Session, client: TestClient
+) -> None:
+    response = client.post(
+        "/feed-sources", json={"name": "feed", "feed_url": "http://example.com/f.xml"}
+    )
+
+    refresh_request = session.get(RefreshRequest, response.json()["id"])
+    assert refresh_request is not None
+    assert refresh_request.priority == REFRESH_PRIORITY_INITIAL
+
+
+def test_refresh_feed_source(session: Session, client: TestClient) -> None:
+    feed_source = FeedSource(name="feed", feed_url="http://example.com/feed.xml")
+    session.add(feed_source)
+    session.commit()
+    session.refresh(feed_source)
+
+    response = client.post(f"/feed-sources/{feed_source.id}/refresh")
+    data = response.json()
+
+    assert response.status_code == 202
+    assert data["feed_source_id"] == feed_source.id
+    assert data["priority"] == REFRESH_PRIORITY_MANUAL
+
+    # Requested again: coalesced into the pending request
+    response = client.post(
+        f"/feed-sources/{feed_source.id}/refresh", params={"priority": 80}
+    )
+    assert response.status_code == 202
+    assert response.json()["priority"] == 80
+    assert response.json()["requested_at"] == data["requested_at"]
+
+
+def test_refresh_feed_source_not_found(client: TestClient) -> None:
+    response = client.post("/feed-sources/1/refresh")
+
+    assert response.status_code == 404
+
+
+def test_create_feed_sources(session: Session, client: TestClient) -> None:
+    response = client.post(
+        "/feed-sources/batch",
+        json=[
+            {"name": f"feed{i}", "feed_url": f"http://example.com/feed{i}.xml"}
+            for i in range(3)
+        ],
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [item["status"] for item in data] == [201, 201, 201]
+    assert [item["feed_source"]["name"] for item in data] == ["feed0", "feed1", "feed2"]
+    for item in data:
+        refresh_request = session.get(RefreshRequest, item["feed_source"]["id"])
+        assert refresh_request is not None
+        assert refresh_request.priority == REFRESH_PRIORITY_INITIAL
+
+
+@contextmanager
+def count_statements() -> Iterator[list[str]]:
+    statements: list[str] = []
+
+    def before_cursor_execute(*args: Any) -> None:
+        statements.append(args[2])
+
+    engine = get_engine()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def test_batch_statement_count(client: TestClient) -> None:
+    # A batch takes the same statements whatever its size
+    counts = []
+    for size in (5, 50):
+        with count_statements() as statements:
+            response = client.post(
+                "/feed-sources/batch",
+                json=[
+                    {
+                        "name": f"feed{size}-{i}",
+                        "feed_url": f"http://example.com/feed{size}-{i}.xml",
+                    }
+                    for i in range(size)
+                ],
+            )
+        assert response.status_code == 200
+        ids = [item["feed_source"]["id"] for item in response.json()]
+        counts.append(len(statements))
+
+        with count_statements() as statements:
+            response = client.patch(
+                "/feed-sources/batch",
+                json=[{"id": id, "fetch_priority": 2.0} for id in ids],
+            )
+        assert response.status_code == 200
+        assert [item["status"] for item in response.json()] == [200] * size
+        counts.append(len(statements))
+
+    assert counts[:2] == counts[2:]
+
+
+def test_create_feed_sources_conflict(session: Session, client: TestClient) -> None:
+    session.add(FeedSource(name="feed", feed_url="http://example.com/feed.xml"))
+    session.commit()
+
+    response = client.post(
+        "/feed-sources/batch",
+        json=[
+            {"name": "feed0", "feed_url": "http://example.com/feed0.xml"},
+            {"name": "feed", "feed_url": "http://example.com/other.xml"},
+            {"name": "feed1", "feed_url": "http://example.com/feed.xml"},
+            # Conflicts with an item earlier in the same batch
+            {"name": "feed0", "feed_url": "http://example.com/feed2.xml"},
+        ],
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [item["status"] for item in data] == [201, 409, 409, 409]
+    assert data[1]["detail"] == {"field": "name", "message": "already exists"}
+    assert data[2]["detail"] == {"field": "feed_url", "message": "already exists"}
+    assert data[3]["detail"] == {"field": "name", "message": "already exists"}
+    names = [item["name"] for item in client.get("/feed-sources").json()]
+    assert names == ["feed", "feed0"]
+    assert session.get(RefreshRequest, data[0]["feed_source"]["id"]) is not None
+
+
+def test_create_feed_sources_invalid(client: TestClient) -> None:
+    assert client.post("/feed-sources/batch", json=[]).status_code == 422
+    response = client.post(
+        "/feed-sources/batch",
+        json=[
+            {"name": "feed0", "feed_url": "http://example.com/feed0.xml"},
+            {"name": "feed1", "feed_url": "example.com/feed1.xml"},
+        ],
+    )
+
+    # Nothing is created when any item is invalid
+    assert response.status_code == 422
+    assert client.get("/feed-sources").json() == []
+
+
+def test_update_feed_sources(session: Session, client: TestClient) -> None:
+    feed_sources = [
+        FeedSource(name=f"feed{i}", feed_url=f"http://example.com/feed{i}.xml")
+        for i in range(3)
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+    ids = [feed_source.id for feed_source in feed_sources]
+
+    response = client.patch(
+        "/feed-sources/batch",
+        json=[
+            {"id": ids[0], "feed_url": "http://example.org/feed0.xml"},
+            {"id": ids[1], "name": "renamed", "fetch_priority": 2.0},
+            {"id": 999, "name": "missing"},
+        ],
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [item["status"] for item in data] == [200, 200, 404]
+    assert data[0]["feed_source"]["feed_url"] == "http://example.org/feed0.xml"
+    assert data[0]["feed_source"]["name"] == "feed0"
+    assert data[1]["feed_source"]["name"] == "renamed"
+    assert data[1]["feed_source"]["fetch_priority"] == 2.0
+    assert client.get(f"/feed-sources/{ids[1]}").json()["name"] == "renamed"
+
+
+def test_update_feed_sources_conflict(session: Session, client: TestClient) -> None:
+    feed_sources = [
+        FeedSource(name=f"feed{i}", feed_url=f"http://example.com/feed{i}.xml")
+        for i in range(3)
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+    ids = [feed_source.id for feed_source in feed_sources]
+
+    response = client.patch(
+        "/feed-sources/batch",
+        json=[
+            {"id": ids[0], "name": "renamed"},
+            {"id": ids[1], "name": "feed2"},
+            {"id": ids[2], "feed_url": "http://example.com/feed0.xml"},
+        ],
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [item["status"] for item in data] == [200, 409, 409]
+    assert data[1]["detail"] == {"field": "name", "message": "already exists"}
+    assert data[2]["detail"] == {"field": "feed_url", "message": "already exists"}
+    names = [item["name"] for item in client.get("/feed-sources").json()]
+    assert names == ["renamed", "feed1", "feed2"]
+
+
+def test_delete_feed_sources(session: Session, client: TestClient) -> None:
+    feed_sources = [
+        FeedSource(name=f"feed{i}", feed_url=f"http://example.com/feed{i}.xml")
+        for i in range(3)
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+    ids = [cast(int, feed_source.id) for feed_source in feed_sources]
+    enqueue_refresh(session, ids[0], REFRESH_PRIORITY_MANUAL)
+
+    response = client.request(
+        "DELETE", "/feed-sources/batch", json=[ids[0], ids[1], 999]
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert [item["status"] for item in data] == [204, 204, 404]
+    assert session.get(RefreshRequest, ids[0]) is None
+    assert [item["id"] for item in client.get("/feed-sources").json()] == [ids[2]]
+    # Already deleted
+    response = client.request("DELETE", "/feed-sources/batch", json=[ids[0]])
+    assert response.json()[0]["status"] == 404
@@ -1,4 +1,14 @@
+from datetime import datetime, timedelta, timezone
 from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+from sqlmodel import Session
+
+from feedreader3.heartbeat import count_skipped_run, record_worker_heartbeat
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.feed_source_stats import FeedSourceStats
+from feedreader3.models.worker_heartbeat import WorkerHeartbeat
+from feedreader3.settings import get_settings
 
 
 def test_health(client: TestClient) -> None:
@@ -8,3 +18,115 @@ def test_health(client: TestClient) -> None:
     assert response.status_code == 200
     assert len(data) == 1
     assert data["status"] == "healthy"
+
+
+def test_readiness(client: TestClient) -> None:
+    response = client.get("/health/ready")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["status"] == "ready"
+    assert data["database"]["status"] == "ok"
+    assert data["database"]["latency_ms"] >= 0
+    assert data["pool"]["status"] == "ok"
+
+
+def test_readiness_slow_database(client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "health_max_db_latency_ms", -1)
+
+    response = client.get("/health/ready")
+    data = response.json()
+
+    assert response.status_code == 503
+    assert data["status"] == "unavailable"
+    assert data["database"]["status"] == "slow"
+
+
+def test_readiness_exhausted_pool(client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    settings = get_settings()
+    monkeypatch.setattr(settings, "database_max_overflow", -settings.database_pool_size)
+
+    response = client.get("/health/ready")
+    data = response.json()
+
+    assert response.status_code == 503
+    assert data["pool"]["status"] == "exhausted"
+    # Not pinged, as the ping would wait for a connection
+    assert data["database"]["status"] == "skipped"
+
+
+def test_read_freshness(client: TestClient, session: Session) -> None:
+    now = datetime.now(timezone.utc)
+    skipped_runs = count_skipped_run("fetch_feeds_job:0")
+    record_worker_heartbeat(session, "fetch_feeds_job:0", 1200)
+    session.add(
+        WorkerHeartbeat(
+            job_id="fetch_feeds_job:1",
+            hostname="worker1",
+            pid=1,
+            beat_at=now - timedelta(days=1),
+            duration_ms=900,
+        )
+    )
+    fresh_source = FeedSource(name="Fresh", feed_url="fresh.xml")
+    stale_source = FeedSource(name="Stale", feed_url="stale.xml")
+    new_source = FeedSource(name="New", feed_url="new.xml")
+    session.add_all([fresh_source, stale_source, new_source])
+    session.commit()
+    assert fresh_source.id is not None and stale_source.id is not None
+    session.add_all(
+        [
+            FeedSourceStats(
+                feed_source_id=fresh_source.id,
+                last_fetched_at=now - timedelta(minutes=1),
+            ),
+            FeedSourceStats(
+                feed_source_id=stale_source.id, last_fetched_at=now - timedelta(hours=2)
+            ),
+        ]
+    )
+    for i, delay in enumerate([timedelta(minutes=5), timedelta(minutes=15)]):
+        session.add(
+            FeedEntry(
+                feed_source_id=fresh_source.id,
+                entry_id=f"entry{i}",
+                entry_title=f"Entry {i}",
+                entry_link=f"entry{i}.html",
+                entry_updated_at=now - timedelta(hours=1),
+                first_seen_at=now - timedelta(hours=1) + delay,
+            )
+        )
+    # Found when the source was added, and left out
+    session.add(
+        FeedEntry(
+            feed_source_id=stale_source.id,
+            entry_id="old",
+            entry_title="Old",
+            entry_link="old.html",
+            entry_updated_at=now - timedelta(days=30),
+            first_seen_at=now,
+        )
+    )
+    session.commit()
+
+    response = client.get("/health/freshness")
+    data = response.json()
+
+    assert response.status_code == 200
+    workers = {worker["job_id"]: worker for worker in data["workers"]}
+    assert workers["fetch_feeds_job:0"]["duration_ms"] == 1200
+    assert workers["fetch_feeds_job:0"]["stalled"] is False
+    assert workers["fetch_feeds_job:0"]["skipped_runs"] == skipped_runs
+    assert workers["fetch_feeds_job:1"]["skipped_runs"] == 0
+    assert workers["fetch_feeds_job:1"]["stalled"] is True
+
+    sources = data["sources"]
+    assert sources["count"] == 3
+    assert sources["never_fetched"] == 1
+    assert 7000 < sources["fetch_lag_seconds"]["max"] < 7300
+    assert [source["name"] for source in sources["stalest"]] == ["Stale", "Fresh"]
+
+    entries = data["entries"]
+    assert entries["sample_size"] == 2
+    assert entries["publish_delay_seconds"]["p50"] == 600
+    assert 890 < entries["publish_delay_seconds"]["p99"] <= 900
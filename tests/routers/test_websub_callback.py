@@ -0,0 +1,119 @@
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+from sqlmodel import Session
+from datetime import datetime, timezone
+
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.websub_subscription import WebSubSubscription
+from feedreader3.settings import get_settings
+
+TOPIC_URL = "http://example.com/feed.xml"
+
+
+def create_subscription(session: Session) -> int:
+    feed_source = FeedSource(name="feed", feed_url=TOPIC_URL)
+    session.add(feed_source)
+    session.commit()
+    assert feed_source.id is not None
+    session.add(
+        WebSubSubscription(
+            feed_source_id=feed_source.id,
+            hub_url="http://hub.example.com/",
+            topic_url=TOPIC_URL,
+            secret="secret",
+            state="pending",
+            requested_at=datetime.now(timezone.utc),
+        )
+    )
+    session.commit()
+    return feed_source.id
+
+
+def test_verify_websub_intent_unknown_topic(
+    session: Session, client: TestClient
+) -> None:
+    feed_source_id = create_subscription(session)
+
+    response = client.get(
+        f"/websub/callback/{feed_source_id}",
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": "http://example.com/other.xml",
+            "hub.challenge": "challenge",
+        },
+    )
+
+    assert response.status_code == 404
+
+
+def test_verify_websub_intent_default_lease(
+    session: Session, client: TestClient
+) -> None:
+    feed_source_id = create_subscription(session)
+
+    response = client.get(
+        f"/websub/callback/{feed_source_id}",
+        params={
+            "hub.mode": "subscribe",
+            "hub.topic": TOPIC_URL,
+            "hub.challenge": "challenge",
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.text == "challenge"
+    subscription = session.get(WebSubSubscription, feed_source_id)
+    assert subscription is not None
+    assert subscription.state == "active"
+    assert subscription.lease_expires_at is not None
+    lease = subscription.lease_expires_at - datetime.now(timezone.utc)
+    assert abs(lease.total_seconds() - get_settings().websub_lease_seconds) < 60
+
+
+def test_verify_websub_intent_denied(session: Session, client: TestClient) -> None:
+    feed_source_id = create_subscription(session)
+
+    response = client.get(
+        f"/websub/callback/{feed_source_id}",
+        params={"hub.mode": "denied", "hub.topic": TOPIC_URL},
+    )
+
+    assert response.status_code == 200
+    subscription = session.get(WebSubSubscription, feed_source_id)
+    assert subscription is not None
+    assert subscription.state == "denied"
+
+
+def test_verify_websub_intent_unsubscribe(session: Session, client: TestClient) -> None:
+    feed_source_id = create_subscription(session)
+    params = {
+        "hub.mode": "unsubscribe",
+        "hub.topic": TOPIC_URL,
+        "hub.challenge": "challenge",
+    }
+
+    response = client.get(f"/websub/callback/{feed_source_id}", params=params)
+    assert response.status_code == 404
+
+    response = client.get(f"/websub/callback/{feed_source_id + 1}", params=params)
+    assert response.status_code == 200
+    assert response.text == "challenge"
+
+
+def test_receive_websub_delivery_unknown(client: TestClient) -> None:
+    response = client.post("/websub/callback/1", content=b"<feed/>")
+
+    assert response.status_code == 410
+
+
+def test_receive_websub_delivery_too_large(
+    session: Session, client: TestClient, monkeypatch: MonkeyPatch
+) -> None:
+    feed_source_id = create_subscription(session)
+    monkeypatch.setattr(get_settings(), "fetch_max_bytes", 16)
+
+    response = client.post(
+        f"/websub/callback/{feed_source_id}", content=b"<feed>" + b" " * 32 + b"</feed>"
+    )
+
+    assert response.status_code == 413
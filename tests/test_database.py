@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import QueuePool
+
+from feedreader3.database import get_engine, warm_up_engine
+
+
+def test_warm_up_engine(client: TestClient) -> None:
+    # The app's lifespan has initialized the engine
+    engine = get_engine()
+    engine.dispose()
+    pool = engine.pool
+    assert isinstance(pool, QueuePool)
+
+    warm_up_engine(3)
+
+    assert pool.checkedin() == 3
+    assert pool.checkedout() == 0
@@ -0,0 +1,185 @@
+from typing import Any, Callable, Iterator
+from lxml import etree
+import feedparser
+import pytest
+import re
+
+from feedreader3.fast_entry_parser import UnsupportedEntry, parse_simple_entry
+from feedreader3.feed_parser import ENTRY_TAGS, FastEntryParser, iter_feed_entries
+
+FIXTURES = [
+    "tests/jobs/atom10.xml",
+    "tests/jobs/atom11.xml",
+    "tests/jobs/atom12.xml",
+    "tests/jobs/atom13.xml",
+    "tests/jobs/atom14.xml",
+]
+XHTML_CONTENT_PATTERN = re.compile(
+    rb'<content type="xhtml"[^>]*>\s*'
+    rb'<div xmlns="http://www.w3.org/1999/xhtml">(.*?)</div>\s*</content>',
+    re.DOTALL,
+)
+
+RSS_HEAD = (
+    b'<?xml version="1.0" encoding="utf-8"?>'
+    b'<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/"'
+    b' xmlns:dc="http://purl.org/dc/elements/1.1/"'
+    b' xmlns:media="http://search.yahoo.com/mrss/"'
+    b' xmlns:slash="http://purl.org/rss/1.0/modules/slash/">'
+    b"<channel><title>Sample</title><link>http://example.org/</link>"
+)
+RSS_TAIL = b"</channel></rss>"
+RSS_ITEMS = {
+    "plain": b"<item><title>Plain</title>"
+    b"<link>http://example.org/a?x=1&amp;y=2</link>"
+    b"<guid>http://example.org/a</guid>"
+    b"<pubDate>Wed, 09 Nov 2005 11:56:34 GMT</pubDate>"
+    b"<description>Just text</description></item>",
+    "markup": b"<item><title>Fish &amp; Chips &lt;b&gt;bold&lt;/b&gt;</title>"
+    b'<link>/relative</link><guid isPermaLink="false">abc-1</guid>'
+    b'<description><![CDATA[<p>Hi <a href="/x">x</a><script>bad()</script>'
+    b'<img src="i.png"></p>]]></description>'
+    b'<content:encoded><![CDATA[<div style="color:red" onclick="x()">'
+    b"Body &amp; more</div>]]></content:encoded>"
+    b"<dc:creator>me</dc:creator><category>c</category></item>",
+    "guid_as_link": b"<item><title>No link</title><guid>/guid-link</guid>"
+    b"<content:encoded>&lt;p&gt;only content&lt;/p&gt;</content:encoded>"
+    b"<pubDate>bogus</pubDate></item>",
+    "no_guid": b"<item><title>No guid</title><link>http://example.org/b</link>"
+    b"<comments>http://example.org/b#c</comments>"
+    b'<enclosure url="http://example.org/x.mp3" length="1" type="audio/mpeg"/>'
+    b"<slash:comments>3</slash:comments></item>",
+    "whitespace": b"<item><title>  Spaces\n and caf\xc3\xa9 </title>"
+    b"<link>  http://example.org/e  </link>"
+    b"<description>a &lt; b &amp; c</description></item>",
+    "cp1252": b"<item><title>&#x80; \xc2\x93quoted\xc2\x94</title>"
+    b"<link>http://example.org/f</link></item>",
+    "description_after_content": b"<item><title>Order</title>"
+    b"<link>http://example.org/g</link><content:encoded>body</content:encoded>"
+    b"<description>desc</description></item>",
+    "empty_link": b"<item><title>Empty link</title><link/>"
+    b"<guid>http://example.org/h</guid></item>",
+}
+# feedparser reads these into the same fields, so the fast path steps aside
+RSS_FALLBACK_ITEMS = {
+    "dc_date": b"<item><title>Dc date</title><link>http://example.org/c</link>"
+    b"<dc:date>2020-01-01T00:00:00Z</dc:date></item>",
+    "media_title": b"<item><title>Media</title><link>http://example.org/d</link>"
+    b'<media:content url="http://example.org/y.jpg"><media:title>mt</media:title>'
+    b"</media:content></item>",
+    "repeated_title": b"<item><title>One</title><title>Two</title>"
+    b"<link>http://example.org/i</link></item>",
+}
+
+
+def escape_markup(match: re.Match[bytes]) -> bytes:
+    markup = match.group(1)
+    for char, reference in ((b"&", b"&amp;"), (b"<", b"&lt;"), (b">", b"&gt;")):
+        markup = markup.replace(char, reference)
+    return b'<content type="html">' + markup + b"</content>"
+
+
+def to_html_content(data: bytes) -> bytes:
+    return XHTML_CONTENT_PATTERN.sub(escape_markup, data)
+
+
+# Variants of the Atom fixtures that the fast path reads itself. The fixtures
+# as they are have XHTML content, which is left to feedparser.
+ATOM_VARIANTS: dict[str, Callable[[bytes], bytes]] = {
+    "html_content": to_html_content,
+    "text_content": lambda data: to_html_content(data).replace(
+        b'<content type="html">', b'<content type="text">'
+    ),
+    "no_content": lambda data: re.sub(
+        rb"<content.*?</content>", b"", data, flags=re.DOTALL
+    ),
+    "no_summary": lambda data: re.sub(
+        rb"<summary.*?</summary>", b"", to_html_content(data), flags=re.DOTALL
+    ),
+    "html_title": lambda data: to_html_content(data).replace(
+        b"<title>", b'<title type="html">&lt;b&gt;Bold&lt;/b&gt; &amp;amp; '
+    ),
+    "relative_links": lambda data: to_html_content(data)
+    .replace(b'xml:base="http://example.org/"', b"")
+    .replace(b'href="/entry', b'href="entry'),
+    "non_ascii": lambda data: to_html_content(data).replace(
+        b"entry title", "entrée ’title’".encode()
+    ),
+}
+
+
+def get_fields(entry: feedparser.util.FeedParserDict) -> dict[str, Any]:
+    contents = entry.get("content")
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "feedburner_origlink": entry.get("feedburner_origlink"),
+        "updated_parsed": entry.get("updated_parsed"),
+        "published_parsed": entry.get("published_parsed"),
+        "summary": entry.get("summary"),
+        "content": contents[0].get("value") if contents else None,
+    }
+
+
+def iter_entries(data: bytes) -> Iterator[tuple[list[etree._Element], etree._Element]]:
+    root = etree.fromstring(data)
+    for entry in root.iter(*ENTRY_TAGS):
+        yield [ancestor for ancestor in reversed(list(entry.iterancestors()))], entry
+
+
+def assert_same_as_feedparser(data: bytes, base_url: str | None) -> None:
+    expected = feedparser.parse(
+        data, response_headers={"content-location": base_url} if base_url else None
+    ).entries
+    entries = list(iter_feed_entries([data], base_url, FastEntryParser()))
+
+    assert [get_fields(entry) for entry in entries] == [
+        get_fields(entry) for entry in expected
+    ]
+
+
+@pytest.mark.parametrize("base_url", [None, "http://example.com/feed/"])
+@pytest.mark.parametrize("variant", ATOM_VARIANTS)
+@pytest.mark.parametrize("path", FIXTURES)
+def test_parse_simple_entry_atom(path: str, variant: str, base_url: str | None) -> None:
+    with open(path, "rb") as f:
+        data = ATOM_VARIANTS[variant](f.read())
+
+    for ancestors, entry in iter_entries(data):
+        parse_simple_entry(ancestors, entry, base_url)
+    assert_same_as_feedparser(data, base_url)
+
+
+# feedparser warns when updated_parsed falls back to pubDate
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("base_url", [None, "http://example.com/feed/"])
+@pytest.mark.parametrize("item", RSS_ITEMS)
+def test_parse_simple_entry_rss(item: str, base_url: str | None) -> None:
+    data = RSS_HEAD + RSS_ITEMS[item] + RSS_TAIL
+
+    for ancestors, entry in iter_entries(data):
+        parse_simple_entry(ancestors, entry, base_url)
+    assert_same_as_feedparser(data, base_url)
+
+
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("item", RSS_FALLBACK_ITEMS)
+def test_parse_simple_entry_rss_fallback(item: str) -> None:
+    data = RSS_HEAD + RSS_FALLBACK_ITEMS[item] + RSS_TAIL
+
+    for ancestors, entry in iter_entries(data):
+        with pytest.raises(UnsupportedEntry):
+            parse_simple_entry(ancestors, entry, None)
+    assert_same_as_feedparser(data, None)
+
+
+@pytest.mark.parametrize("path", FIXTURES)
+def test_parse_simple_entry_atom_xhtml_fallback(path: str) -> None:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    for ancestors, entry in iter_entries(data):
+        with pytest.raises(UnsupportedEntry):
+            parse_simple_entry(ancestors, entry, None)
+    assert_same_as_feedparser(data, None)
@@ -0,0 +1,49 @@
+from pathlib import Path
+import pytest
+
+from feedreader3.feed_archive import FeedArchive
+
+
+def test_feed_archive(tmp_path: Path) -> None:
+    archive = FeedArchive(tmp_path / "archive")
+    assert list(archive.iter_records()) == []
+
+    first = archive.add(1, "http://example.com/a.xml", b"<feed>a</feed>")
+    second = archive.add(2, "http://example.com/b.xml", b"<feed>a</feed>")
+    third = archive.add(1, "http://example.com/a.xml", b"<feed>b</feed>")
+    archive.close()
+
+    # Identical bodies are stored once
+    assert first.sha256 == second.sha256 != third.sha256
+    assert len(list((tmp_path / "archive" / "objects").glob("*/*.zst"))) == 2
+    assert archive.read(first.sha256) == b"<feed>a</feed>"
+    assert archive.read(third.sha256) == b"<feed>b</feed>"
+
+    # Records are read back in the order of the fetches, by a new instance too
+    records = list(FeedArchive(tmp_path / "archive").iter_records())
+    assert records == [first, second, third]
+    assert [record.size for record in records] == [14, 14, 14]
+
+
+def test_feed_archive_writer(tmp_path: Path) -> None:
+    archive = FeedArchive(tmp_path / "archive")
+    objects_dir = tmp_path / "archive" / "objects"
+
+    with archive.open_writer() as writer:
+        for chunk in [b"<feed>", b"a", b"</feed>"]:
+            writer.write(chunk)
+        record = writer.commit(1, "http://example.com/a.xml")
+    assert archive.read(record.sha256) == b"<feed>a</feed>"
+    assert record.size == 14
+
+    # A body that was not fully fetched is not kept
+    with pytest.raises(OSError):
+        with archive.open_writer() as writer:
+            writer.write(b"<feed>")
+            raise OSError("Connection reset")
+    archive.close()
+
+    assert [path.relative_to(objects_dir) for path in objects_dir.rglob("*.*")] == [
+        archive.get_object_path(record.sha256).relative_to(objects_dir)
+    ]
+    assert list(archive.iter_records()) == [record]
@@ -0,0 +1,246 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Any, Generator, cast
+from pytest import LogCaptureFixture, MonkeyPatch
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+import brotli
+import logging
+import httpcore
+import httpx
+import socket
+import time
+import pytest
+
+from feedreader3.feed_fetcher import (
+    DnsCachingBackend,
+    FeedFetchError,
+    FeedStream,
+    FeedTimeoutError,
+    FeedTooLargeError,
+    FetchLimits,
+    create_http_client,
+    get_http_client,
+    open_feed,
+    set_dns_cache_ttl,
+)
+from feedreader3.settings import get_settings
+
+from feedreader3.tracing import flush_tracing
+
+LIMITS = FetchLimits(max_bytes=1024, connect_timeout=1, read_timeout=1, total_timeout=5)
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    # Keeps connections open between requests
+    protocol_version = "HTTP/1.1"
+    requests: list[tuple[int, str | None]] = []
+
+    def do_GET(self) -> None:
+        FeedHandler.requests.append(
+            (self.client_address[1], self.headers["Accept-Encoding"])
+        )
+        if self.path == "/missing":
+            self.send_error(404)
+            return
+        if self.path == "/drip":
+            self.drip()
+            return
+        body = b"x" * (2048 if self.path == "/large" else 512)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        if self.path == "/brotli":
+            body = brotli.compress(body)
+            self.send_header("Content-Encoding", "br")
+        self.send_header("Content-Length", str(len(body)))
+        if self.path == "/linked":
+            self.send_header(
+                "Link",
+                '<http://hub.example.com/>; rel="hub", '
+                '<http://example.com/feed>; rel="self"',
+            )
+        self.end_headers()
+        self.wfile.write(body)
+
+    def drip(self) -> None:
+        # Well under the read timeout between bytes, and well over the total
+        # timeout for the whole body
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", "1000")
+        self.end_headers()
+        try:
+            for _ in range(1000):
+                self.wfile.write(b"x")
+                self.wfile.flush()
+                time.sleep(0.01)
+        except OSError:
+            pass
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(name="server_url")
+def server_url_fixture() -> Generator[str, None, None]:
+    FeedHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FeedHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_feed_stream_too_large() -> None:
+    stream = FeedStream(iter([b"x" * 1000, b"x" * 1000]), LIMITS)
+
+    with pytest.raises(FeedTooLargeError):
+        list(stream)
+    assert stream.fetched_bytes == 2000
+
+
+def test_open_feed_http_total_timeout(server_url: str) -> None:
+    limits = FetchLimits(
+        max_bytes=1024 * 1024, connect_timeout=1, read_timeout=1, total_timeout=0.2
+    )
+    started = time.monotonic()
+
+    with pytest.raises(FeedTimeoutError):
+        with open_feed(server_url + "/drip", limits) as stream:
+            for _ in stream:
+                pass
+
+    # Cut off at the deadline rather than after the whole body
+    assert time.monotonic() - started < 2
+
+
+def test_open_feed_local_file() -> None:
+    limits = FetchLimits(
+        max_bytes=1024 * 1024, connect_timeout=1, read_timeout=1, total_timeout=5
+    )
+    with open("tests/jobs/atom10.xml", "rb") as f:
+        data = f.read()
+
+    with open_feed("tests/jobs/atom10.xml", limits) as stream:
+        assert b"".join(stream) == data
+        assert stream.fetched_bytes == len(data)
+
+
+def test_open_feed_http(server_url: str, span_exporter: InMemorySpanExporter) -> None:
+    with open_feed(server_url + "/feed", LIMITS) as stream:
+        assert b"".join(stream) == b"x" * 512
+    assert stream.status_code == 200
+
+    # The shared client is traced
+    flush_tracing()
+    [span] = span_exporter.get_finished_spans()
+    assert span.name == "GET"
+    assert span.attributes is not None
+    assert span.attributes["http.url"] == server_url + "/feed"
+    assert span.attributes["http.status_code"] == 200
+
+
+def test_open_feed_http_content_length_too_large(server_url: str) -> None:
+    with pytest.raises(FeedTooLargeError):
+        with open_feed(server_url + "/large", LIMITS):
+            pass
+
+
+def test_open_feed_http_error_status(server_url: str) -> None:
+    with pytest.raises(FeedFetchError):
+        with open_feed(server_url + "/missing", LIMITS):
+            pass
+
+
+def test_open_feed_http_links(server_url: str) -> None:
+    with open_feed(server_url + "/linked", LIMITS) as stream:
+        assert stream.links == {
+            "hub": "http://hub.example.com/",
+            "self": "http://example.com/feed",
+        }
+
+
+def test_open_feed_http_keep_alive(server_url: str) -> None:
+    for _ in range(2):
+        with open_feed(server_url + "/feed", LIMITS) as stream:
+            assert b"".join(stream) == b"x" * 512
+
+    # Both requests on one connection
+    (port1, accept_encoding), (port2, _) = FeedHandler.requests
+    assert port1 == port2
+    assert accept_encoding == "br, gzip"
+
+
+def test_open_feed_http_brotli(server_url: str) -> None:
+    with open_feed(server_url + "/brotli", LIMITS) as stream:
+        assert b"".join(stream) == b"x" * 512
+
+
+def test_dns_caching_backend(monkeypatch: MonkeyPatch) -> None:
+    lookups: list[str] = []
+    getaddrinfo = socket.getaddrinfo
+
+    def counting_getaddrinfo(host: str, *args: Any, **kwargs: Any) -> Any:
+        # Connecting looks up the resolved address again, without the network
+        if host != "127.0.0.1":
+            lookups.append(host)
+        return getaddrinfo("127.0.0.1", *args, **kwargs)
+
+    monkeypatch.setattr(socket, "getaddrinfo", counting_getaddrinfo)
+
+    backend = DnsCachingBackend(ttl=60)
+    assert backend.resolve("feeds.example.com", 80) == ["127.0.0.1"]
+    assert backend.resolve("feeds.example.com", 80) == ["127.0.0.1"]
+    assert lookups == ["feeds.example.com"]
+
+    # Nothing listens on the port, and the failed address is forgotten
+    with socket.socket() as unused:
+        unused.bind(("127.0.0.1", 0))
+        port = unused.getsockname()[1]
+    with pytest.raises(httpcore.ConnectError):
+        backend.connect_tcp("feeds.example.com", port, timeout=1)
+    assert backend.resolve("feeds.example.com", port) == ["127.0.0.1"]
+    assert lookups == ["feeds.example.com"] * 3
+
+    expired = DnsCachingBackend(ttl=0)
+    expired.resolve("feeds.example.com", 80)
+    expired.resolve("feeds.example.com", 80)
+    assert len(lookups) == 5
+
+
+def test_create_http_client_without_network_backend(
+    monkeypatch: MonkeyPatch, caplog: LogCaptureFixture
+) -> None:
+    # Another httpcore may not have the private attribute that is replaced
+    init = httpcore.ConnectionPool.__init__
+
+    def init_without_network_backend(
+        self: httpcore.ConnectionPool, *args: Any, **kwargs: Any
+    ) -> None:
+        init(self, *args, **kwargs)
+        del self._network_backend
+
+    monkeypatch.setattr(
+        httpcore.ConnectionPool, "__init__", init_without_network_backend
+    )
+
+    with caplog.at_level(logging.WARNING, logger="feedreader3.feed_fetcher"):
+        create_http_client(http2=False, dns_cache_ttl=60).close()
+
+    assert any(
+        r.message.startswith("Connection pool has no network backend")
+        for r in caplog.records
+    )
+
+
+def test_set_dns_cache_ttl() -> None:
+    settings = get_settings()
+    transport = cast(httpx.HTTPTransport, get_http_client()._transport)
+    backend = cast(DnsCachingBackend, transport._pool._network_backend)
+
+    set_dns_cache_ttl(1)
+    try:
+        assert backend.ttl == 1
+    finally:
+        set_dns_cache_ttl(settings.fetch_dns_cache_ttl)
@@ -0,0 +1,272 @@
+from typing import Any, Iterator
+from pytest import MonkeyPatch
+import feedparser
+import tracemalloc
+import pytest
+
+from feedreader3 import feed_parser
+from feedreader3.feed_parser import (
+    FastEntryParser,
+    FeedparserEntryParser,
+    create_entry_parser,
+    iter_feed_entries,
+)
+
+RSS20 = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:content="http://purl.org/rss/1.0/modules/content/">
+  <channel>
+    <title>Sample Feed</title>
+    <link>http://example.org/</link>
+    <item>
+      <title>First &amp; newest</title>
+      <link>http://example.org/entry/2</link>
+      <guid>http://example.org/entry/2</guid>
+      <pubDate>Wed, 09 Nov 2005 11:56:34 GMT</pubDate>
+      <description>&lt;p&gt;Summary&lt;/p&gt;</description>
+      <content:encoded><![CDATA[<p>Body <script>alert(1)</script></p>]]></content:encoded>
+    </item>
+    <item>
+      <title>Second</title>
+      <link>/entry/1</link>
+      <pubDate>Tue, 08 Nov 2005 11:56:34 GMT</pubDate>
+    </item>
+  </channel>
+</rss>
+"""
+
+
+def get_fields(entry: feedparser.util.FeedParserDict) -> dict[str, Any]:
+    # What store_feed_entries reads
+    contents = entry.get("content")
+    return {
+        "id": entry.get("id"),
+        "title": entry.get("title"),
+        "link": entry.get("link"),
+        "feedburner_origlink": entry.get("feedburner_origlink"),
+        "updated_parsed": entry.get("updated_parsed"),
+        "summary": entry.get("summary"),
+        "content": contents[0].get("value") if contents else None,
+    }
+
+
+def read_chunks(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    for start in range(0, len(data), chunk_size):
+        yield data[start : start + chunk_size]
+
+
+@pytest.mark.parametrize("backend", ["feedparser", "fast"])
+@pytest.mark.parametrize(
+    "path",
+    [
+        "tests/jobs/atom10.xml",
+        "tests/jobs/atom11.xml",
+        "tests/jobs/atom12.xml",
+        "tests/jobs/atom13.xml",
+        "tests/jobs/atom14.xml",
+    ],
+)
+def test_iter_feed_entries_same_as_feedparser(path: str, backend: str) -> None:
+    with open(path, "rb") as f:
+        data = f.read()
+
+    # Small chunks split tags and entries across reads
+    entries = list(
+        iter_feed_entries(
+            read_chunks(data, 7), entry_parser=create_entry_parser(backend)
+        )
+    )
+
+    assert [get_fields(entry) for entry in entries] == [
+        get_fields(entry) for entry in feedparser.parse(data).entries
+    ]
+
+
+# feedparser warns when updated_parsed falls back to pubDate
+@pytest.mark.filterwarnings("ignore::DeprecationWarning")
+@pytest.mark.parametrize("backend", ["feedparser", "fast"])
+def test_iter_feed_entries_rss(backend: str) -> None:
+    entries = list(
+        iter_feed_entries(
+            read_chunks(RSS20, 16),
+            base_url="http://example.org/feed",
+            entry_parser=create_entry_parser(backend),
+        )
+    )
+    expected = feedparser.parse(
+        RSS20, response_headers={"content-location": "http://example.org/feed"}
+    ).entries
+
+    assert len(entries) == 2
+    assert [get_fields(entry) for entry in entries] == [
+        get_fields(entry) for entry in expected
+    ]
+    assert entries[0].title == "First & newest"
+    assert "script" not in entries[0].content[0].value
+
+
+def test_iter_feed_entries_yield_before_end_of_document() -> None:
+    def read() -> Iterator[bytes]:
+        end = RSS20.index(b"</item>") + len(b"</item>")
+        yield RSS20[:end]
+        raise AssertionError("The first entry should have been yielded already")
+
+    entries = iter_feed_entries(read())
+
+    assert next(entries).title == "First & newest"
+
+
+def test_iter_feed_entries_fall_back_to_feedparser() -> None:
+    # A bare "&" is not well-formed XML, but feedparser's lenient parser
+    # still reads it
+    data = RSS20.replace(b"<title>Second</title>", b"<title>Fish & Chips</title>")
+
+    entries = list(iter_feed_entries(read_chunks(data, 16)))
+
+    assert [entry.title for entry in entries] == ["First & newest", "Fish & Chips"]
+
+
+def test_iter_feed_entries_fall_back_to_feedparser_spooled(
+    monkeypatch: MonkeyPatch,
+) -> None:
+    # The document is read back from the temporary file it was spooled to
+    monkeypatch.setattr(feed_parser, "RAW_SPOOL_BYTES", 64)
+    data = RSS20.replace(b"<title>Second</title>", b"<title>Fish & Chips</title>")
+
+    entries = list(iter_feed_entries(read_chunks(data, 16)))
+
+    assert [entry.title for entry in entries] == ["First & newest", "Fish & Chips"]
+
+
+def test_iter_feed_entries_memory_is_bounded() -> None:
+    def read() -> Iterator[bytes]:
+        yield b'<?xml version="1.0" encoding="utf-8"?>'
+        yield b'<feed xmlns="http://www.w3.org/2005/Atom"><title>Feed</title>'
+        for i in range(5000):
+            yield (
+                f"<entry><id>urn:entry:{i}</id><title>Entry {i}</title>"
+                f"<content>{'x' * 4000}</content></entry>"
+            ).encode()
+        yield b"</feed>"
+
+    tracemalloc.start()
+    try:
+        entry_count = sum(1 for _ in iter_feed_entries(read()))
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # About 20 MiB of feed, of which only the spooled part is kept in memory
+    assert entry_count == 5000
+    assert peak_bytes < 4 * 1024 * 1024, peak_bytes
+
+
+def test_create_entry_parser_fast_unavailable(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        feed_parser,
+        "_fast_entry_parser_error",
+        ImportError("cannot import name '_sanitize_html'"),
+    )
+
+    entry_parser = create_entry_parser("fast")
+
+    assert isinstance(entry_parser, FeedparserEntryParser)
+    entries = list(iter_feed_entries([RSS20], entry_parser=entry_parser))
+    assert [entry.title for entry in entries] == ["First & newest", "Second"]
+
+
+def test_check_fast_entry_parser(monkeypatch: MonkeyPatch) -> None:
+    feed_parser.check_fast_entry_parser.cache_clear()
+    assert feed_parser.check_fast_entry_parser() is None
+    assert isinstance(create_entry_parser("fast"), FastEntryParser)
+
+    # As if a feedparser release changed what one of its internals returns
+    parse_simple_entry = feed_parser.parse_simple_entry
+
+    def parse_changed_entry(*args: Any) -> feedparser.util.FeedParserDict:
+        parsed_entry = parse_simple_entry(*args)
+        parsed_entry["title"] = parsed_entry["title"].upper()
+        return parsed_entry
+
+    monkeypatch.setattr(feed_parser, "parse_simple_entry", parse_changed_entry)
+    feed_parser.check_fast_entry_parser.cache_clear()
+    try:
+        assert feed_parser.check_fast_entry_parser() is not None
+        assert isinstance(create_entry_parser("fast"), FeedparserEntryParser)
+    finally:
+        feed_parser.check_fast_entry_parser.cache_clear()
+
+
+def test_create_entry_parser_unknown_backend() -> None:
+    with pytest.raises(ValueError):
+        create_entry_parser("unknown")
+
+
+ATOM_WITH_HUB = b"""<?xml version="1.0" encoding="utf-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Sample Feed</title>
+  <link rel="hub" href="http://hub.example.com/"/>
+  <link rel="self" href="/feed.xml"/>
+  <entry>
+    <title>Entry</title>
+    <link rel="self" href="http://example.org/entry/1.xml"/>
+    <link href="http://example.org/entry/1"/>
+    <id>http://example.org/entry/1</id>
+  </entry>
+</feed>
+"""
+RSS_WITH_HUB = b"""<?xml version="1.0" encoding="utf-8"?>
+<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom">
+  <channel>
+    <title>Sample Feed</title>
+    <atom:link rel="hub" href="http://hub.example.com/"/>
+    <atom:link rel="self" href="http://example.org/feed.xml"/>
+    <item><title>Entry</title><link>http://example.org/entry/1</link></item>
+  </channel>
+</rss>
+"""
+
+
+@pytest.mark.parametrize("data", [ATOM_WITH_HUB, RSS_WITH_HUB])
+def test_iter_feed_entries_feed_links(data: bytes) -> None:
+    feed_links: dict[str, str] = {}
+
+    entries = list(
+        iter_feed_entries(
+            read_chunks(data, 64), "http://example.org/", None, feed_links
+        )
+    )
+
+    assert len(entries) == 1
+    assert feed_links == {
+        "hub": "http://hub.example.com/",
+        "self": "http://example.org/feed.xml",
+    }
+
+
+def test_iter_feed_entries_feed_links_keep_known() -> None:
+    # Links from the HTTP Link header win over the document
+    feed_links = {"hub": "http://other-hub.example.com/"}
+
+    list(iter_feed_entries([ATOM_WITH_HUB], "http://example.org/", None, feed_links))
+
+    assert feed_links["hub"] == "http://other-hub.example.com/"
+
+
+def test_iter_feed_entries_feed_links_fallback() -> None:
+    feed_links: dict[str, str] = {}
+
+    # Not well-formed, so feedparser reads the whole document
+    entries = list(
+        iter_feed_entries(
+            [ATOM_WITH_HUB.replace(b"</title>\n  <link", b"</title>&nbsp;<link", 1)],
+            "http://example.org/",
+            None,
+            feed_links,
+        )
+    )
+
+    assert len(entries) == 1
+    assert feed_links == {
+        "hub": "http://hub.example.com/",
+        "self": "http://example.org/feed.xml",
+    }
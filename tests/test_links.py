@@ -0,0 +1,47 @@
+from feedreader3.links import canonicalize_link, hash_link
+
+
+def test_canonicalize_link_strip_tracking_query_params() -> None:
+    link = "https://example.com/a?utm_source=rss&id=1&fbclid=x&utm_medium=feed"
+
+    assert canonicalize_link(link) == "https://example.com/a?id=1"
+
+
+def test_canonicalize_link_sort_query_params() -> None:
+    assert canonicalize_link("https://example.com/a?b=2&a=1") == (
+        "https://example.com/a?a=1&b=2"
+    )
+
+
+def test_canonicalize_link_normalize_scheme_and_host() -> None:
+    links = [
+        "http://example.com/a",
+        "https://example.com/a",
+        "HTTPS://WWW.Example.COM/a",
+        "https://example.com:443/a",
+        "http://example.com:80/a#comments",
+    ]
+
+    assert {canonicalize_link(link) for link in links} == {"https://example.com/a"}
+
+
+def test_canonicalize_link_keep_non_default_port() -> None:
+    assert canonicalize_link("http://example.com:8080/a") == (
+        "https://example.com:8080/a"
+    )
+
+
+def test_canonicalize_link_empty_path() -> None:
+    assert canonicalize_link("https://example.com") == "https://example.com/"
+
+
+def test_canonicalize_link_relative() -> None:
+    assert canonicalize_link(" /entry/3 ") == "/entry/3"
+
+
+def test_hash_link_fits_bigint() -> None:
+    link_hash = hash_link("https://example.com/a")
+
+    assert link_hash == hash_link("https://example.com/a")
+    assert link_hash != hash_link("https://example.com/b")
+    assert -(2**63) <= link_hash < 2**63
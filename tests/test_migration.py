@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+from pytest import MonkeyPatch
+from sqlmodel import SQLModel
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+
+from feedreader3 import migration
+from feedreader3.database import get_engine
+from feedreader3.migration import check_schema_version, upgrade_schema
+
+
+def test_migrations_match_models(client: TestClient) -> None:
+    # A model change without a matching revision shows up here
+    with get_engine().connect() as conn:
+        diff = compare_metadata(MigrationContext.configure(conn), SQLModel.metadata)
+
+    assert diff == []
+
+
+def test_upgrade_schema_up_to_date(client: TestClient) -> None:
+    upgrade_schema(get_engine())
+
+    check_schema_version(get_engine())
+
+
+def test_check_schema_version_mismatch(
+    client: TestClient, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(migration, "get_head_revision", lambda: "9999")
+
+    with pytest.raises(RuntimeError) as excinfo:
+        check_schema_version(get_engine())
+
+    assert "expected 9999" in str(excinfo.value)
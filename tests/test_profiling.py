@@ -0,0 +1,143 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pathlib import Path
+from pytest import MonkeyPatch, LogCaptureFixture
+import asyncio
+import httpx
+import logging
+
+from feedreader3 import profiling
+from feedreader3.profiling import (
+    RequestProfilingMiddleware,
+    arm_fetch_profiling,
+    fetch_profiling,
+    get_remaining_fetch_runs,
+    get_rss_bytes,
+    memory_profiling,
+    start_memory_profiling,
+    stop_memory_profiling,
+)
+from feedreader3.settings import get_settings
+
+
+def test_fetch_profiling(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+    monkeypatch.setattr(profiling, "_remaining_fetch_runs", 0)
+
+    with fetch_profiling():
+        pass
+    assert list(tmp_path.iterdir()) == []
+
+    arm_fetch_profiling(2)
+    for _ in range(3):
+        with fetch_profiling():
+            sum(range(1000))
+
+    assert get_remaining_fetch_runs() == 0
+    assert len(list(tmp_path.glob("process-fetch-*.prof"))) == 2
+
+
+def test_get_rss_bytes() -> None:
+    before = get_rss_bytes()
+    assert before is not None
+    kept = b"x" * (64 * 1024 * 1024)
+    after = get_rss_bytes()
+    assert after is not None
+
+    # The current size, which also goes down again unlike the peak
+    assert after - before >= 60 * 1024 * 1024
+    assert len(kept) > 0
+
+
+def test_memory_profiling(caplog: LogCaptureFixture) -> None:
+    caplog.set_level(logging.INFO)
+    with memory_profiling("fetch_feeds_job:0"):
+        pass
+    assert "Memory profile" not in caplog.messages
+
+    start_memory_profiling(3)
+    try:
+        with memory_profiling("fetch_feeds_job:0"):
+            kept = [bytes(1000) for _ in range(100)]
+    finally:
+        stop_memory_profiling()
+
+    [record] = [r for r in caplog.records if r.message == "Memory profile"]
+    assert getattr(record, "job_id") == "fetch_feeds_job:0"
+    assert getattr(record, "traced_peak_bytes") >= 100 * 1000
+    assert getattr(record, "rss_bytes") > 0
+    assert isinstance(getattr(record, "rss_diff_bytes"), int)
+    top_sites = getattr(record, "top_sites")
+    assert len(top_sites) == 3
+    assert __file__ in top_sites[0]["site"]
+    assert top_sites[0]["size_diff_bytes"] >= 100 * 1000
+    assert len(kept) == 100
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root() -> dict[str, str]:
+        return {"message": "ok"}
+
+    @app.get("/slow")
+    async def slow() -> dict[str, str]:
+        await asyncio.sleep(0.1)
+        return {"message": "ok"}
+
+    app.add_middleware(RequestProfilingMiddleware)
+    return app
+
+
+def test_request_profiling(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "profile_allowed_clients", ["testclient"])
+    client = TestClient(create_app())
+
+    response = client.get("/")
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response.headers
+
+    response = client.get("/", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert response.json() == {"message": "ok"}
+    assert (tmp_path / response.headers["X-Profile-File"]).exists()
+    # Covers the whole process, not only this request
+    assert response.headers["X-Profile-File"].startswith("process-request-")
+
+
+def test_request_profiling_not_allowed(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "profile_allowed_clients", ["127.0.0.1"])
+    client = TestClient(create_app())
+
+    response = client.get("/", headers={"X-Profile": "1"})
+
+    assert response.status_code == 200
+    assert "X-Profile-File" not in response.headers
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_request_profiling_concurrent(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setattr(get_settings(), "profile_dir", str(tmp_path))
+    monkeypatch.setattr(get_settings(), "profile_allowed_clients", ["127.0.0.1"])
+    transport = httpx.ASGITransport(app=create_app())
+
+    async def run() -> list[httpx.Response]:
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://testserver"
+        ) as client:
+            return await asyncio.gather(
+                *(client.get("/slow", headers={"X-Profile": "1"}) for _ in range(3))
+            )
+
+    responses = asyncio.run(run())
+
+    # The requests that find the profiler busy are served without it
+    assert [response.status_code for response in responses] == [200] * 3
+    profiled = [r for r in responses if "X-Profile-File" in r.headers]
+    assert len(profiled) == 1
+    assert len(list(tmp_path.iterdir())) == 1
@@ -0,0 +1,117 @@
+from pytest import MonkeyPatch, LogCaptureFixture
+from sqlalchemy import event, text
+from sqlalchemy.exc import ProgrammingError
+from sqlmodel import Session, select
+import logging
+import pytest
+
+from feedreader3 import query_stats
+from feedreader3.database import get_engine
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.query_stats import (
+    configure_query_stats,
+    get_fingerprint,
+    get_query_stats,
+    is_explainable,
+    reset_query_stats,
+)
+from feedreader3.settings import get_settings
+
+
+def test_get_fingerprint() -> None:
+    assert (
+        get_fingerprint(
+            "SELECT feedentry.id \n  FROM feedentry\n"
+            "WHERE feedentry.id IN (%(id_1_1)s, %(id_1_2)s, %(id_1_3)s)"
+            " LIMIT %(param_1)s"
+        )
+        == "SELECT feedentry.id FROM feedentry WHERE feedentry.id IN (?, ...) LIMIT ?"
+    )
+    assert (
+        get_fingerprint("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s), (%s, %s)")
+        == "INSERT INTO t (a, b) VALUES (?, ...), ..."
+    )
+
+
+def test_is_explainable() -> None:
+    assert is_explainable("SELECT feedentry.updated_at FROM feedentry")
+    assert is_explainable("WITH t AS (SELECT 1) SELECT * FROM t")
+    assert not is_explainable("SELECT id FROM refreshrequest FOR UPDATE SKIP LOCKED")
+    assert not is_explainable("WITH d AS (DELETE FROM t RETURNING id) SELECT * FROM d")
+    assert not is_explainable("UPDATE t SET a = 1")
+
+
+def test_query_stats(session: Session, collect_query_stats: None) -> None:
+    reset_query_stats()
+    for name in ["a", "b", "c"]:
+        session.exec(select(FeedSource).where(FeedSource.name == name)).all()
+
+    [stats] = [
+        stats
+        for stats in get_query_stats()
+        if stats["statement"].startswith("SELECT feedsource.name")
+    ]
+    assert stats["count"] == 3
+    assert stats["max_ms"] >= stats["mean_ms"] > 0
+    assert sum(stats["histogram"].values()) == 3
+
+
+def test_query_stats_failed_statement(session: Session) -> None:
+    connection = session.connection()
+    with pytest.raises(ProgrammingError):
+        connection.execute(text("SELECT * FROM missing_table"))
+
+    assert connection.info["query_start"] == []
+    session.rollback()
+
+
+def test_slow_query_explain(
+    session: Session, monkeypatch: MonkeyPatch, caplog: LogCaptureFixture
+) -> None:
+    caplog.set_level(logging.INFO)
+    monkeypatch.setattr(query_stats, "_slow_query_ms", 1e-9)
+    monkeypatch.setattr(query_stats, "_explain_sample_rate", 1.0)
+
+    session.exec(select(FeedSource).where(FeedSource.name == "slow")).all()
+    session.add(FeedSource(name="after", feed_url="http://example.com/"))
+    session.commit()
+
+    slow_records = [r for r in caplog.records if r.message == "Slow query"]
+    assert "'slow'" in getattr(slow_records[0], "parameters")
+    [plan_record] = [r for r in caplog.records if r.message == "Query plan"]
+    assert getattr(plan_record, "statement").startswith("SELECT feedsource.name")
+    assert "Scan" in getattr(plan_record, "plan")
+    # The transaction went on after the EXPLAIN
+    assert session.exec(select(FeedSource.name)).all() == ["after"]
+
+
+def test_slow_query_explain_does_not_run_statement(
+    session: Session, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setattr(query_stats, "_slow_query_ms", 1e-9)
+    monkeypatch.setattr(query_stats, "_explain_sample_rate", 1.0)
+
+    session.execute(text("CREATE TEMPORARY SEQUENCE explained"))
+    assert session.execute(text("SELECT nextval('explained')")).one() == (1,)
+    assert session.execute(text("SELECT nextval('explained')")).one() == (2,)
+    session.rollback()
+
+
+def test_configure_query_stats_disabled(session: Session) -> None:
+    engine = get_engine()
+    settings = get_settings()
+    configure_query_stats(engine, 0, 1.0, False)
+    try:
+        assert not event.contains(
+            engine, "after_cursor_execute", query_stats.after_cursor_execute
+        )
+    finally:
+        configure_query_stats(
+            engine,
+            settings.database_slow_query_ms,
+            settings.database_explain_sample_rate,
+            settings.debug_queries,
+        )
+    assert event.contains(
+        engine, "after_cursor_execute", query_stats.after_cursor_execute
+    )
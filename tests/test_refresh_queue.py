@@ -0,0 +1,75 @@
+from sqlmodel import Session, select
+from datetime import datetime, timezone, timedelta
+
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.models.refresh_request import RefreshRequest
+from feedreader3.refresh_queue import (
+    complete_refresh_request,
+    enqueue_refresh,
+    get_next_refresh_request,
+)
+
+
+def create_feed_sources(session: Session, count: int) -> list[int]:
+    feed_sources = [
+        FeedSource(name=f"feed{i}", feed_url=f"http://example.com/feed{i}.xml")
+        for i in range(count)
+    ]
+    session.add_all(feed_sources)
+    session.commit()
+    return [feed_source.id for feed_source in feed_sources if feed_source.id]
+
+
+def test_enqueue_refresh_coalesce(session: Session) -> None:
+    [feed_source_id] = create_feed_sources(session, 1)
+
+    first = enqueue_refresh(session, feed_source_id, 10)
+    requested_at = first.requested_at
+    enqueue_refresh(session, feed_source_id, 50)
+    last = enqueue_refresh(session, feed_source_id, 20)
+
+    assert last.priority == 50
+    assert last.requested_at == requested_at
+    assert len(session.exec(select(RefreshRequest)).all()) == 1
+
+
+def test_get_next_refresh_request_order(session: Session) -> None:
+    ids = create_feed_sources(session, 3)
+    now = datetime.now(timezone.utc)
+    session.add(RefreshRequest(feed_source_id=ids[0], priority=10, requested_at=now))
+    session.add(
+        RefreshRequest(
+            feed_source_id=ids[1], priority=50, requested_at=now - timedelta(hours=1)
+        )
+    )
+    session.add(
+        RefreshRequest(
+            feed_source_id=ids[2], priority=50, requested_at=now - timedelta(hours=2)
+        )
+    )
+    session.commit()
+
+    skipped_ids: list[int] = []
+    while (
+        feed_source_id := get_next_refresh_request(session, skipped_ids)
+    ) is not None:
+        skipped_ids.append(feed_source_id)
+
+    assert skipped_ids == [ids[2], ids[1], ids[0]]
+    # Left in the queue until they are completed
+    assert len(session.exec(select(RefreshRequest)).all()) == 3
+
+
+def test_complete_refresh_request(session: Session) -> None:
+    ids = create_feed_sources(session, 2)
+    enqueue_refresh(session, ids[0], 50)
+    enqueue_refresh(session, ids[1], 10)
+
+    complete_refresh_request(session, ids[0])
+    # Kept when the fetch rolls back
+    session.rollback()
+    assert get_next_refresh_request(session) == ids[0]
+
+    complete_refresh_request(session, ids[0])
+    session.commit()
+    assert get_next_refresh_request(session) == ids[1]
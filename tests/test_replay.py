@@ -0,0 +1,59 @@
+from collections.abc import Generator
+from pathlib import Path
+from sqlmodel import Session, select, text
+import pytest
+
+from feedreader3.feed_archive import (
+    FeedArchive,
+    initialize_feed_archive,
+    finalize_feed_archive,
+    get_feed_archive,
+)
+from feedreader3.feed_parser import create_entry_parser
+from feedreader3.jobs.fetch_feeds_job import fetch_feeds
+from feedreader3.models.feed_entry import FeedEntry
+from feedreader3.models.feed_source import FeedSource
+from feedreader3.replay import replay_archive
+from feedreader3.settings import get_settings
+
+
+@pytest.fixture(name="archive")
+def archive_fixture(tmp_path: Path) -> Generator[FeedArchive, None, None]:
+    initialize_feed_archive(str(tmp_path))
+    archive = get_feed_archive()
+    assert archive is not None
+    yield archive
+    finalize_feed_archive()
+
+
+def get_entry_ids(session: Session) -> list[str]:
+    return sorted(session.exec(select(FeedEntry.entry_id)).all())
+
+
+def test_replay_archive(session: Session, archive: FeedArchive) -> None:
+    feed_url = "tests/jobs/atom10.xml"
+    session.add(FeedSource(name="feed", feed_url=feed_url))
+    session.commit()
+    fetch_feeds(session)
+    fetch_feeds(session)
+    entry_ids = get_entry_ids(session)
+
+    records = list(archive.iter_records())
+    assert [record.feed_url for record in records] == [feed_url, feed_url]
+    assert archive.read(records[0].sha256) == Path(feed_url).read_bytes()
+
+    # Into a database without the source
+    session.execute(text("TRUNCATE TABLE feedsource CASCADE"))
+    session.commit()
+    entry_parser = create_entry_parser(get_settings().fetch_parser_backend)
+    counts = replay_archive(session, archive, entry_parser)
+    assert (counts.records, counts.skipped_records) == (0, 2)
+
+    counts = replay_archive(session, archive, entry_parser, create_sources=True)
+    assert (counts.records, counts.skipped_records) == (2, 0)
+    assert counts.replayed_bytes == 2 * records[0].size
+    assert (counts.entries.new, counts.entries.unchanged) == (1, 1)
+    assert get_entry_ids(session) == entry_ids
+
+    counts = replay_archive(session, archive, entry_parser, limit=1)
+    assert (counts.records, counts.entries.unchanged) == (1, 1)
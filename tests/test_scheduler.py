@@ -1,37 +1,156 @@
 import pytest
+from pytest import LogCaptureFixture
 from typing import Generator
-from apscheduler.schedulers.blocking import BlockingScheduler
+from apscheduler.events import (
+    EVENT_JOB_MAX_INSTANCES,
+    EVENT_JOB_MISSED,
+    JobExecutionEvent,
+    JobSubmissionEvent,
+)
+from apscheduler.job import Job
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-from datetime import timezone
+from apscheduler.triggers.interval import IntervalTrigger
+from datetime import datetime, timezone
+import asyncio
+import logging
 
+import feedreader3.scheduler
+from feedreader3.heartbeat import get_skipped_runs
 from feedreader3.scheduler import (
     initialize_scheduler,
     get_scheduler,
+    record_skipped_run,
+    run_scheduler,
+    schedule_jobs,
 )
 
 CRONTAB_EXPR = "*/10 * * * *"
 MISFIRE_GRACE_TIME = 30
+FETCH_SHARDS = 3
+MAINTENANCE_INTERVAL_SECONDS = 60
+REFRESH_INTERVAL_SECONDS = 5
+PURGE_INTERVAL_SECONDS = 60
 
 
 @pytest.fixture(name="scheduler")
-def scheduler_fixture() -> Generator[BlockingScheduler, None, None]:
-    initialize_scheduler(CRONTAB_EXPR, MISFIRE_GRACE_TIME)
+def scheduler_fixture() -> Generator[AsyncIOScheduler, None, None]:
+    initialize_scheduler(
+        CRONTAB_EXPR,
+        MISFIRE_GRACE_TIME,
+        FETCH_SHARDS,
+        MAINTENANCE_INTERVAL_SECONDS,
+        REFRESH_INTERVAL_SECONDS,
+        PURGE_INTERVAL_SECONDS,
+    )
     yield get_scheduler()
 
 
-def test_fetch_job_scheduler_configuration(scheduler: BlockingScheduler) -> None:
-    jobs = scheduler.get_jobs()
+def test_fetch_job_scheduler_configuration(scheduler: AsyncIOScheduler) -> None:
+    fetch_jobs = [job for job in scheduler.get_jobs() if job.name == "fetch_feeds_job"]
 
-    fetch_job = None
-    for job in jobs:
-        if job.name == "fetch_feeds_job":
-            fetch_job = job
-            break
+    # One job per shard
+    assert [job.args for job in fetch_jobs] == [(0, 3), (1, 3), (2, 3)]
+    for fetch_job in fetch_jobs:
+        assert (
+            fetch_job.trigger.__getstate__()
+            == CronTrigger.from_crontab(CRONTAB_EXPR, timezone.utc).__getstate__()
+        )
+        assert fetch_job.misfire_grace_time == MISFIRE_GRACE_TIME
+        assert fetch_job.coalesce is True
+        assert fetch_job.max_instances == 1
 
-    assert fetch_job is not None
-    assert (
-        fetch_job.trigger.__getstate__()
-        == CronTrigger.from_crontab(CRONTAB_EXPR, timezone.utc).__getstate__()
-    )
-    assert fetch_job.misfire_grace_time == MISFIRE_GRACE_TIME
-    assert fetch_job.coalesce is True
+
+@pytest.mark.parametrize(
+    "job_id,interval",
+    [
+        ("refresh_feeds_job", REFRESH_INTERVAL_SECONDS),
+        ("process_feed_entries_job", MAINTENANCE_INTERVAL_SECONDS),
+        ("renew_websub_subscriptions_job", MAINTENANCE_INTERVAL_SECONDS),
+        ("purge_feed_sources_job", PURGE_INTERVAL_SECONDS),
+    ],
+)
+def test_interval_job_scheduler_configuration(
+    scheduler: AsyncIOScheduler, job_id: str, interval: int
+) -> None:
+    job = scheduler.get_job(job_id)
+
+    assert job is not None
+    assert isinstance(job.trigger, IntervalTrigger)
+    assert job.trigger.interval.total_seconds() == interval
+    assert job.coalesce is True
+    assert job.max_instances == 1
+
+
+def test_record_skipped_run(caplog: LogCaptureFixture) -> None:
+    run_time = datetime(2026, 10, 19, tzinfo=timezone.utc)
+    skipped_runs = get_skipped_runs().get("fetch_feeds_job:0", 0)
+
+    with caplog.at_level(logging.WARNING, logger="feedreader3.scheduler"):
+        record_skipped_run(
+            JobSubmissionEvent(
+                EVENT_JOB_MAX_INSTANCES, "fetch_feeds_job:0", "default", [run_time]
+            )
+        )
+        record_skipped_run(
+            JobExecutionEvent(
+                EVENT_JOB_MISSED, "fetch_feeds_job:0", "default", run_time
+            )
+        )
+
+    assert get_skipped_runs()["fetch_feeds_job:0"] == skipped_runs + 2
+    records = [r for r in caplog.records if r.message == "Scheduled job run skipped"]
+    assert [getattr(r, "reason") for r in records] == ["still_running", "missed"]
+    assert getattr(records[1], "skipped_runs") == skipped_runs + 2
+    assert getattr(records[1], "scheduled_run_time") == run_time.isoformat()
+
+
+def test_run_scheduler(scheduler: AsyncIOScheduler) -> None:
+    async def run() -> None:
+        stopped = asyncio.Event()
+        task = asyncio.create_task(run_scheduler(stopped))
+        await asyncio.sleep(0.1)
+        assert scheduler.running
+        stopped.set()
+        await task
+
+    asyncio.run(run())
+    assert not scheduler.running
+
+
+def test_schedule_jobs_running(scheduler: AsyncIOScheduler) -> None:
+    def get_fetch_jobs() -> list[Job]:
+        return sorted(
+            (job for job in scheduler.get_jobs() if job.name == "fetch_feeds_job"),
+            key=lambda job: job.args,
+        )
+
+    async def run() -> None:
+        stopped = asyncio.Event()
+        task = asyncio.create_task(run_scheduler(stopped))
+        await asyncio.sleep(0.1)
+
+        # Reloaded settings
+        schedule_jobs("0 * * * *", 60, 5, 120, 10, 60)
+        fetch_jobs = get_fetch_jobs()
+        assert [job.args for job in fetch_jobs] == [(i, 5) for i in range(5)]
+        assert fetch_jobs[0].misfire_grace_time == 60
+        assert (
+            fetch_jobs[0].trigger.__getstate__()
+            == CronTrigger.from_crontab("0 * * * *", timezone.utc).__getstate__()
+        )
+        refresh_job = scheduler.get_job("refresh_feeds_job")
+        assert refresh_job is not None
+        assert refresh_job.trigger.interval.total_seconds() == 10
+        # More jobs than threads: the executor is replaced by a larger one
+        assert len(scheduler.get_jobs()) == 9
+        assert feedreader3.scheduler._executor_threads == 9
+
+        schedule_jobs("0 * * * *", 60, 1, 120, 10, 60)
+        assert [job.args for job in get_fetch_jobs()] == [(0, 1)]
+
+        stopped.set()
+        await task
+
+    asyncio.run(run())
+    assert not scheduler.running
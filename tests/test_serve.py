@@ -0,0 +1,17 @@
+from pytest import MonkeyPatch
+import os
+
+from feedreader3.serve import get_web_workers
+
+
+def test_get_web_workers(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.setenv("WEB_WORKERS", "3")
+
+    assert get_web_workers() == 3
+
+
+def test_get_web_workers_default(monkeypatch: MonkeyPatch) -> None:
+    monkeypatch.delenv("WEB_WORKERS", raising=False)
+    monkeypatch.setattr(os, "cpu_count", lambda: 6)
+
+    assert get_web_workers() == 6
@@ -1,12 +1,28 @@
 import os
 import pytest
-from typing import Generator, Any
+from typing import Generator, Any, get_args
 
-from feedreader3.settings import initialize_settings, finalize_settings, get_settings
+from pydantic import ValidationError
+from pathlib import Path
+from pytest import LogCaptureFixture, MonkeyPatch
+
+from feedreader3.feed_parser import ENTRY_PARSER_FACTORIES
+from feedreader3.settings import (
+    ParserBackend,
+    TracingExporter,
+    TranslationBackend,
+    initialize_settings,
+    finalize_settings,
+    get_settings,
+    reload_settings,
+)
+from feedreader3.tracing import SPAN_EXPORTER_FACTORIES
+from feedreader3.translators import TRANSLATOR_FACTORIES
 
 
 SCHEDULER_CRONTAB_EXPR = "SCHEDULER_CRONTAB_EXPR"
 SCHEDULER_MISFIRE_GRACE_TIME = "SCHEDULER_MISFIRE_GRACE_TIME"
+FETCH_SKIP_DUPLICATE_ENTRIES = "FETCH_SKIP_DUPLICATE_ENTRIES"
 POSTGRES_USER = "POSTGRES_USER"
 POSTGRES_PASSWORD = "POSTGRES_PASSWORD"
 POSTGRES_DB = "POSTGRES_DB"
@@ -20,6 +36,7 @@ def pop_environ(key: str) -> str | None:
 
 def push_environ(key: str, value: str | None) -> None:
     if value is None:
+        os.environ.pop(key, None)
         return
     os.environ[key] = value
 
@@ -30,6 +47,7 @@ def settings_fixture() -> Generator[Any, Any, Any]:
     finalize_settings()
     scheduler_crontab_expr = pop_environ(SCHEDULER_CRONTAB_EXPR)
     scheduler_misfire_grace_time = pop_environ(SCHEDULER_MISFIRE_GRACE_TIME)
+    fetch_skip_duplicate_entries = pop_environ(FETCH_SKIP_DUPLICATE_ENTRIES)
     postgres_user = pop_environ(POSTGRES_USER)
     postgres_password = pop_environ(POSTGRES_PASSWORD)
     postgres_db = pop_environ(POSTGRES_DB)
@@ -41,6 +59,7 @@ def settings_fixture() -> Generator[Any, Any, Any]:
     finalize_settings()
     push_environ(SCHEDULER_CRONTAB_EXPR, scheduler_crontab_expr)
     push_environ(SCHEDULER_MISFIRE_GRACE_TIME, scheduler_misfire_grace_time)
+    push_environ(FETCH_SKIP_DUPLICATE_ENTRIES, fetch_skip_duplicate_entries)
     push_environ(POSTGRES_USER, postgres_user)
     push_environ(POSTGRES_PASSWORD, postgres_password)
     push_environ(POSTGRES_DB, postgres_db)
@@ -53,6 +72,7 @@ def settings_fixture() -> Generator[Any, Any, Any]:
 def test_initialize_settings_valid_environment_variables(reset_settings: Any) -> None:
     scheduler_crontab_expr = "* * * * *"
     scheduler_misfire_grace_time = "100"
+    fetch_skip_duplicate_entries = "true"
     postgres_user = "user"
     postgres_password = "password"
     postgres_db = "db"
@@ -61,6 +81,7 @@ def test_initialize_settings_valid_environment_variables(reset_settings: Any) ->
 
     os.environ[SCHEDULER_CRONTAB_EXPR] = scheduler_crontab_expr
     os.environ[SCHEDULER_MISFIRE_GRACE_TIME] = scheduler_misfire_grace_time
+    os.environ[FETCH_SKIP_DUPLICATE_ENTRIES] = fetch_skip_duplicate_entries
     os.environ[POSTGRES_USER] = postgres_user
     os.environ[POSTGRES_PASSWORD] = postgres_password
     os.environ[POSTGRES_DB] = postgres_db
@@ -72,6 +93,7 @@ def test_initialize_settings_valid_environment_variables(reset_settings: Any) ->
 
     assert settings.scheduler_crontab_expr == scheduler_crontab_expr
     assert settings.scheduler_misfire_grace_time == int(scheduler_misfire_grace_time)
+    assert settings.fetch_skip_duplicate_entries is True
     assert settings.postgres_user == postgres_user
     assert settings.postgres_password == postgres_password
     assert settings.postgres_db == postgres_db
@@ -80,7 +102,163 @@ def test_initialize_settings_valid_environment_variables(reset_settings: Any) ->
 
 
 def test_initialize_settings_invalid_environment_variables(reset_settings: Any) -> None:
-    with pytest.raises(ValueError) as excinfo:
+    with pytest.raises(ValidationError) as excinfo:
+        initialize_settings()
+
+    assert {error["loc"] for error in excinfo.value.errors()} == {
+        ("postgres_user",),
+        ("postgres_password",),
+        ("postgres_db",),
+        ("postgres_host",),
+        ("postgres_port",),
+    }
+    assert {error["type"] for error in excinfo.value.errors()} == {"missing"}
+
+
+def test_initialize_settings_default_values(reset_settings: Any) -> None:
+    os.environ[POSTGRES_USER] = "user"
+    os.environ[POSTGRES_PASSWORD] = "password"
+    os.environ[POSTGRES_DB] = "db"
+    os.environ[POSTGRES_HOST] = "host"
+    os.environ[POSTGRES_PORT] = "100"
+
+    initialize_settings()
+    settings = get_settings()
+
+    assert settings.scheduler_crontab_expr == "*/10 * * * *"
+    assert settings.scheduler_misfire_grace_time == 30
+    assert settings.fetch_skip_duplicate_entries is False
+    assert settings.translation_backend == "none"
+    assert settings.translation_target_langs == ["ja"]
+    assert settings.translation_batch_size == 32
+    assert settings.translation_lookback_hours == 24
+    assert settings.recommendation_index_dir is None
+    assert settings.recommendation_dim == 256
+    assert settings.recommendation_batch_size == 1000
+    assert settings.recommendation_lookback_hours == 1
+    assert settings.log_entry_sample_rate == 0.0
+    assert settings.profile_dir == "profiles"
+    assert settings.profile_fetch_runs == 0
+    assert settings.profile_signal_runs == 1
+    assert settings.profile_allowed_clients == ["127.0.0.1", "::1"]
+
+
+def test_initialize_settings_invalid_bool(reset_settings: Any) -> None:
+    os.environ[FETCH_SKIP_DUPLICATE_ENTRIES] = "maybe"
+
+    with pytest.raises(ValidationError) as excinfo:
+        initialize_settings()
+
+    [error] = [
+        error
+        for error in excinfo.value.errors()
+        if error["loc"] == ("fetch_skip_duplicate_entries",)
+    ]
+    assert error["type"] == "bool_parsing"
+    assert error["input"] == "maybe"
+
+
+def test_initialize_settings_comma_separated_lists(
+    reset_settings: Any, monkeypatch: MonkeyPatch
+) -> None:
+    monkeypatch.setenv("TRANSLATION_TARGET_LANGS", "ja, en,,fr")
+    monkeypatch.setenv("PROFILE_ALLOWED_CLIENTS", "10.0.0.1")
+    monkeypatch.setenv("POSTGRES_USER", "user")
+    monkeypatch.setenv("POSTGRES_PASSWORD", "password")
+    monkeypatch.setenv("POSTGRES_DB", "db")
+    monkeypatch.setenv("POSTGRES_HOST", "host")
+    monkeypatch.setenv("POSTGRES_PORT", "100")
+
+    initialize_settings()
+    settings = get_settings()
+
+    assert settings.translation_target_langs == ["ja", "en", "fr"]
+    assert settings.profile_allowed_clients == ["10.0.0.1"]
+
+
+def test_initialize_settings_invalid_crontab_expr(monkeypatch: MonkeyPatch) -> None:
+    finalize_settings()
+    monkeypatch.setenv("SCHEDULER_CRONTAB_EXPR", "every minute")
+    try:
+        with pytest.raises(ValidationError):
+            initialize_settings()
+    finally:
+        monkeypatch.undo()
         initialize_settings()
 
-    assert str(excinfo.value) == "POSTGRES_USER is None"
+
+@pytest.mark.parametrize(
+    "name", ["FETCH_PARSER_BACKEND", "TRANSLATION_BACKEND", "TRACING_EXPORTER"]
+)
+def test_initialize_settings_unknown_backend(
+    name: str, monkeypatch: MonkeyPatch
+) -> None:
+    finalize_settings()
+    monkeypatch.setenv(name, "unknown")
+    try:
+        with pytest.raises(ValidationError) as excinfo:
+            initialize_settings()
+        [error] = excinfo.value.errors()
+        assert error["loc"] == (name.lower(),)
+        assert error["type"] == "literal_error"
+    finally:
+        monkeypatch.undo()
+        initialize_settings()
+
+
+def test_backend_settings_match_factories() -> None:
+    assert set(get_args(ParserBackend)) == set(ENTRY_PARSER_FACTORIES)
+    assert set(get_args(TranslationBackend)) == {"none", *TRANSLATOR_FACTORIES}
+    assert set(get_args(TracingExporter)) == {"none", *SPAN_EXPORTER_FACTORIES}
+
+
+@pytest.fixture(name="settings_file")
+def settings_file_fixture(
+    tmp_path: Path, monkeypatch: MonkeyPatch
+) -> Generator[Path, None, None]:
+    # The settings of the session, loaded again with a settings file
+    path = tmp_path / "feedreader3.env"
+    path.write_text("FETCH_MAX_BYTES=1000\n")
+    monkeypatch.setenv("SETTINGS_FILE", str(path))
+    monkeypatch.setenv("FETCH_MAX_BYTES", "2000")
+    finalize_settings()
+    initialize_settings()
+    yield path
+    monkeypatch.undo()
+    finalize_settings()
+    initialize_settings()
+
+
+def test_initialize_settings_file(settings_file: Path) -> None:
+    # The file goes before the environment
+    assert get_settings().fetch_max_bytes == 1000
+
+
+def test_reload_settings(settings_file: Path, caplog: LogCaptureFixture) -> None:
+    settings = get_settings()
+    settings_file.write_text(
+        "FETCH_MAX_BYTES=3000\n"
+        "SCHEDULER_FETCH_SHARDS=8\n"
+        # Only read at startup
+        "DATABASE_POOL_SIZE=50\n"
+    )
+
+    changed = reload_settings()
+
+    assert changed == {"fetch_max_bytes": 3000, "scheduler_fetch_shards": 8}
+    assert get_settings().fetch_max_bytes == 3000
+    assert get_settings().database_pool_size == settings.database_pool_size
+    assert "settings.database_pool_size is only changed by a restart" in caplog.text
+    # A job that is running keeps the values it started with
+    assert settings.fetch_max_bytes == 1000
+
+    assert reload_settings() == {}
+
+
+@pytest.mark.parametrize("line", ["FETCH_READ_TIMEOUT=-1", "FETCH_PARSER_BACKEND=lxml"])
+def test_reload_settings_invalid(settings_file: Path, line: str) -> None:
+    settings = get_settings()
+    settings_file.write_text(f"FETCH_MAX_BYTES=3000\n{line}\n")
+
+    assert reload_settings() == {}
+    assert get_settings() is settings
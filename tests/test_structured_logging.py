@@ -0,0 +1,56 @@
+import json
+import logging
+import pytest
+from pytest import CaptureFixture
+
+from feedreader3.structured_logging import (
+    JsonFormatter,
+    initialize_logging,
+    finalize_logging,
+)
+
+
+def test_json_formatter() -> None:
+    record = logging.makeLogRecord(
+        {
+            "name": "feedreader3.test",
+            "levelname": "INFO",
+            "msg": "Fetched %s",
+            "args": ("feed",),
+            "new": 3,
+        }
+    )
+
+    data = json.loads(JsonFormatter().format(record))
+
+    assert data["logger"] == "feedreader3.test"
+    assert data["level"] == "INFO"
+    assert data["message"] == "Fetched feed"
+    assert data["new"] == 3
+    assert "time" in data
+
+
+def test_initialize_logging(capsys: CaptureFixture[str]) -> None:
+    initialize_logging(["feedreader3.test"], "json", logging.INFO)
+    test_logger = logging.getLogger("feedreader3.test")
+    try:
+        test_logger.info("Fetched feed", extra={"new": 1})
+        try:
+            raise RuntimeError("error")
+        except RuntimeError:
+            test_logger.exception("Failed")
+    finally:
+        # Stopping the listener writes out the queued records
+        finalize_logging()
+
+    lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    assert lines[0]["message"] == "Fetched feed"
+    assert lines[0]["new"] == 1
+    assert lines[1]["message"] == "Failed"
+    assert "RuntimeError: error" in lines[1]["exc_info"]
+    assert test_logger.handlers == []
+
+
+def test_initialize_logging_unknown_format() -> None:
+    with pytest.raises(ValueError):
+        initialize_logging(["feedreader3.test"], "xml")
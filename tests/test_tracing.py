@@ -0,0 +1,64 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from pathlib import Path
+import json
+import pytest
+
+from feedreader3.tracing import create_span_exporter, flush_tracing, instrument_app
+
+
+def test_create_span_exporter_file(tmp_path: Path) -> None:
+    path = tmp_path / "traces.jsonl"
+    exporter = create_span_exporter("file", str(path))
+    assert exporter is not None
+    tracer_provider = TracerProvider()
+    tracer_provider.add_span_processor(SimpleSpanProcessor(exporter))
+    tracer = tracer_provider.get_tracer(__name__)
+
+    with tracer.start_as_current_span("parent"):
+        with tracer.start_as_current_span("child", attributes={"key": 1}):
+            pass
+    tracer_provider.shutdown()
+
+    child, parent = [json.loads(line) for line in path.read_text().splitlines()]
+    assert (child["name"], parent["name"]) == ("child", "parent")
+    assert child["parent_id"] == parent["context"]["span_id"]
+    assert child["attributes"] == {"key": 1}
+
+
+def test_create_span_exporter_none() -> None:
+    assert create_span_exporter("none", "traces.jsonl") is None
+    with pytest.raises(ValueError):
+        create_span_exporter("unknown", "traces.jsonl")
+
+
+def test_instrument_app(span_exporter: InMemorySpanExporter) -> None:
+    app = FastAPI()
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int) -> dict[str, int]:
+        return {"item_id": item_id}
+
+    @app.get("/health")
+    async def check_health() -> dict[str, str]:
+        return {"status": "healthy"}
+
+    instrument_app(app)
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/health").status_code == 200
+
+    flush_tracing()
+    server_spans = [
+        span
+        for span in span_exporter.get_finished_spans()
+        if span.parent is None and span.attributes is not None
+    ]
+    # Health checks are left out
+    [span] = server_spans
+    assert span.name == "GET /items/{item_id}"
+    assert span.attributes is not None
+    assert span.attributes["http.status_code"] == 200
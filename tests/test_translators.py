@@ -0,0 +1,24 @@
+import pytest
+
+from feedreader3.translators import StubTranslator, create_translator
+
+
+def test_create_translator() -> None:
+    assert create_translator("none") is None
+    assert isinstance(create_translator("stub"), StubTranslator)
+
+
+def test_create_translator_unknown_backend() -> None:
+    with pytest.raises(ValueError) as excinfo:
+        create_translator("unknown")
+
+    assert str(excinfo.value) == "Unknown translator backend: unknown"
+
+
+def test_stub_translator() -> None:
+    translator = StubTranslator()
+
+    assert translator.translate(["Hello", "World"], "ja") == [
+        "[ja] Hello",
+        "[ja] World",
+    ]
@@ -0,0 +1,101 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from typing import Generator
+from urllib.parse import parse_qs
+import hashlib
+import hmac
+import pytest
+
+from feedreader3.feed_fetcher import FetchLimits
+from feedreader3.websub import (
+    WebSubError,
+    get_callback_url,
+    request_subscription,
+    verify_signature,
+)
+
+LIMITS = FetchLimits(max_bytes=1024, connect_timeout=1, read_timeout=1, total_timeout=5)
+
+
+class HubHandler(BaseHTTPRequestHandler):
+    requests: list[dict[str, list[str]]] = []
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        HubHandler.requests.append(parse_qs(body.decode()))
+        self.send_response(202 if self.path == "/hub" else 400)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture(name="hub_url")
+def hub_url_fixture() -> Generator[str, None, None]:
+    HubHandler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), HubHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+
+def test_get_callback_url() -> None:
+    assert (
+        get_callback_url("https://example.com/websub/callback/", 3)
+        == "https://example.com/websub/callback/3"
+    )
+
+
+def test_request_subscription(hub_url: str) -> None:
+    request_subscription(
+        hub_url + "/hub",
+        "http://example.com/feed.xml",
+        "http://example.com/websub/callback/1",
+        "secret",
+        3600,
+        LIMITS,
+    )
+
+    assert HubHandler.requests == [
+        {
+            "hub.mode": ["subscribe"],
+            "hub.topic": ["http://example.com/feed.xml"],
+            "hub.callback": ["http://example.com/websub/callback/1"],
+            "hub.lease_seconds": ["3600"],
+            "hub.secret": ["secret"],
+        }
+    ]
+
+
+def test_request_subscription_refused(hub_url: str) -> None:
+    with pytest.raises(WebSubError):
+        request_subscription(
+            hub_url + "/other",
+            "http://example.com/feed.xml",
+            "http://example.com/websub/callback/1",
+            "secret",
+            3600,
+            LIMITS,
+        )
+
+
+@pytest.mark.parametrize("method", ["sha1", "sha256", "sha384", "sha512"])
+def test_verify_signature(method: str) -> None:
+    body = b"<feed/>"
+    digest = hmac.new(b"secret", body, getattr(hashlib, method)).hexdigest()
+
+    assert verify_signature("secret", body, f"{method}={digest}")
+    assert not verify_signature("other", body, f"{method}={digest}")
+    assert not verify_signature("secret", body + b" ", f"{method}={digest}")
+
+
+def test_verify_signature_invalid_header() -> None:
+    digest = hmac.new(b"secret", b"", hashlib.md5).hexdigest()
+
+    assert not verify_signature("secret", b"", None)
+    assert not verify_signature("secret", b"", "")
+    assert not verify_signature("secret", b"", f"md5={digest}")